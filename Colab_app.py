@@ -25,7 +25,7 @@ else:
 !mkdir -p data/uploads data/images data/outputs
 
 # 4️⃣ DB 초기화
-from pdf_parser import init_db
+from db import init_db
 init_db()
 
 # 5️⃣ PDF 업로드
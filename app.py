@@ -1,40 +1,90 @@
-import os, json
-from flask import Flask, request, jsonify, render_template
+import os
+from flask import Flask, Blueprint, request, jsonify, render_template, Response
 from dotenv import load_dotenv
 
-# 내부 모듈
+# 내부 모듈 (OCR/LLM 은 업로드 작업이 실제로 실행될 때 jobs 에서 import)
 from db import init_db, SessionLocal
-from models import Question, Attempt
-from pdf_parser import parse_pdf  # ✅ 최신 버전 호환 (LangChain + PaddleOCR)
-from ingest import ingest_questions
-from similarity import similar_questions
+from models import Question
+from jobs import job_manager, sse_stream  # PDF 파싱은 백그라운드 작업에서 실행
+from similarity import similar_questions, question_text, warm_index
+from search import search_questions
+from dedup import duplicate_clusters
+from facets import category_tree, total_questions
+from wrong_notes import list_wrong_notes
+from srs import due_questions
+from user_stats import user_stats, question_stats
+from attempt_log import attempt_writer
+from question_cache import get_question, first_question_id, cache_status
+from extract_worker import extract_worker, PRELOAD as PRELOAD_EXTRACT_WORKER
+from fastjson import FastJSONProvider
+import metrics
 
 # 환경 변수 로드
 load_dotenv()
 
-app = Flask(__name__)
-
 # 초기 디렉터리 설정
 UPLOAD_DIR = "./data/uploads"
 DATA_DIR = "./data"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(DATA_DIR, exist_ok=True)
 
-# DB 초기화
-init_db()
+bp = Blueprint("main", __name__)
+
+
+# -----------------------
+# 앱 팩토리
+# -----------------------
+def create_app(config=None):
+    """
+    Flask 앱 생성 (디렉터리 준비 + DB 초기화 + 라우트 등록).
+    gunicorn 'app:create_app()' / flask --app app run 모두 사용 가능.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)   # jsonify 도 orjson 사용 (설치된 경우)
+    if config:
+        app.config.update(config)
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    # DB 초기화
+    init_db()
+
+    # OCR/LLM 상주 워커를 미리 로드 (기본은 첫 업로드 때 시작)
+    if PRELOAD_EXTRACT_WORKER:
+        extract_worker.start()
+
+    # 유사 문항 인덱스 로드 / DB 동기화는 백그라운드 (준비 전 요청은 카테고리 기반 추천)
+    warm_index()
+
+    metrics.init_app(app)   # 라우트별 응답 시간 / 요청당 쿼리 수
+    app.register_blueprint(bp)
+    return app
+
+
+_app = None
+
+
+def __getattr__(name):
+    """기존 방식(`from app import app`, gunicorn app:app) 호환: 처음 접근할 때 앱 생성"""
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # -----------------------
 # 홈
 # -----------------------
-@app.route("/")
+@bp.route("/")
 def home():
     return render_template("index.html")
 
 
 # -----------------------
-# 관리자: PDF 업로드 → OCR+LLM 파싱 → JSON 저장 → DB 적재
+# 관리자: PDF 업로드 → 백그라운드 작업(OCR+LLM 파싱 → 페이지별 DB 적재)
 # -----------------------
-@app.route("/admin/upload", methods=["GET", "POST"])
+@bp.route("/admin/upload", methods=["GET", "POST"])
 def upload_pdf():
     if request.method == "GET":
         return render_template("upload.html")
@@ -49,38 +99,121 @@ def upload_pdf():
     save_path = os.path.join(UPLOAD_DIR, f.filename)
     f.save(save_path)
 
-    # (1) OCR + LLM 파싱 → JSON 생성
-    output_json = os.path.join(DATA_DIR, "questions.json")
+    # ✅ 요청은 바로 반환, 파싱은 작업 큐에서 진행 (진행률은 /admin/jobs/<id>)
+    job = job_manager.submit(
+        save_path, f.filename,
+        use_llm=True,       # OCR + LLM 파싱
+        lang="korean"       # 한국어 OCR
+    )
 
-    try:
-        # ✅ 최신 pdf_parser.py는 CPU/GPU 자동감지 + LangChain 내부 로직 포함
-        items = parse_pdf(
-            pdf_path=save_path,
-            output_json=output_json,
-            use_llm=True,       # OCR + LLM 파싱
-            lang="korean"       # 한국어 OCR
-        )
-    except Exception as e:
-        print(f"[ERROR] 파싱 중 오류: {e}")
-        return jsonify({"error": f"파싱 실패: {str(e)}"}), 500
+    return jsonify({
+        "message": "업로드 완료, 파싱 작업 시작",
+        "job_id": job.id,
+        "status_url": f"/admin/jobs/{job.id}",
+        "events_url": f"/admin/jobs/{job.id}/events",
+        "filename": f.filename
+    }), 202
 
-    if not items:
-        return jsonify({"message": "파싱된 문항 0건"}), 200
 
-    # (2) JSON → DB 적재
-    count = ingest_questions(output_json, source_name=f.filename)
+# -----------------------
+# 관리자: 업로드 작업 상태 / 진행률 스트림(SSE)
+# -----------------------
+@bp.route("/admin/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify([job.to_dict() for job in job_manager.list()])
+
+
+@bp.route("/admin/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "작업 없음"}), 404
+    return jsonify(job.to_dict())
 
-    return jsonify({
-        "message": "업로드/파싱/DB 저장 완료",
-        "count": count,
-        "filename": f.filename
-    })
+
+@bp.route("/admin/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "작업 없음"}), 404
+    last_id = request.headers.get("Last-Event-ID", default=-1, type=int)
+    return Response(
+        sse_stream(job, last_event_id=last_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# -----------------------
+# 관리자: 근사 중복 클러스터 조회
+# -----------------------
+@bp.route("/admin/duplicates", methods=["GET"])
+def list_duplicates():
+    limit = max(1, min(request.args.get("limit", default=20, type=int), 100))
+    offset = max(request.args.get("offset", default=0, type=int), 0)
+    return jsonify(duplicate_clusters(limit=limit, offset=offset))
+
+
+# -----------------------
+# 관리자: 풀이 기록 write-behind 상태 (큐 길이, flush 지연)
+# -----------------------
+@bp.route("/admin/attempt_log", methods=["GET"])
+def attempt_log_status():
+    return jsonify(attempt_writer.status())
+
+
+# -----------------------
+# 관리자: 문항 캐시 상태 (적중률)
+# -----------------------
+@bp.route("/admin/cache", methods=["GET"])
+def cache_stats():
+    return jsonify(cache_status())
+
+
+# -----------------------
+# 관리자: 추출 워커 상태 (헬스 체크: 준비 안 됐으면 503)
+# -----------------------
+@bp.route("/admin/worker", methods=["GET"])
+def worker_status():
+    status = extract_worker.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+
+# -----------------------
+# 메트릭 (Prometheus 텍스트 형식)
+# -----------------------
+_attempt_queue = metrics.gauge("attempt_log_queue_depth", "풀이 기록 write-behind 큐 길이")
+_attempt_flush = metrics.gauge("attempt_log_last_flush_ms", "마지막 풀이 기록 flush 시간(ms)")
+_cache_hit_rate = metrics.gauge("question_cache_hit_rate", "문항 캐시 적중률")
+_worker_ready = metrics.gauge("extract_worker_ready", "추출 워커 준비 여부 (1/0)")
+_jobs = metrics.gauge("upload_jobs", "상태별 업로드 작업 수", ("status",))
+
+
+@metrics.register_collector
+def _collect_status():
+    s = attempt_writer.status()
+    _attempt_queue.set(s["queue_depth"])
+    _attempt_flush.set(s["last_flush_ms"])
+    _cache_hit_rate.set(cache_status()["hit_rate"])
+    _worker_ready.set(1 if extract_worker.state == "ready" else 0)
+    counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+    for job in job_manager.list():
+        counts[job.status] = counts.get(job.status, 0) + 1
+    for status, n in counts.items():
+        _jobs.set(n, status=status)
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    if not metrics.ENABLED:
+        return jsonify({"error": "METRICS=0"}), 404
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # -----------------------
 # 문제풀이 UI
 # -----------------------
-@app.route("/quiz")
+@bp.route("/quiz")
 def quiz():
     return render_template("quiz.html")
 
@@ -88,7 +221,7 @@ def quiz():
 # -----------------------
 # 오답노트 UI
 # -----------------------
-@app.route("/wrong")
+@bp.route("/wrong")
 def wrong_page():
     return render_template("wrong.html")
 
@@ -96,183 +229,261 @@ def wrong_page():
 # -----------------------
 # 문제 조회 API
 # -----------------------
-@app.route("/api/question", methods=["GET"])
-def get_question():
+@bp.route("/api/question", methods=["GET"])
+def get_question_api():
     qid = request.args.get("id", type=int)
     category = request.args.get("category")
     subcategory = request.args.get("subcategory")
 
+    if not qid:
+        db = SessionLocal()
+        try:
+            qid = first_question_id(db, category=category, subcategory=subcategory)
+        finally:
+            db.close()
+
+    # 보기 파싱 + 직렬화는 캐시에 저장된 것 재사용
+    q = get_question(qid) if qid else None
+    if not q:
+        return jsonify({"error": "문항 없음"}), 404
+
+    # total: 캐시된 집계 (적재/삭제 시 무효화)
+    return Response(q.response(total=total_questions()), mimetype="application/json")
+
+
+# -----------------------
+# 다음 문제 API
+# -----------------------
+@bp.route("/api/next", methods=["GET"])
+def next_question():
+    current_id = request.args.get("current_id", default=0, type=int)
+    category = request.args.get("category")
+    subcategory = request.args.get("subcategory")
+
     db = SessionLocal()
     try:
-        q = None
-        if qid:
-            q = db.get(Question, qid)
-        else:
-            query = db.query(Question)
-            if category:
-                query = query.filter(Question.category == category)
-            if subcategory:
-                query = query.filter(Question.subcategory == subcategory)
-            q = query.order_by(Question.id.asc()).first()
-
-        if not q:
-            return jsonify({"error": "문항 없음"}), 404
-
-        return jsonify({
-            "id": q.id,
-            "question": q.stem,
-            "options": q.get_options(),   # ✅ 보완
-            "category": q.category,
-            "subcategory": q.subcategory,
-            "total": db.query(Question).count()
-        })
+        qid = first_question_id(db, after=current_id, category=category, subcategory=subcategory)
     finally:
         db.close()
 
+    q = get_question(qid) if qid else None
+    if not q:
+        return jsonify({"end": True, "message": "마지막 문제"}), 200
+    return Response(q.response(), mimetype="application/json")
+
 
 # -----------------------
-# 다음 문제 API
+# 문제 묶음 조회 API (keyset 페이지 + ETag)
 # -----------------------
-@app.route("/api/next", methods=["GET"])
-def next_question():
-    current_id = request.args.get("current_id", default=0, type=int)
+@bp.route("/api/questions", methods=["GET"])
+def list_questions():
+    after = request.args.get("after", default=0, type=int)
+    limit = max(1, min(request.args.get("limit", default=20, type=int), 100))
     category = request.args.get("category")
     subcategory = request.args.get("subcategory")
 
     db = SessionLocal()
     try:
-        query = db.query(Question).filter(Question.id > current_id)
+        # (category, subcategory, id) 복합 인덱스로 범위 스캔 → OFFSET 없이 after 이후만 읽음
+        query = db.query(Question).filter(Question.id > after, Question.duplicate_of.is_(None))
         if category:
             query = query.filter(Question.category == category)
         if subcategory:
             query = query.filter(Question.subcategory == subcategory)
-        q = query.order_by(Question.id.asc()).first()
-
-        if not q:
-            return jsonify({"end": True, "message": "마지막 문제"}), 200
-
-        return jsonify({
-            "id": q.id,
-            "question": q.stem,
-            "options": q.get_options(),   # ✅ 보완
-            "category": q.category,
-            "subcategory": q.subcategory
+        rows = query.order_by(Question.id.asc()).limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        resp = jsonify({
+            "items": [
+                {
+                    "id": q.id,
+                    "question": q.stem,
+                    "options": q.get_options(),
+                    "category": q.category,
+                    "subcategory": q.subcategory
+                }
+                for q in rows
+            ],
+            "next_after": rows[-1].id if rows else after,
+            "has_more": has_more
         })
     finally:
         db.close()
 
+    # 내용이 같으면 304 (If-None-Match)
+    resp.add_etag()
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
+
+
+# -----------------------
+# 카테고리 목록 API (대분류 → 소분류 + 문항 수)
+# -----------------------
+@bp.route("/api/categories", methods=["GET"])
+def categories():
+    return jsonify(category_tree())
+
+
+# -----------------------
+# 문제 검색 API (FTS5)
+# -----------------------
+@bp.route("/api/search", methods=["GET"])
+def search():
+    q = (request.args.get("q") or "").strip()
+    category = request.args.get("category")
+    subcategory = request.args.get("subcategory")
+    limit = max(1, min(request.args.get("limit", default=20, type=int), 100))
+    offset = max(request.args.get("offset", default=0, type=int), 0)
+
+    if not q:
+        return jsonify({"error": "검색어(q) 누락"}), 400
+
+    result = search_questions(q, category=category, subcategory=subcategory,
+                              limit=limit, offset=offset)
+    result["query"] = q
+    return jsonify(result)
+
 
 # -----------------------
 # 채점 API
 # -----------------------
-@app.route("/api/answer", methods=["POST"])
+def _valid_user_id(user_id):
+    """풀이 기록은 백그라운드에서 배치로 저장 → 컬럼(String(100))에 못 들어가는 값은 요청 단계에서 거절"""
+    return isinstance(user_id, str) and user_id.strip() != "" and len(user_id) <= 100
+
+
+@bp.route("/api/answer", methods=["POST"])
 def answer():
     data = request.get_json(force=True)
     qid = int(data["question_id"])
     chosen = str(data["chosen"]).strip()
     user_id = data.get("user_id", "default")
     note_type = data.get("note_type", "wrong")  # wrong / review
+    quality = data.get("quality")               # SM-2 응답 품질 0~5 (없으면 정답 여부로)
+
+    # 기록은 백그라운드에서 저장되므로 응답 전에 검사 (잘못된 값이 배치 저장을 깨뜨리지 않도록)
+    if not _valid_user_id(user_id):
+        return jsonify({"error": "user_id 는 1~100자 문자열"}), 400
+    if quality is not None and (isinstance(quality, bool) or not isinstance(quality, int)
+                                or not 0 <= quality <= 5):
+        return jsonify({"error": "quality 는 0~5 정수"}), 400
+
+    cached = get_question(qid)
+    if not cached:
+        return jsonify({"error": "문항 없음"}), 404
+    q = cached.data
+
+    correct = (chosen == (q["answer"] or ""))
+
+    # 시도 기록 저장 (write-behind: 큐에 넣고 바로 응답, 오답노트/복습 일정도 함께 반영)
+    attempt_writer.submit({
+        "user_id": user_id, "question_id": q["id"], "chosen": chosen,
+        "correct": correct, "note_type": note_type, "quality": quality,
+        "category": q["category"], "subcategory": q["subcategory"]   # 정답률 집계용 (문항 재조회 없이)
+    })
 
-    db = SessionLocal()
-    try:
-        q = db.get(Question, qid)
-        if not q:
-            return jsonify({"error": "문항 없음"}), 404
-
-        correct = (chosen == (q.answer or ""))
-
-        # 시도 기록 저장
-        attempt = Attempt(
-            user_id=user_id,
-            question_id=q.id,
-            chosen=chosen,
-            correct=correct,
-            note_type=note_type
-        )
-        db.add(attempt)
-        db.commit()
-
-        # 유사 문제 추천
-        base_text = (q.stem or "") + "\n" + (" ".join(q.get_options().values()))
-        sims = similar_questions(
-            base_text, k=3, exclude_db_id=q.id,
-            category=q.category, subcategory=q.subcategory
-        )
+    # 유사 문제 추천
+    base_text = question_text(q["question"], q["options"])
+    sims = similar_questions(
+        base_text, k=3, exclude_db_id=q["id"],
+        category=q["category"], subcategory=q["subcategory"]
+    )
 
-        return jsonify({
-            "correct": correct,
-            "answer": q.answer,
-            "explanation": q.explanation,
-            "category": q.category,
-            "subcategory": q.subcategory,
-            "note_type": note_type,
-            "similar": sims
-        })
-    finally:
-        db.close()
+    return jsonify({
+        "correct": correct,
+        "answer": q["answer"],
+        "explanation": q["explanation"],
+        "category": q["category"],
+        "subcategory": q["subcategory"],
+        "note_type": note_type,
+        "similar": sims
+    })
 
 
 # -----------------------
 # 오답노트 API
 # -----------------------
-@app.route("/api/wrong_only", methods=["GET"])
+@bp.route("/api/wrong_only", methods=["GET"])
 def wrong_only():
-    """내 오답노트 가져오기"""
+    """내 오답노트 가져오기 (문항당 1건, 최근 순 커서 페이지)"""
     user_id = request.args.get("user_id", "default")
-
-    db = SessionLocal()
+    limit = max(1, min(request.args.get("limit", default=20, type=int), 100))
     try:
-        attempts = db.query(Attempt).filter(Attempt.user_id == user_id).all()
-        result = []
-        for a in attempts:
-            q = db.get(Question, a.question_id)
-            if not q:
-                continue
-            result.append({
-                "question_id": q.id,
-                "stem": q.stem,
-                "options": q.get_options(),   # ✅ 보완
-                "chosen": a.chosen,
-                "answer": q.answer,
-                "explanation": q.explanation,
-                "note_type": a.note_type
-            })
-        return jsonify(result)
-    finally:
-        db.close()
+        result = list_wrong_notes(
+            user_id,
+            category=request.args.get("category"),
+            subcategory=request.args.get("subcategory"),
+            note_type=request.args.get("note_type"),
+            cursor=request.args.get("cursor"),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+# -----------------------
+# 오늘의 복습 API (간격 반복)
+# -----------------------
+@bp.route("/api/due", methods=["GET"])
+def due():
+    """복습 시각이 지난 문항 → 부족하면 새 문항으로 채움"""
+    user_id = request.args.get("user_id", "default")
+    limit = max(1, min(request.args.get("limit", default=20, type=int), 100))
+    include_new = request.args.get("new", default="1") not in ("0", "false")
+    return jsonify(due_questions(
+        user_id, limit=limit,
+        category=request.args.get("category"),
+        subcategory=request.args.get("subcategory"),
+        include_new=include_new
+    ))
+
+
+# -----------------------
+# 정답률 통계 API (집계 테이블만 조회)
+# -----------------------
+@bp.route("/api/stats", methods=["GET"])
+def stats():
+    """
+    ?user_id=...[&category=...]: 사용자 대분류/소분류별 정답률 (낮은 순)
+    ?question_ids=1,2,3: 문항별 전체 사용자 정답률
+    """
+    raw_ids = request.args.get("question_ids")
+    if raw_ids:
+        try:
+            ids = [int(x) for x in raw_ids.split(",") if x.strip()][:100]
+        except ValueError:
+            return jsonify({"error": "question_ids 는 쉼표로 구분한 정수"}), 400
+        return jsonify({"questions": question_stats(ids)})
+    user_id = request.args.get("user_id", "default")
+    return jsonify(user_stats(user_id, category=request.args.get("category")))
 
 
 # -----------------------
 # 복습노트에 수동 추가 API
 # -----------------------
-@app.route("/api/review_add", methods=["POST"])
+@bp.route("/api/review_add", methods=["POST"])
 def review_add():
     data = request.get_json(force=True)
     qid = int(data["question_id"])
     user_id = data.get("user_id", "default")
 
-    db = SessionLocal()
-    try:
-        q = db.get(Question, qid)
-        if not q:
-            return jsonify({"error": "문항 없음"}), 404
-
-        attempt = Attempt(
-            user_id=user_id,
-            question_id=q.id,
-            chosen="(복습 추가)",
-            correct=True,
-            note_type="review"
-        )
-        db.add(attempt)
-        db.commit()
-        return jsonify({"message": "복습노트에 추가 완료"})
-    finally:
-        db.close()
+    # /api/answer 와 같은 검사 (잘못된 값이 write-behind 배치 저장을 깨뜨리지 않도록)
+    if not _valid_user_id(user_id):
+        return jsonify({"error": "user_id 는 1~100자 문자열"}), 400
+    if not get_question(qid):
+        return jsonify({"error": "문항 없음"}), 404
+
+    attempt_writer.submit({
+        "user_id": user_id, "question_id": qid, "chosen": "(복습 추가)",
+        "correct": True, "note_type": "review", "graded": False   # 바로 복습 대상으로
+    })
+    return jsonify({"message": "복습노트에 추가 완료"})
 
 
 # -----------------------
 # 실행
 # -----------------------
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,187 @@
+import os, json, time, queue, atexit, threading
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from db import SessionLocal
+from models import Attempt
+from wrong_notes import apply_attempts
+from srs import apply_reviews
+from user_stats import apply_stats
+
+# -----------------------
+# 풀이 기록 write-behind (묶어서 group commit)
+# -----------------------
+# /api/answer 는 큐에 넣고 바로 응답 → 백그라운드 스레드가 크기/시간 기준으로 모아서 한 트랜잭션에 기록
+# (풀이 기록 + 오답노트 + 복습 카드 + 정답률 집계를 같은 트랜잭션에서 반영)
+WRITE_BEHIND = os.getenv("ATTEMPT_WRITE_BEHIND", "1") not in ("0", "false")
+QUEUE_MAX = int(os.getenv("ATTEMPT_QUEUE_MAX", "10000"))      # 큐가 가득 차면 요청 스레드에서 바로 기록
+FLUSH_SIZE = int(os.getenv("ATTEMPT_FLUSH_SIZE", "200"))      # 이만큼 모이면 기록
+FLUSH_MS = int(os.getenv("ATTEMPT_FLUSH_MS", "200"))          # 첫 기록 후 최대 대기 시간
+FAILED_PATH = "./data/attempts_failed.jsonl"                  # 기록 실패한 배치 보관 (수동 재적재용)
+
+_ATTEMPT_COLS = ("user_id", "question_id", "chosen", "correct", "note_type", "created_at")
+
+
+def write_attempts(db, records):
+    """풀이 기록 배치를 현재 트랜잭션에 반영 (commit은 호출하는 쪽)"""
+    db.execute(insert(Attempt), [{c: r.get(c) for c in _ATTEMPT_COLS} for r in records])
+    apply_attempts(db, records)
+    apply_reviews(db, records)
+    apply_stats(db, records)
+
+
+class AttemptWriter:
+    def __init__(self, maxsize=QUEUE_MAX, flush_size=FLUSH_SIZE, flush_ms=FLUSH_MS):
+        self.flush_size = flush_size
+        self.flush_interval = flush_ms / 1000
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.stats = {
+            "enqueued": 0, "written": 0, "batches": 0, "inline": 0, "failed": 0,
+            "last_batch": 0, "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0,
+        }
+
+    # ----- 요청 스레드 -----
+    def submit(self, record):
+        record.setdefault("created_at", datetime.now(timezone.utc))
+        if not WRITE_BEHIND or self._closed:
+            self._flush([record], inline=True)
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+            with self._lock:
+                self.stats["enqueued"] += 1
+        except queue.Full:
+            # 역압: 큐가 가득 차면 유실 대신 요청 스레드에서 직접 기록
+            self._flush([record], inline=True)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+                self._thread.start()
+
+    # ----- 백그라운드 스레드 -----
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:           # close() 신호
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.flush_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                self._drain()
+                return
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                batch.append(item)
+        for start in range(0, len(batch), self.flush_size):
+            self._flush(batch[start:start + self.flush_size])
+
+    def _commit(self, records):
+        db = SessionLocal()
+        try:
+            write_attempts(db, records)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _flush(self, batch, inline=False):
+        t0 = time.perf_counter()
+        failed = []
+        for attempt in (1, 2):
+            try:
+                self._commit(batch)
+                break
+            except Exception as e:
+                if attempt == 2:
+                    # 배치 전체 실패 → 한 건씩 따로 커밋해 문제 있는 기록만 격리
+                    print(f"[WARN] 풀이 기록 배치 {len(batch)}건 저장 실패: {e} → 한 건씩 재시도")
+                    for record in batch:
+                        try:
+                            self._commit([record])
+                        except Exception as e1:
+                            print(f"[ERROR] 풀이 기록 저장 실패 ({record.get('user_id')}, "
+                                  f"{record.get('question_id')}): {e1} → {FAILED_PATH}")
+                            failed.append(record)
+        if failed:
+            self._save_failed(failed)
+            with self._lock:
+                self.stats["failed"] += len(failed)
+        written = len(batch) - len(failed)
+        if not written:
+            return
+
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            s = self.stats
+            s["written"] += written
+            s["batches"] += 1
+            s["inline"] += written if inline else 0
+            s["last_batch"] = written
+            s["last_flush_ms"] = round(ms, 2)
+            s["max_flush_ms"] = round(max(s["max_flush_ms"], ms), 2)
+            s["total_flush_ms"] += ms
+
+    def _save_failed(self, batch):
+        os.makedirs(os.path.dirname(FAILED_PATH), exist_ok=True)
+        with open(FAILED_PATH, "a", encoding="utf-8") as f:
+            for r in batch:
+                f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+
+    # ----- 종료 / 상태 -----
+    def close(self, timeout=10):
+        """남은 기록을 모두 저장하고 스레드 종료 (atexit)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                pass
+        # 스레드가 없거나 시간 내 끝나지 않았으면 남은 것 직접 기록
+        self._drain()
+
+    def status(self):
+        with self._lock:
+            s = dict(self.stats)
+        total_ms = s.pop("total_flush_ms")
+        s["avg_flush_ms"] = round(total_ms / s["batches"], 2) if s["batches"] else 0.0
+        s["queue_depth"] = self._queue.qsize()
+        s["queue_max"] = self._queue.maxsize
+        s["write_behind"] = WRITE_BEHIND
+        return s
+
+
+attempt_writer = AttemptWriter()
+atexit.register(attempt_writer.close)
@@ -0,0 +1,109 @@
+# benchmarks/bench_startup.py
+# 퀴즈 서버 콜드 스타트 측정: `import app` / create_app() 시간 + 최대 RSS + 무거운 모듈 로드 여부
+# 실행: python -m benchmarks.bench_startup --runs 5 [--max-ms 1500 --max-rss-mb 300]
+import os, sys, json, argparse, tempfile, subprocess, statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 퀴즈 서빙 프로세스에서 import 되면 안 되는 모듈 (업로드 작업 전용)
+HEAVY_MODULES = ("paddleocr", "paddle", "torch", "transformers", "langchain",
+                 "langchain_huggingface", "sentence_transformers", "pdf2image",
+                 "pdf_parser", "llm_extract")
+
+# 새 인터프리터에서 실행할 측정 코드 (결과는 마지막 줄 JSON)
+_CHILD = r"""
+import sys, json, time, resource
+def rss_mb():
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / 1024 / 1024 if sys.platform == "darwin" else r / 1024
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+import_rss = rss_mb()
+app.create_app()
+t2 = time.perf_counter()
+heavy = [m for m in HEAVY if m in sys.modules]
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_ms": (t2 - t1) * 1000,
+                  "import_rss_mb": import_rss, "rss_mb": rss_mb(),
+                  "modules": len(sys.modules), "heavy": heavy}))
+"""
+
+
+def run_once(env):
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + _CHILD
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(env, top=10):
+    """-X importtime 결과에서 누적 시간이 큰 최상위 import 상위 N개"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not name.startswith(" "):          # 들여쓰기 없음 = 최상위 import
+            rows.append((int(cum) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10, help="import 시간 상위 모듈 수 (0이면 생략)")
+    ap.add_argument("--max-ms", type=float, default=None, help="import+create_app 중앙값 상한 (초과 시 exit 1)")
+    ap.add_argument("--max-rss-mb", type=float, default=None, help="최대 RSS 상한 (초과 시 exit 1)")
+    ap.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = ap.parse_args()
+
+    # 실제 DB를 건드리지 않도록 임시 SQLite 사용 (DATABASE_URL 지정 시 그대로)
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+
+    results = [run_once(env) for _ in range(args.runs)]
+    total = [r["import_ms"] + r["create_ms"] for r in results]
+    summary = {
+        "runs": args.runs,
+        "import_ms": round(statistics.median(r["import_ms"] for r in results), 1),
+        "create_app_ms": round(statistics.median(r["create_ms"] for r in results), 1),
+        "total_ms": round(statistics.median(total), 1),
+        "import_rss_mb": round(max(r["import_rss_mb"] for r in results), 1),
+        "rss_mb": round(max(r["rss_mb"] for r in results), 1),
+        "modules": results[-1]["modules"],
+        "heavy_modules": results[-1]["heavy"],
+    }
+    profile = import_profile(env, args.top) if args.top else []
+
+    if args.json:
+        print(json.dumps({**summary, "top_imports": [{"module": m, "ms": ms} for ms, m in profile]},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(f"import app     : {summary['import_ms']:8.1f} ms (중앙값, {args.runs}회)")
+        print(f"create_app()   : {summary['create_app_ms']:8.1f} ms")
+        print(f"합계           : {summary['total_ms']:8.1f} ms")
+        print(f"RSS (import)   : {summary['import_rss_mb']:8.1f} MB")
+        print(f"RSS (최대)     : {summary['rss_mb']:8.1f} MB  / 모듈 {summary['modules']}개")
+        print(f"무거운 모듈    : {', '.join(summary['heavy_modules']) or '없음'}")
+        if profile:
+            print("\nimport 누적 시간 상위:")
+            for ms, m in profile:
+                print(f"  {ms:8.1f} ms  {m}")
+
+    failed = []
+    if summary["heavy_modules"]:
+        failed.append(f"업로드 전용 모듈이 로드됨: {summary['heavy_modules']}")
+    if args.max_ms is not None and summary["total_ms"] > args.max_ms:
+        failed.append(f"시작 시간 {summary['total_ms']} ms > {args.max_ms} ms")
+    if args.max_rss_mb is not None and summary["rss_mb"] > args.max_rss_mb:
+        failed.append(f"RSS {summary['rss_mb']} MB > {args.max_rss_mb} MB")
+    for msg in failed:
+        print(f"[ERROR] {msg}", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
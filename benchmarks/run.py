@@ -0,0 +1,324 @@
+# benchmarks/run.py
+# 마이크로벤치마크 모음: 분류 / 청킹 / 규칙 추출 / 반복 줄 제거 / 적재 / 유사 문항 / Flask 엔드포인트
+# 실행: python -m benchmarks.run [--quick] [--only classify,api] [--save base.json]
+#       python -m benchmarks.run --compare base.json [--threshold 0.25]   → 느려진 항목이 있으면 exit 1
+# 임시 디렉터리의 SQLite DB / 인덱스 파일을 사용하므로 실제 data/ 는 건드리지 않음
+# 필요한 패키지(pdf2image 등)가 없어 측정하지 못한 항목은 결과의 "skipped" 에 이유와 함께 기록
+# api: POST /admin/upload 는 파싱 작업을 띄우므로 제외 (parse_pdf 항목이 대신 측정),
+#      /admin/jobs/<id>, /admin/jobs/<id>/events 는 없는 작업 id 로 조회 경로(404)만 측정
+import os, io, sys, json, time, argparse, tempfile, platform, statistics, subprocess
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHES = {}   # 이름 → 함수(ctx) → {결과 이름: 측정값}
+
+
+def bench(name):
+    def register(fn):
+        BENCHES[name] = fn
+        return fn
+    return register
+
+
+def measure(fn, number, repeat=7, per=1, warmup=1):
+    """fn()을 number번씩 repeat회 실행 → 1회(또는 per개 항목)당 시간 중앙값·최솟값"""
+    for _ in range(warmup):
+        fn()
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - t0) / (number * per))
+    med = statistics.median(runs)
+    return {"median_us": round(med * 1e6, 3), "min_us": round(min(runs) * 1e6, 3),
+            "ops_per_sec": round(1 / med, 1) if med else None, "number": number * per, "repeat": repeat}
+
+
+def skip(ctx, name, reason):
+    """측정하지 못한 항목 기록 (결과 출력 / 저장 JSON 의 skipped 에 표시)"""
+    ctx["skipped"][name] = str(reason)
+
+
+# -----------------------
+# 벤치마크
+# -----------------------
+@bench("classify")
+def bench_classify(ctx):
+    from classify import classify_category_subcategory
+    stems = [q["stem"] for q in ctx["bank"]]
+    return {"classify_category_subcategory": measure(
+        lambda: [classify_category_subcategory(s) for s in stems], 1, per=len(stems))}
+
+
+@bench("text")
+def bench_text(ctx):
+    from rule_extract import extract_questions
+    from boilerplate import BoilerplateFilter
+    pages = ctx["pages"]
+
+    def strip():
+        for _ in BoilerplateFilter().filter_pages((i, None, t) for i, t in enumerate(pages, 1)):
+            pass
+
+    out = {
+        "rule_extract": measure(lambda: [extract_questions(p) for p in pages], 1, per=len(pages)),
+        "boilerplate_filter": measure(strip, 1, per=len(pages)),
+    }
+    try:
+        from pdf_parser import chunk_text   # pdf2image 가 모듈 수준 import
+    except ImportError as e:
+        skip(ctx, "chunk_text", e)
+        return out
+    out["chunk_text"] = measure(lambda: [chunk_text(p, max_chars=1500) for p in pages], 1, per=len(pages))
+    return out
+
+
+@bench("ingest")
+def bench_ingest(ctx):
+    from ingest import ingest_items, ingest_questions
+    from benchmarks.synthetic import make_question_bank
+    n = len(ctx["bank"]) // 5
+    seeds = iter(range(1000, 2000))
+    # 새 문항 적재 (매번 다른 시드 → INSERT 경로) / 같은 파일 재업로드 (해시 일치 → 건너뜀 경로)
+    insert = measure(lambda: ingest_items(make_question_bank(n, seed=next(seeds)), source_name="bench"),
+                     1, repeat=3, per=n)
+    again = make_question_bank(n, seed=999)
+    ingest_items(again, source_name="bench")
+    reupload = measure(lambda: ingest_items(again, source_name="bench"), 1, repeat=3, per=n)
+
+    # JSON 파일 스트리밍 적재 (iter_json_array + 적재): 실행마다 새 문항 파일 / 같은 파일 재적재
+    paths = []
+    for seed in range(3000, 3004):   # warmup 1 + repeat 3
+        path = os.path.join(ctx["workdir"], f"bench_bank_{seed}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(make_question_bank(n, seed=seed), f, ensure_ascii=False)
+        paths.append(path)
+    files = iter(paths)
+    file_insert = measure(lambda: ingest_questions(next(files), source_name="bench-file"), 1, repeat=3, per=n)
+    file_reupload = measure(lambda: ingest_questions(paths[0], source_name="bench-file"), 1, repeat=3, per=n)
+    return {"ingest_items.insert": insert, "ingest_items.reupload": reupload,
+            "ingest_questions.insert": file_insert, "ingest_questions.reupload": file_reupload}
+
+
+@bench("similar")
+def bench_similar(ctx):
+    import numpy as np
+    import similarity
+    from similarity import similar_questions, question_text, VectorIndex
+
+    bank = ctx["bank"][:200]
+    ids = ctx["ids"][:200]
+    qs = list(zip(ids, bank))
+    it = iter(qs * 1000)
+
+    def one():
+        qid, q = next(it)
+        similar_questions(question_text(q["stem"], q["options"]), k=3, exclude_db_id=qid,
+                          category=q["category"], subcategory=q["subcategory"])
+
+    mode = "embedding" if similarity._ready_index(wait=True) is not None else "category"
+    out = {f"similar_questions.{mode}": measure(one, 50)}
+
+    # 모델 없이 행렬 검색만 (384차원 임의 벡터)
+    rng = np.random.default_rng(0)
+    n = len(ctx["bank"]) * 4
+    vecs = rng.standard_normal((n, 384)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    index = VectorIndex(path=os.path.join(ctx["workdir"], "bench_vectors.npz"))
+    cats = ["Networking", "Compute", "Storage"]
+    index.add([(i, "", cats[i % 3], "sub", "") for i in range(n)], vecs=vecs)
+    query = vecs[:32]
+    out[f"vector_index.search.{n}"] = measure(lambda: index.search(query, k=3, category="Compute"), 10, per=32)
+    return out
+
+
+@bench("api")
+def bench_api(ctx):
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+    qid = ctx["ids"][len(ctx["ids"]) // 2]
+    etag = client.get("/api/questions?limit=20").headers.get("ETag")
+
+    gets = [
+        "/", "/quiz", "/wrong",
+        f"/api/question?id={qid}",
+        "/api/question?category=Networking",
+        f"/api/next?current_id={qid}",
+        "/api/questions?limit=20",
+        f"/api/questions?limit=20&after={qid}&category=Storage",
+        "/api/categories",
+        "/api/search?q=storage",
+        "/api/search?q=구성",
+        "/api/wrong_only?user_id=bench",
+        "/api/due?user_id=bench",
+        "/api/stats?user_id=bench",
+        "/admin/upload", "/admin/jobs", "/admin/jobs/bench", "/admin/jobs/bench/events",
+        "/admin/duplicates", "/admin/attempt_log", "/admin/cache", "/admin/worker", "/metrics",
+    ]
+    out = {}
+    for path in gets:
+        out[f"GET {path}"] = measure(lambda p=path: client.get(p), 30)
+    out["GET /api/questions (304)"] = measure(
+        lambda: client.get("/api/questions?limit=20", headers={"If-None-Match": etag}), 30)
+    answer = {"question_id": qid, "chosen": "A", "user_id": "bench"}
+    out["POST /api/answer"] = measure(lambda: client.post("/api/answer", json=answer), 30)
+    out["POST /api/review_add"] = measure(
+        lambda: client.post("/api/review_add", json={"question_id": qid, "user_id": "bench"}), 30)
+    return out
+
+
+@bench("parse_pdf")
+def bench_parse_pdf(ctx):
+    """텍스트 레이어 PDF → 규칙 추출 (OCR/LLM 없음). pdf2image/pdfplumber 없으면 건너뜀"""
+    try:
+        from pdf_parser import parse_pdf
+        from benchmarks.synthetic import make_question_bank, make_pages, make_text_pdf
+    except ImportError as e:
+        skip(ctx, "parse_pdf.text_layer", e)
+        return {}
+    pages = make_pages(make_question_bank(80, seed=7, en_ratio=1.0), per_page=4)
+    path = make_text_pdf(os.path.join(ctx["workdir"], "bench_text.pdf"), pages)
+    out_json = os.path.join(ctx["workdir"], "bench_text.json")
+    return {"parse_pdf.text_layer": measure(
+        lambda: parse_pdf(path, out_json, use_llm=False, use_cache=False), 1, repeat=3, per=len(pages))}
+
+
+# -----------------------
+# 준비 / 실행
+# -----------------------
+def _isolate(workdir):
+    """프로젝트 모듈 import 전에 DB/인덱스/캐시 경로를 임시 디렉터리로"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'data', 'bench.db')}"
+    os.environ["EMBEDDING_INDEX_PATH"] = os.path.join(workdir, "data", "embeddings.npz")
+    os.environ["MINHASH_INDEX_PATH"] = os.path.join(workdir, "data", "minhash.npz")
+    os.environ["EXTRACT_CACHE_PATH"] = os.path.join(workdir, "data", "cache", "extract_cache.db")
+    os.environ.setdefault("EXTRACT_WORKER", "0")
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.chdir(workdir)   # ./data/... 상대 경로(업로드, 실패 기록 등)도 임시 디렉터리로
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def _prepare(n):
+    from db import init_db, SessionLocal
+    from ingest import ingest_items
+    from models import Question
+    from benchmarks.synthetic import make_question_bank, make_pages
+
+    bank = make_question_bank(n, seed=0)
+    init_db()
+    ingest_items(bank, source_name="bench-seed")
+    db = SessionLocal()
+    try:
+        ids = [qid for (qid,) in db.query(Question.id).filter(Question.source == "bench-seed")
+               .order_by(Question.id)]
+    finally:
+        db.close()
+    return {"bank": bank, "ids": ids, "pages": make_pages(bank, per_page=4)}
+
+
+def _meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "machine": platform.machine(), "platform": platform.platform(), "questions": args.questions}
+
+
+def compare(results, baseline, threshold, skipped=None):
+    """기준선 대비 최솟값 비율(잡음이 가장 적음) → 느려진 항목 목록"""
+    regressions = []
+    base = baseline["results"]
+    skipped = skipped or {}
+    print(f"\n기준선 비교 (commit {baseline['meta'].get('commit')}, 허용 +{threshold:.0%})")
+    for name, cur in results.items():
+        if name not in base:
+            continue
+        ratio = cur["min_us"] / base[name]["min_us"] if base[name]["min_us"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ✗ 느려짐"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  ✓ 빨라짐"
+        print(f"  {name:<52} {base[name]['min_us']:>11.1f} → {cur['min_us']:>11.1f} us  x{ratio:.2f}{flag}")
+    for name in sorted(set(base) & set(skipped)):
+        print(f"  {name:<52} 이번 실행에서 건너뜀 ({skipped[name]}) → 비교 안 함")
+    missing = len(set(base) - set(results) - set(skipped))
+    if missing:
+        print(f"  (기준선에만 있는 항목 {missing}개는 비교 생략)")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="마이크로벤치마크")
+    ap.add_argument("--questions", type=int, default=None, help="합성 문항 수 (기본 5000, --quick 1000)")
+    ap.add_argument("--quick", action="store_true")
+    ap.add_argument("--only", help=f"쉼표로 구분 ({', '.join(BENCHES)})")
+    ap.add_argument("--save", help="결과 JSON 저장 경로 (기준선으로 사용)")
+    ap.add_argument("--compare", help="비교할 기준선 JSON")
+    ap.add_argument("--threshold", type=float, default=0.25, help="이 비율 이상 느려지면 회귀 (기본 0.25)")
+    ap.add_argument("--verbose", action="store_true", help="모듈 로그([INFO]) 출력")
+    args = ap.parse_args()
+    args.questions = args.questions or (1000 if args.quick else 5000)
+    if args.save:
+        args.save = os.path.abspath(args.save)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+
+    names = args.only.split(",") if args.only else list(BENCHES)
+    unknown = [n for n in names if n not in BENCHES]
+    if unknown:
+        ap.error(f"알 수 없는 벤치마크: {unknown}")
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    _isolate(workdir)
+    quiet = (lambda: io.StringIO()) if not args.verbose else (lambda: sys.stdout)
+
+    with redirect_stdout(quiet()):
+        ctx = _prepare(args.questions)
+    ctx["workdir"] = workdir
+    ctx["skipped"] = {}
+    print(f"[INFO] 합성 문항 {len(ctx['ids'])}개, 작업 디렉터리 {workdir}")
+
+    results, skipped = {}, ctx["skipped"]
+    for name in names:
+        t0 = time.perf_counter()
+        before = set(skipped)
+        try:
+            with redirect_stdout(quiet()):
+                out = BENCHES[name](ctx)
+        except ImportError as e:
+            skipped[name] = str(e)
+            print(f"[WARN] {name}: 건너뜀 ({e})")
+            continue
+        results.update(out)
+        print(f"\n[{name}] ({time.perf_counter() - t0:.1f}s)")
+        for key, r in out.items():
+            print(f"  {key:<52} {r['median_us']:>11.1f} us  {r['ops_per_sec'] or 0:>12,.0f}/s")
+        for key in sorted(set(skipped) - before):
+            print(f"  {key:<52} 건너뜀 ({skipped[key]})")
+
+    report = {"meta": _meta(args), "results": results, "skipped": skipped}
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n[INFO] 결과 저장: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, skipped)
+        if regressions:
+            print(f"[ERROR] 회귀 {len(regressions)}건: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/synthetic.py
+# 벤치마크용 합성 데이터: 문항 은행 / OCR 페이지 텍스트 / 텍스트·이미지 PDF
+# 예: python -m benchmarks.synthetic --questions 5000 --out data/bench/bank.json --text-pdf data/bench/text.pdf
+import os, json, random, argparse
+from classify import RULES
+
+_KO_LEAD = ["회사에 Azure 구독이 있습니다.", "관리자가 새 환경을 구성하려고 합니다.", "Contoso는 온-프레미스 워크로드를 이전합니다.",
+            "다음 요구 사항을 충족해야 합니다.", "관리 작업을 최소화해야 합니다.", "비용을 최소화해야 합니다."]
+_KO_ASK = ["무엇을 사용해야 합니까?", "어떤 작업을 수행해야 합니까?", "무엇을 구성해야 합니까?", "어떤 방법을 권장해야 합니까?"]
+_EN_LEAD = ["You have an Azure subscription.", "Your company plans to migrate workloads to Azure.",
+            "Contoso has a hybrid environment.", "The solution must minimize administrative effort.",
+            "You need to meet the following requirements."]
+_EN_ASK = ["What should you use?", "What should you configure?", "Which action should you perform first?",
+           "What should you recommend?"]
+_DISTRACT = ["Azure Advisor", "Azure Monitor", "Network Watcher", "Traffic Manager", "Azure Policy",
+             "Log Analytics workspace", "Recovery Services vault", "Application Gateway", "Azure DNS",
+             "management group", "resource lock", "Azure Bastion", "availability set", "storage account"]
+_ADS = ["좋은 품질 당신은 가질 가치가 있다", "https://www.siheom.kr",
+        "우리는 고객에게 덤프가 항상 최신이며 일주일에 한 번꼴로 업데이트하도록 보장합니다"]
+
+
+def _terms(rule):
+    """RULES 한 줄 → (대분류, [(소분류, 대표 키워드)])"""
+    category, triggers, subs, default = rule
+    pairs = [(sub, kws[0]) for sub, kws in subs] + [(default, triggers[0])]
+    return category, pairs
+
+
+def make_question_bank(n, categories=None, seed=0, en_ratio=0.5, dup_ratio=0.0):
+    """
+    n개 문항 (대분류 × 소분류 키워드가 들어간 한/영 지문 + 보기 4개 + 정답/해설)
+    dup_ratio: 이 비율만큼 앞 문항을 살짝 바꾼 근사 중복으로 채움
+    → [{"stem", "options", "answer", "explanation", "category", "subcategory"}, ...]
+    """
+    rng = random.Random(seed)
+    rules = [_terms(r) for r in RULES if not categories or r[0] in categories]
+    items = []
+    for i in range(n):
+        if items and rng.random() < dup_ratio:
+            base = dict(rng.choice(items))
+            base["stem"] = base["stem"].replace(".", ". ", 1) + " "
+            items.append(base)
+            continue
+        category, pairs = rng.choice(rules)
+        sub, term = rng.choice(pairs)
+        en = rng.random() < en_ratio
+        lead, ask = (_EN_LEAD, _EN_ASK) if en else (_KO_LEAD, _KO_ASK)
+        body = " ".join(rng.sample(lead, rng.randint(2, len(lead))))
+        need = (f"You need to configure {term} for app{i}." if en
+                else f"app{i}에 대해 {term} 을(를) 구성해야 합니다.")
+        stem = f"{body} {need} {rng.choice(ask)}"
+        answer = rng.choice("ABCD")
+        opts = rng.sample(_DISTRACT, 3)
+        opts.insert("ABCD".index(answer), term)
+        items.append({
+            "stem": stem,
+            "options": dict(zip("ABCD", opts)),
+            "answer": answer,
+            "explanation": f"{term} 는 {sub} 영역의 기능입니다.",
+            "category": category,
+            "subcategory": sub,
+        })
+    return items
+
+
+def format_page(items, start_no=1, ads=True, seed=0):
+    """문항들을 OCR 페이지 텍스트처럼 (번호/보기/정답/해설 + 머리말·꼬리말 광고)"""
+    rng = random.Random(seed)
+    lines = list(_ADS[:2]) if ads else []
+    for no, q in enumerate(items, start=start_no):
+        lines.append(f"{no}. {q['stem']}")
+        lines += [f"{k}. {v}" for k, v in q["options"].items()]
+        lines.append(f"정답: {q['answer']}")
+        if rng.random() < 0.7:
+            lines.append(f"해설: {q['explanation']}")
+    if ads:
+        lines += [_ADS[2], f"- {start_no} -"]
+    return "\n".join(lines)
+
+
+def make_pages(items, per_page=4, ads=True):
+    return [format_page(items[i:i + per_page], start_no=i + 1, ads=ads, seed=i)
+            for i in range(0, len(items), per_page)]
+
+
+# -----------------------
+# PDF 생성
+# -----------------------
+def _pdf_escape(s):
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_text_pdf(path, pages):
+    """
+    텍스트 레이어가 있는 PDF (의존성 없이 직접 작성, Helvetica → ASCII만 표시).
+    한글이 섞인 텍스트는 영어 문항(en_ratio=1)으로 만들 것.
+    """
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None]
+    font = 3 + 2 * len(pages)
+    kids = []
+    for i, text in enumerate(pages):
+        lines = [l.encode("ascii", "replace").decode() for l in text.splitlines()]
+        ops = " ".join(f"({_pdf_escape(l[:110])}) Tj T*" for l in lines)
+        stream = f"BT /F1 9 Tf 40 800 Td 11 TL {ops} ET"
+        kids.append(f"{3 + 2 * i} 0 R")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * i} 0 R "
+                    f"/Resources << /Font << /F1 {font} 0 R >> >> >>")
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>"
+    objs.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out, offsets = "%PDF-1.4\n", []
+    for i, obj in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="latin-1") as f:
+        f.write(out)
+    return path
+
+
+def make_image_pdf(path, pages, dpi=100, font_path=None):
+    """
+    텍스트 레이어 없는(스캔본 같은) PDF: 페이지 텍스트를 이미지로 그려 저장 (Pillow 필요).
+    font_path: 한글 TTF 경로 (없으면 기본 글꼴 → 한글은 네모로 그려짐)
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    size = (int(8.27 * dpi), int(11.69 * dpi))
+    font = ImageFont.truetype(font_path, max(10, dpi // 8)) if font_path else ImageFont.load_default()
+    images = []
+    for text in pages:
+        img = Image.new("L", size, 255)
+        draw = ImageDraw.Draw(img)
+        y = dpi // 3
+        for line in text.splitlines():
+            draw.text((dpi // 3, y), line[:120], fill=0, font=font)
+            y += max(12, dpi // 7)
+        images.append(img.convert("RGB"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    return path
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="합성 문항 은행 / PDF 생성")
+    ap.add_argument("--questions", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--en-ratio", type=float, default=0.5)
+    ap.add_argument("--out", default="data/bench/bank.json", help="문항 JSON (ingest_questions 입력 형식)")
+    ap.add_argument("--per-page", type=int, default=4)
+    ap.add_argument("--text-pdf", help="텍스트 레이어 PDF 경로 (영어 문항으로 생성)")
+    ap.add_argument("--image-pdf", help="이미지 전용 PDF 경로 (OCR 경로 측정용, Pillow 필요)")
+    ap.add_argument("--font", help="이미지 PDF에 쓸 TTF 글꼴")
+    args = ap.parse_args()
+
+    bank = make_question_bank(args.questions, seed=args.seed, en_ratio=args.en_ratio)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(bank, f, ensure_ascii=False)
+    print(f"[INFO] 문항 {len(bank)}개 → {args.out}")
+    if args.text_pdf:
+        en = make_question_bank(args.questions, seed=args.seed, en_ratio=1.0)
+        make_text_pdf(args.text_pdf, make_pages(en, args.per_page))
+        print(f"[INFO] 텍스트 PDF → {args.text_pdf}")
+    if args.image_pdf:
+        make_image_pdf(args.image_pdf, make_pages(bank, args.per_page), font_path=args.font)
+        print(f"[INFO] 이미지 PDF → {args.image_pdf}")
@@ -0,0 +1,115 @@
+import os, re
+from collections import Counter, deque
+from rule_extract import QUESTION_START, OPTION_LINE, OPTION_CIRCLED, ANSWER, EXPLANATION
+
+# -----------------------
+# 반복 머리말/꼬리말·광고·워터마크 줄 제거 (LLM 입력 토큰 절감)
+# -----------------------
+# 문서 단위로 정규화한 줄의 등장 페이지 수를 세고, 여러 페이지에 반복되는 줄과
+# 알려진 URL/쪽번호/저작권 패턴을 청킹 전에 제거.
+# 페이지는 순서대로 흘려보내야 하므로(페이지 단위 적재) lookahead 창만큼 모아 두고 판단.
+ENABLED = os.getenv("BOILERPLATE_FILTER", "1") not in ("0", "false")
+WINDOW = int(os.getenv("BOILERPLATE_WINDOW", "8"))           # 판단 전에 미리 볼 페이지 수
+MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))     # 최소 이만큼의 페이지에 나와야 반복 줄
+MIN_RATIO = float(os.getenv("BOILERPLATE_MIN_RATIO", "0.5")) # 본 페이지 중 이 비율 이상에 나와야 반복 줄
+EDGE_LINES = int(os.getenv("BOILERPLATE_EDGE_LINES", "4"))   # 반복 판단은 페이지 위/아래 N줄만
+
+# 페이지 위치와 상관없이 지우는 줄 (줄 전체가 해당할 때만)
+KNOWN_PATTERNS = [
+    re.compile(r"^\W*(?:https?://|www\.)\S+\W*$", re.IGNORECASE),                         # URL만 있는 줄
+    re.compile(r"^\W*(?:©|copyright\b|\(c\)\s*\d{4}|all rights reserved)", re.IGNORECASE),  # 저작권
+    re.compile(r"^\W*$"),                                                                  # 글자 없는 OCR 잡음
+]
+_extra = os.getenv("BOILERPLATE_PATTERNS")   # 추가 패턴 (정규식, "||" 로 구분)
+if _extra:
+    KNOWN_PATTERNS += [re.compile(p, re.IGNORECASE) for p in _extra.split("||") if p]
+
+# 페이지 위/아래 EDGE_LINES 줄에서만 지우는 줄 (본문의 숫자 보기/정답 줄은 유지)
+EDGE_PATTERNS = [
+    re.compile(r"^[\s\-–—]*(?:page|p\.)?\s*\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?[\s\-–—]*$",
+               re.IGNORECASE),                                                             # 쪽 번호
+]
+
+
+def normalize_line(line):
+    """비교용 정규화: 소문자, 숫자 → 0, 공백/기호 제거 (쪽 번호만 다른 꼬리말도 같은 줄)"""
+    return re.sub(r"[\W_]+", "", re.sub(r"\d+", "0", line.lower()))
+
+
+def _is_content(line):
+    """문항 구조를 이루는 줄은 반복돼도 지우지 않음 (번호/보기(A~F, ①~⑥)/정답/해설, 질문 문장)"""
+    s = line.strip()
+    return bool(QUESTION_START.match(s) or OPTION_LINE.match(s) or OPTION_CIRCLED.match(s)
+                or ANSWER.match(s) or EXPLANATION.match(s) or s.endswith("?"))
+
+
+def _edge_keys(text, edge=EDGE_LINES):
+    lines = [l for l in text.splitlines() if l.strip()]
+    edges = lines[:edge] + lines[-edge:] if len(lines) > 2 * edge else lines
+    return {k for k in (normalize_line(l) for l in edges if not _is_content(l)) if k}
+
+
+class BoilerplateFilter:
+    """
+    filter_pages(page_iter): (page_idx, img_path, text) 스트림을 받아 반복 줄을 지운 같은 형태로 반환.
+    count_tokens가 있으면 절감 토큰 수도 집계.
+    """
+
+    def __init__(self, window=WINDOW, min_pages=MIN_PAGES, min_ratio=MIN_RATIO, count_tokens=None):
+        self.window = window
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.count_tokens = count_tokens or len
+        self.unit = "토큰" if count_tokens else "글자"
+        self.seen = Counter()       # 정규화한 줄 → 등장 페이지 수
+        self.pages = 0
+        self.stats = {"lines": 0, "chars": 0, "tokens": 0, "tokens_before": 0}
+
+    def _repeated(self, key):
+        n = self.seen[key]
+        return n >= self.min_pages and n >= self.min_ratio * self.pages
+
+    def clean(self, text):
+        kept, removed = [], []
+        lines = text.splitlines()
+        nonblank = [i for i, l in enumerate(lines) if l.strip()]
+        edge = set(nonblank[:EDGE_LINES] + nonblank[-EDGE_LINES:])
+        for i, line in enumerate(lines):
+            if not line.strip():
+                kept.append(line)
+                continue
+            s = line.strip()
+            if any(p.match(s) for p in KNOWN_PATTERNS) or (
+                    i in edge and not _is_content(s)
+                    and (any(p.match(s) for p in EDGE_PATTERNS) or self._repeated(normalize_line(s)))):
+                removed.append(line)
+            else:
+                kept.append(line)
+        cleaned = re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip("\n")
+
+        before = self.count_tokens(text)
+        self.stats["tokens_before"] += before
+        if removed:
+            self.stats["lines"] += len(removed)
+            self.stats["chars"] += len(text) - len(cleaned)
+            self.stats["tokens"] += before - self.count_tokens(cleaned)
+        return cleaned
+
+    def filter_pages(self, page_iter):
+        buffer = deque()
+        for page_idx, img_path, text in page_iter:
+            self.seen.update(_edge_keys(text or ""))
+            self.pages += 1
+            buffer.append((page_idx, img_path, text or ""))
+            # 뒤 페이지를 window 만큼 본 뒤에 앞 페이지를 판단
+            if len(buffer) > self.window:
+                idx, path, t = buffer.popleft()
+                yield idx, path, self.clean(t)
+        while buffer:
+            idx, path, t = buffer.popleft()
+            yield idx, path, self.clean(t)
+
+    def report(self):
+        s = self.stats
+        pct = 100 * s["tokens"] / s["tokens_before"] if s["tokens_before"] else 0
+        print(f"[INFO] 반복 줄 제거: {s['lines']}줄 → {self.unit} {s['tokens']}개 절감 ({pct:.1f}%)")
@@ -1,4 +1,5 @@
-from db import SessionLocal, Question
+from db import SessionLocal
+from models import Question
 
 db = SessionLocal()
 print("총 문항 수:", db.query(Question).count())
@@ -1,6 +1,9 @@
 # classify.py
-import re
-from typing import Tuple
+import re, argparse
+from collections import defaultdict
+from functools import lru_cache
+from typing import Tuple, List, Iterable
+from sqlalchemy import select, update
 
 # 대분류 상수
 ID_GOV = "Identities & Governance"
@@ -9,81 +12,181 @@ COMPUTE = "Compute"
 NETWORK = "Networking"
 MONITOR = "Monitoring & Maintenance"
 
-def _contains(text: str, *words) -> bool:
-    t = text.lower()
-    return any(w.lower() in t for w in words)
+# -----------------------
+# 규칙 테이블 (위에서부터 우선순위)
+# (대분류, 대분류 판정 키워드, [(소분류, 키워드), ...], 기본 소분류)
+# -----------------------
+RULES = [
+    (NETWORK,
+     ("vnet", "subnet", "cidr", "peering", "nsg", "application security group",
+      "bastion", "azure firewall", "udr", "route table", "vpn", "expressroute"),
+     [("VNet Peering", ("peering",)),
+      ("NSG/ASG", ("nsg", "application security group")),
+      ("Hybrid Connectivity", ("vpn", "expressroute")),
+      ("Bastion", ("bastion",)),
+      ("Routing/UDR", ("route", "udr"))],
+     "VNet/Subnet"),
+    (COMPUTE,
+     ("virtual machine", "vm", "vmss", "scale set", "availability set", "image", "managed disk"),
+     [("VM Scale Set", ("scale set", "vmss")),
+      ("Availability/Resiliency", ("availability set", "availability zone")),
+      ("Image/Template", ("image",)),
+      ("Disks/Snapshots", ("disk",))],
+     "VM Deployment/Config"),
+    (STORAGE,
+     ("storage account", "blob", "file share", "azure files", "sas", "lrs", "grs", "access tier"),
+     [("Blob", ("blob",)),
+      ("Azure Files/SMB", ("file share", "azure files", "files sync")),
+      ("Security/Access", ("sas", "firewall", "private endpoint")),
+      ("Redundancy", ("lrs", "grs", "gzs", "zrs")),
+      ("Tiering", ("access tier", "hot", "cool", "archive"))],
+     "General"),
+    (ID_GOV,
+     ("azure ad", "entra id", "rbac", "role assignment", "subscription", "policy", "blueprint"),
+     [("RBAC", ("rbac", "role")),
+      ("Policy/Blueprint", ("policy", "blueprint", "initiative", "assignment")),
+      ("Subscription/MG", ("subscription", "management group")),
+      ("Users/Groups", ("user", "group", "entra"))],
+     "General"),
+    (MONITOR,
+     ("azure monitor", "metrics", "log analytics", "kusto", "alert", "action group",
+      "backup", "site recovery", "update management"),
+     [("LA/Logs", ("log analytics", "kusto", "workspace")),
+      ("Alerts", ("alert", "action group")),
+      ("Backup/ASR", ("backup", "site recovery")),
+      ("Updates", ("update management", "patch"))],
+     "General"),
+]
+
+# -----------------------
+# 컴파일된 매처 (한 번의 스캔으로 모든 키워드 히트 수집)
+# -----------------------
+# 본문을 영숫자 단어로 한 번 토큰화한 뒤, 단어 → 키워드 단어 매칭은 캐시해서 재사용
+# - 단어 앞 경계 필수: "vm"이 다른 단어 중간에 걸리지 않음 ("VM을" 같은 한글 조사는 허용)
+# - 4글자 이하 단어(vm, nsg, sas, hot ...)는 완전 일치 (복수형 s/es 허용)
+# - 5글자 이상 단어는 접두 일치 유지 (subnet → subnets, route → router)
+_SHORT = 4
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_KEYWORDS = {kw for _, trig, subs, _ in RULES for kw in trig + tuple(k for _, ks in subs for k in ks)}
+_SHORT_WORDS = {w for kw in _KEYWORDS for w in kw.split() if len(w) <= _SHORT}
+_LONG_WORDS = {w for kw in _KEYWORDS for w in kw.split() if len(w) > _SHORT}
+_LONG_MAX = max(map(len, _LONG_WORDS))
+
+# 첫 단어 → [(키워드, 나머지 단어들)]
+_PHRASES = defaultdict(list)
+for _kw in _KEYWORDS:
+    _first, *_rest = _kw.split()
+    _PHRASES[_first].append((_kw, tuple(_rest)))
+
+
+@lru_cache(maxsize=65536)
+def _word_keys(token: str) -> frozenset:
+    """토큰이 해당하는 키워드 단어 집합 (없으면 빈 집합)"""
+    forms = [token]
+    if token.endswith("s"):
+        forms.append(token[:-1])
+        if token.endswith("es"):
+            forms.append(token[:-2])
+    keys = {w for w in forms if w in _SHORT_WORDS}
+    keys.update(token[:n] for n in range(_SHORT + 1, min(len(token), _LONG_MAX) + 1) if token[:n] in _LONG_WORDS)
+    return frozenset(keys)
+
+
+def keyword_hits(text: str) -> set:
+    """텍스트에 등장하는 모든 키워드 집합 (소문자화 1회 + 토큰화 1회)"""
+    word_keys = list(map(_word_keys, _WORD_RE.findall((text or "").lower())))
+    n = len(word_keys)
+    hits = set()
+    for i, keys in enumerate(word_keys):
+        if not keys:
+            continue
+        for w in keys:
+            for kw, rest in _PHRASES[w]:
+                if i + len(rest) < n and all(r in word_keys[i + 1 + j] for j, r in enumerate(rest)):
+                    hits.add(kw)
+    return hits
+
 
 def classify_category_subcategory(stem: str) -> Tuple[str, str]:
     """문항 본문 텍스트(stem)로 대/소분류를 추정"""
-    s = stem or ""
-
-    # --- Networking ---
-    if _contains(s, "vnet", "subnet", "cidr", "peering", "nsg", "application security group",
-                    "bastion", "azure firewall", "udr", "route table", "vpn", "expressroute"):
-        if _contains(s, "peering"):
-            return NETWORK, "VNet Peering"
-        if _contains(s, "nsg", "application security group"):
-            return NETWORK, "NSG/ASG"
-        if _contains(s, "vpn", "expressroute"):
-            return NETWORK, "Hybrid Connectivity"
-        if _contains(s, "bastion"):
-            return NETWORK, "Bastion"
-        if _contains(s, "route", "udr"):
-            return NETWORK, "Routing/UDR"
-        return NETWORK, "VNet/Subnet"
-
-    # --- Compute ---
-    if _contains(s, "virtual machine", "vm", "scale set", "availability set", "image", "managed disk"):
-        if _contains(s, "scale set", "vmss"):
-            return COMPUTE, "VM Scale Set"
-        if _contains(s, "availability set", "availability zone"):
-            return COMPUTE, "Availability/Resiliency"
-        if _contains(s, "image"):
-            return COMPUTE, "Image/Template"
-        if _contains(s, "disk"):
-            return COMPUTE, "Disks/Snapshots"
-        return COMPUTE, "VM Deployment/Config"
-
-    # --- Storage ---
-    if _contains(s, "storage account", "blob", "file share", "azure files", "sas", "lrs", "grs", "access tier"):
-        if _contains(s, "blob"):
-            return STORAGE, "Blob"
-        if _contains(s, "file share", "azure files", "files sync"):
-            return STORAGE, "Azure Files/SMB"
-        if _contains(s, "sas", "firewall", "private endpoint"):
-            return STORAGE, "Security/Access"
-        if _contains(s, "lrs", "grs", "gzs", "zrs"):
-            return STORAGE, "Redundancy"
-        if _contains(s, "access tier", "hot", "cool", "archive"):
-            return STORAGE, "Tiering"
-        return STORAGE, "General"
-
-    # --- Identities & Governance ---
-    if _contains(s, "azure ad", "entra id", "rbac", "role assignment", "subscription", "policy", "blueprint"):
-        if _contains(s, "rbac", "role"):
-            return ID_GOV, "RBAC"
-        if _contains(s, "policy", "blueprint", "initiative", "assignment"):
-            return ID_GOV, "Policy/Blueprint"
-        if _contains(s, "subscription", "management group"):
-            return ID_GOV, "Subscription/MG"
-        if _contains(s, "user", "group", "entra"):
-            return ID_GOV, "Users/Groups"
-        return ID_GOV, "General"
-
-    # --- Monitoring & Maintenance ---
-    if _contains(s, "azure monitor", "metrics", "log analytics", "kusto", "alert", "action group",
-                 "backup", "site recovery", "update management"):
-        if _contains(s, "log analytics", "kusto", "workspace"):
-            return MONITOR, "LA/Logs"
-        if _contains(s, "alert", "action group"):
-            return MONITOR, "Alerts"
-        if _contains(s, "backup", "site recovery"):
-            return MONITOR, "Backup/ASR"
-        if _contains(s, "update management", "patch"):
-            return MONITOR, "Updates"
-        return MONITOR, "General"
+    hits = keyword_hits(stem)
+    if not hits:
+        return "Unknown", "Unknown"
+    for category, triggers, subs, default in RULES:
+        if hits.isdisjoint(triggers):
+            continue
+        for sub, kws in subs:
+            if not hits.isdisjoint(kws):
+                return category, sub
+        return category, default
 
     # 기타
     return "Unknown", "Unknown"
 
-## 규칙 기반 키워드 매칭. ( 향후 LLM 분류 가능 )
\ No newline at end of file
+
+def classify_many(stems: Iterable[str]) -> List[Tuple[str, str]]:
+    """여러 문항 일괄 분류"""
+    return [classify_category_subcategory(s) for s in stems]
+
+
+# -----------------------
+# 전체 재분류 (배치 + bulk update)
+# -----------------------
+def reclassify_all(batch_size=1000, only_missing=False):
+    """
+    questions 테이블을 id 순으로 batch_size씩 읽어 재분류하고,
+    분류가 바뀐 행만 PK 기준 bulk update 합니다.
+    임베딩 인덱스의 분류 필터도 함께 갱신 (다른 프로세스의 인덱스는 다음 로드 때 DB와 동기화).
+    정답률 집계(user_category_stats)는 풀이 당시 분류 기준으로 유지되며 다시 쓰지 않음
+    (원본 풀이 기록을 정리하지 않았다면 `python user_stats.py --rebuild` 로 새 분류 기준 재집계 가능)
+    """
+    from db import SessionLocal
+    from models import Question
+    from similarity import update_index_categories
+    import facets, question_cache
+
+    db = SessionLocal()
+    scanned = changed = 0
+    try:
+        last_id = 0
+        while True:
+            query = (select(Question.id, Question.stem, Question.category, Question.subcategory)
+                     .where(Question.id > last_id).order_by(Question.id).limit(batch_size))
+            if only_missing:
+                query = query.where((Question.category.is_(None)) | (Question.category == "Unknown"))
+            rows = db.execute(query).all()
+            if not rows:
+                break
+
+            updates = []
+            for r, (cat, sub) in zip(rows, classify_many(r.stem for r in rows)):
+                if (cat, sub) != (r.category, r.subcategory):
+                    updates.append({"id": r.id, "category": cat, "subcategory": sub})
+            if updates:
+                db.execute(update(Question), updates)
+            db.commit()
+            if updates:
+                update_index_categories([(u["id"], u["category"], u["subcategory"]) for u in updates])
+
+            scanned += len(rows)
+            changed += len(updates)
+            last_id = rows[-1].id
+    finally:
+        db.close()
+    if changed:
+        facets.invalidate()
+        question_cache.invalidate()
+
+    print(f"[INFO] 재분류 완료: {scanned}문항 중 {changed}건 변경")
+    return {"scanned": scanned, "changed": changed}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="questions 테이블 대/소분류 일괄 재분류")
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--only-missing", action="store_true", help="분류가 없거나 Unknown인 문항만")
+    args = ap.parse_args()
+    reclassify_all(batch_size=args.batch_size, only_missing=args.only_missing)
+
+## 규칙 기반 키워드 매칭. ( 향후 LLM 분류 가능 )
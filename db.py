@@ -1,18 +1,57 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, inspect, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from dotenv import load_dotenv
+import metrics
 
 # -----------------------
-# DB 설정
+# DB 설정 (.env / 환경 변수)
 # -----------------------
-# data/questions.db 파일을 SQLite 데이터베이스로 사용
-DATABASE_URL = "sqlite:///./data/questions.db"
+load_dotenv()
 
-# SQLite 전용 옵션 (스레드 충돌 방지)
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=False  # True로 하면 SQL 실행 로그가 콘솔에 출력됨
-)
+# 기본은 data/questions.db SQLite 파일
+# 여러 앱 워커가 DB를 공유할 때는 PostgreSQL 사용 (예: postgresql+psycopg2://user:pw@host/cert)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/questions.db")
+
+# 커넥션 풀 설정
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))    # 초, 오래된 연결 재생성 (서버 측 타임아웃 대비)
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+SQL_ECHO = os.getenv("SQL_ECHO", "0") in ("1", "true")    # True로 하면 SQL 실행 로그가 콘솔에 출력됨
+
+_engine_kwargs = dict(pool_pre_ping=True, echo=SQL_ECHO)
+_sqlite_path = DATABASE_URL.split("///", 1)[-1] if DATABASE_URL.startswith("sqlite") else None
+if _sqlite_path is not None:
+    # SQLite 전용 옵션 (스레드 충돌 방지)
+    _engine_kwargs["connect_args"] = {"check_same_thread": False}
+if _sqlite_path not in ("", ":memory:"):
+    # 메모리 DB는 연결 1개 풀(SingletonThreadPool)이라 풀 크기 옵션 없음
+    _engine_kwargs.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                          pool_recycle=POOL_RECYCLE, pool_timeout=POOL_TIMEOUT)
+if _sqlite_path:
+    os.makedirs(os.path.dirname(_sqlite_path) or ".", exist_ok=True)
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs)
+
+# 쿼리 수 집계 (/metrics: 전체 + 요청당)
+if metrics.ENABLED:
+    metrics.install_db_counter(engine)
+
+
+# 연결마다 SQLite PRAGMA 설정
+# - WAL: 쓰기 중에도 읽기가 막히지 않음 ("database is locked" 감소)
+# - synchronous=NORMAL: WAL에서는 커밋마다 fsync 하지 않아도 손상 없음 (체크포인트 시 fsync)
+# - busy_timeout: 잠금 시 바로 실패하지 않고 대기
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _):
+    if engine.dialect.name != "sqlite":
+        return
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA busy_timeout=5000")
+    cur.close()
 
 # 세션팩토리
 SessionLocal = sessionmaker(
@@ -25,15 +64,128 @@ SessionLocal = sessionmaker(
 Base = declarative_base()
 
 # -----------------------
-# DB 초기화 함수
+# DB 초기화 함수 (Alembic 마이그레이션)
 # -----------------------
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def _alembic_config():
+    from alembic.config import Config
+    cfg = Config(ALEMBIC_INI)
+    cfg.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return cfg
+
+
+_LEGACY_TIMESTAMPS = {"questions": ("created_at", "updated_at"), "attempts": ("created_at",)}
+
+
+def _add_legacy_timestamps(insp):
+    """시각 컬럼 도입 전에 만든 DB: 0001 기준 스키마에 맞게 컬럼 추가 (기존 행은 지금 시각으로)"""
+    with engine.begin() as conn:
+        for table, names in _LEGACY_TIMESTAMPS.items():
+            if not insp.has_table(table):
+                continue
+            have = {c["name"] for c in insp.get_columns(table)}
+            for name in names:
+                if name in have:
+                    continue
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} TIMESTAMP")
+                if name == "created_at":
+                    conn.exec_driver_sql(f"UPDATE {table} SET {name} = CURRENT_TIMESTAMP")
+                print(f"[INFO] 기존 DB에 {table}.{name} 컬럼 추가")
+
+
+# 리비전별로 마이그레이션이 만드는 인덱스 (이름, 테이블, 컬럼, 유일 여부)
+_LEGACY_INDEXES = {
+    "0001": [("ix_questions_id", "questions", ("id",), False),
+             ("ix_questions_category", "questions", ("category",), False),
+             ("ix_questions_subcategory", "questions", ("subcategory",), False),
+             ("idx_question_category", "questions", ("category",), False),
+             ("idx_question_subcategory", "questions", ("subcategory",), False),
+             ("ix_attempts_id", "attempts", ("id",), False)],
+    "0002": [("uq_question_content_hash", "questions", ("content_hash",), True),
+             ("ix_questions_duplicate_of", "questions", ("duplicate_of",), False),
+             ("idx_question_cat_sub_id", "questions", ("category", "subcategory", "id"), False),
+             ("idx_attempt_user_question", "attempts", ("user_id", "question_id"), False)],
+    "0003": [("idx_wrong_note_user_last", "wrong_notes", ("user_id", "last_at", "id"), False)],
+    "0004": [("idx_review_card_user_due", "review_cards", ("user_id", "due_at"), False)],
+    "0006": [("idx_attempt_created", "attempts", ("created_at",), False)],
+}
+
+
+def _add_legacy_indexes(insp, revision):
+    """stamp 할 리비전까지의 마이그레이션이 만드는 인덱스 중 없는 것 생성 (stamp 는 마이그레이션을 실행하지 않으므로)"""
+    for rev, indexes in sorted(_LEGACY_INDEXES.items()):
+        if rev > revision:
+            break
+        for name, table, cols, unique in indexes:
+            if not insp.has_table(table) or name in {i["name"] for i in insp.get_indexes(table)}:
+                continue
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+                                         f"{name} ON {table} ({', '.join(cols)})")
+                print(f"[INFO] 기존 DB에 인덱스 {name} 추가")
+            except Exception as e:
+                # 유일 인덱스: 해시가 같은 행이 이미 있으면 실패 → dedup/정리 후 다시 시작하면 생성됨
+                print(f"[WARN] 기존 DB 인덱스 {name} 생성 실패: {e}")
+
+
 def init_db():
     """
-    모델에서 정의한 테이블을 실제 DB에 생성합니다.
-    (이미 존재하는 테이블은 무시됨)
+    마이그레이션을 최신 리비전까지 적용합니다. (alembic upgrade head)
+    예전에 create_all 로 만든 DB는 현재 스키마에 맞는 리비전으로 표시한 뒤 이어서 적용
+    """
+    from alembic import command
+    from models import WrongNote, ReviewCard, UserCategoryStat  # 순환 참조 방지용 import
+    from search import init_search_index
+    from wrong_notes import backfill_wrong_notes
+    from srs import backfill_review_cards
+    from user_stats import backfill_stats
+
+    insp = inspect(engine)
+    cfg = _alembic_config()
+    if insp.has_table("questions") and not insp.has_table("alembic_version"):
+        # 있는 테이블/컬럼으로 어느 리비전까지 반영된 DB인지 판단
+        columns = {c["name"] for c in insp.get_columns("questions")}
+        revision = ("0006" if insp.has_table("user_category_stats") and insp.has_table("question_stats") else
+                    "0004" if insp.has_table("review_cards") else
+                    "0003" if insp.has_table("wrong_notes") else
+                    "0002" if "content_hash" in columns else "0001")
+        _add_legacy_timestamps(insp)
+        _add_legacy_indexes(insp, revision)
+        if revision == "0006":
+            # 0005(PostgreSQL 검색 인덱스)는 테이블로 판단할 수 없음 → IF NOT EXISTS 라 다시 적용해도 안전
+            command.stamp(cfg, "0004")
+            command.upgrade(cfg, "0005")
+        command.stamp(cfg, revision)
+        print(f"[INFO] 기존 DB를 마이그레이션 리비전 {revision}으로 등록")
+
+    # 풀이 기록에서 파생되는 테이블 → 처음 만들 때 기존 기록으로 채움
+    backfills = [fn for model, fn in ((WrongNote, backfill_wrong_notes), (ReviewCard, backfill_review_cards),
+                                      (UserCategoryStat, backfill_stats))
+                 if not insp.has_table(model.__tablename__)]
+    command.upgrade(cfg, "head")
+    init_search_index()  # 전문 검색 인덱스 (SQLite FTS5 테이블 + 동기화 트리거)
+    if insp.has_table("attempts"):
+        for backfill in backfills:
+            backfill()
+
+
+# -----------------------
+# upsert (INSERT ... ON CONFLICT DO UPDATE, SQLite/PostgreSQL)
+# -----------------------
+def upsert_stmt(model, index_elements, set_):
+    """
+    executemany 용 upsert 문 생성. set_(excluded) → 충돌 시 갱신할 {컬럼: 값}
+    예: db.execute(upsert_stmt(M, ["k"], lambda ex: {"v": ex.v}), rows)
     """
-    from models import Question, Attempt  # 순환 참조 방지용 import
-    Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(model)
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded))
 
 
 # -----------------------
@@ -0,0 +1,355 @@
+import os, re, zlib, threading, argparse
+from collections import defaultdict
+import numpy as np
+from sqlalchemy import select, update, delete, func
+from db import SessionLocal
+from models import Question, Attempt, WrongNote, ReviewCard
+import facets
+import question_cache
+from user_stats import merge_question_stats
+
+# -----------------------
+# 설정
+# -----------------------
+NUM_PERM = 128          # MinHash 해시 함수 개수
+BANDS = 16              # LSH 밴드 수 (BANDS * ROWS = NUM_PERM)
+ROWS = NUM_PERM // BANDS
+SHINGLE = 4             # 문자 n-gram 길이 (OCR 오탈자에 강함)
+THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))     # 추정 Jaccard 이상이면 중복
+TAIL_CHARS = 100        # 지문 끝부분 비교 길이 (시리즈 문항: 같은 지문 + 다른 "해결 방법" 문장)
+DEDUP_MODE = os.getenv("DEDUP_MODE", "flag")               # flag: duplicate_of 표시 / merge: 적재하지 않음
+INDEX_PATH = os.getenv("MINHASH_INDEX_PATH", "./data/minhash.npz")
+
+_P = np.uint64(4294967311)   # 2^32 보다 큰 소수
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 2**31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2**31, size=NUM_PERM).astype(np.uint64)
+
+
+# -----------------------
+# MinHash 서명
+# -----------------------
+def normalize_stem(text: str) -> str:
+    """소문자화 + 문장부호/공백 제거 (한글·영문·숫자만 남김)"""
+    return re.sub(r"[^0-9a-z가-힣]+", "", (text or "").lower())
+
+
+def shingles(text: str):
+    t = normalize_stem(text)
+    if len(t) <= SHINGLE:
+        return {t} if t else set()
+    return {t[i:i + SHINGLE] for i in range(len(t) - SHINGLE + 1)}
+
+
+def signature(text: str):
+    """(NUM_PERM,) uint64 서명. 빈 텍스트면 None"""
+    sh = shingles(text)
+    if not sh:
+        return None
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in sh), dtype=np.uint64, count=len(sh))
+    # (a*x + b) mod p 를 해시 함수 NUM_PERM개에 대해 한 번에 계산
+    return ((np.outer(_A, x) + _B[:, None]) % _P).min(axis=1)
+
+
+def fingerprint(stem, options=None, answer=None):
+    """
+    → (지문 서명, 지문 끝부분 서명, 보기+정답 키) 또는 None (빈 지문)
+    지문이 비슷해도 보기/정답이 다르거나 끝부분(해결 방법 등)이 다르면 다른 문항으로 봄
+    """
+    sig = signature(stem)
+    if sig is None:
+        return None
+    tail = signature(normalize_stem(stem)[-TAIL_CHARS:])
+    key = zlib.crc32(f"{normalize_stem(str(options or ''))}|{normalize_stem(answer)}".encode("utf-8"))
+    return sig, tail, key
+
+
+# -----------------------
+# LSH 인덱스
+# -----------------------
+class LSHIndex:
+    """
+    밴드별 버킷으로 후보만 비교 → 전체 쌍 비교(O(n²)) 없이 근사 중복 탐지.
+    canonical[id]: 그 문항이 속한 클러스터의 대표 문항 id
+    후보는 지문 서명으로 찾고, 보기/정답 키와 끝부분 서명까지 일치해야 중복
+    """
+
+    def __init__(self, threshold=THRESHOLD, path=INDEX_PATH):
+        self.threshold = threshold
+        self.path = path
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.sigs = {}
+        self.tails = {}
+        self.keys = {}
+        self.canonical = {}
+        self.buckets = defaultdict(list)
+
+    def _keys(self, sig):
+        return [(b, sig[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+    def query(self, fp):
+        """fp: fingerprint() 결과 → (가장 비슷한 id, 추정 유사도) 또는 None"""
+        sig, tail, qkey = fp
+        best, best_sim = None, 0.0
+        seen = set()
+        with self._lock:
+            for key in self._keys(sig):
+                for qid in self.buckets.get(key, ()):
+                    if qid in seen:
+                        continue
+                    seen.add(qid)
+                    if self.keys[qid] != qkey:
+                        continue
+                    sim = float(np.mean(self.sigs[qid] == sig))
+                    if sim > best_sim and float(np.mean(self.tails[qid] == tail)) >= self.threshold:
+                        best, best_sim = qid, sim
+        if best is not None and best_sim >= self.threshold:
+            return best, best_sim
+        return None
+
+    def add(self, qid, fp, canonical=None):
+        with self._lock:
+            if qid in self.sigs:
+                return
+            self.sigs[qid], self.tails[qid], self.keys[qid] = fp
+            self.canonical[qid] = canonical or qid
+            for key in self._keys(fp[0]):
+                self.buckets[key].append(qid)
+
+    def canonical_of(self, stem, options=None, answer=None):
+        """등록 없이 조회만 → 근사 중복이면 대표 문항 id"""
+        fp = fingerprint(stem, options, answer)
+        if fp is None:
+            return None
+        with self._lock:
+            hit = self.query(fp)
+            return self.canonical[hit[0]] if hit else None
+
+    def check_and_add(self, qid, stem, options=None, answer=None):
+        """새 문항 등록 → 근사 중복이면 대표 문항 id 반환"""
+        fp = fingerprint(stem, options, answer)
+        if fp is None:
+            return None
+        with self._lock:
+            hit = self.query(fp)
+            canonical = self.canonical[hit[0]] if hit else None
+            self.add(qid, fp, canonical)
+        return canonical
+
+    def remove(self, ids):
+        with self._lock:
+            for qid in ids:
+                sig = self.sigs.pop(qid, None)
+                self.tails.pop(qid, None)
+                self.keys.pop(qid, None)
+                self.canonical.pop(qid, None)
+                if sig is None:
+                    continue
+                for key in self._keys(sig):
+                    bucket = self.buckets.get(key)
+                    if bucket and qid in bucket:
+                        bucket.remove(qid)
+
+    # ----- 저장/로드 -----
+    def save(self):
+        with self._lock:
+            ids = np.fromiter(self.sigs.keys(), dtype=np.int64, count=len(self.sigs))
+            empty = np.zeros((0, NUM_PERM), np.uint64)
+            sigs = np.stack([self.sigs[i] for i in ids]) if len(ids) else empty
+            tails = np.stack([self.tails[i] for i in ids]) if len(ids) else empty
+            keys = np.array([self.keys[i] for i in ids], dtype=np.int64)
+            canon = np.array([self.canonical[i] for i in ids], dtype=np.int64)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp.npz"
+            np.savez(tmp, ids=ids, sigs=sigs, tails=tails, keys=keys, canonical=canon)
+            os.replace(tmp, self.path)
+
+    def load(self):
+        """저장된 서명을 읽고 DB와 차이나는 문항만 계산"""
+        with self._lock:
+            if self._loaded:
+                return
+            if os.path.exists(self.path):
+                data = np.load(self.path)
+                if "tails" in data.files:
+                    for qid, sig, tail, key, canon in zip(data["ids"], data["sigs"], data["tails"],
+                                                          data["keys"], data["canonical"]):
+                        self.add(int(qid), (sig, tail, int(key)), int(canon))
+                else:
+                    print(f"[INFO] 예전 형식 MinHash 인덱스 → 다시 계산: {self.path}")
+            db = SessionLocal()
+            try:
+                rows = db.execute(select(Question.id, Question.stem, Question.options,
+                                         Question.answer, Question.duplicate_of)).all()
+            finally:
+                db.close()
+            db_ids = {r.id for r in rows}
+            stale = [qid for qid in self.sigs if qid not in db_ids]
+            self.remove(stale)
+            missing = [r for r in rows if r.id not in self.sigs]
+            for r in missing:
+                fp = fingerprint(r.stem, r.options, r.answer)
+                if fp is not None:
+                    self.add(r.id, fp, r.duplicate_of)
+            if stale or missing:
+                self.save()
+            self._loaded = True
+
+
+_index = LSHIndex()
+
+
+def get_index():
+    _index.load()
+    return _index
+
+
+# -----------------------
+# 적재 시 중복 처리 (ingest에서 호출, 같은 트랜잭션)
+# -----------------------
+def known_duplicate(stem, options=None, answer=None):
+    """insert 전 조회: 이미 인덱스에 있는 문항의 근사 중복이면 대표 id (merge 재적재 시 insert 생략용)"""
+    return get_index().canonical_of(stem, options, answer)
+
+
+def flag_new_questions(db, rows, mode=DEDUP_MODE):
+    """
+    rows: [(id, stem, options, answer), ...] 방금 insert 된 문항
+    flag  → duplicate_of 설정, merge → 중복 문항 삭제
+    → {중복 id: 대표 id}
+    인덱스에는 바로 추가되므로 커밋 후 save_index(), 롤백 시 discard_questions(ids) 호출
+    """
+    index = get_index()
+    dups = {}
+    for qid, stem, options, answer in rows:
+        canonical = index.check_and_add(qid, stem, options, answer)
+        if canonical is not None and canonical != qid:
+            dups[qid] = canonical
+    if not dups:
+        return dups
+    if mode == "merge":
+        db.execute(delete(Question).where(Question.id.in_(list(dups))))
+        index.remove(dups)
+    else:
+        db.execute(update(Question), [{"id": qid, "duplicate_of": c} for qid, c in dups.items()])
+    return dups
+
+
+def discard_questions(ids):
+    """적재 롤백: 커밋되지 않은 문항을 인덱스에서 제거 (SQLite rowid 재사용 시 예전 서명이 남지 않도록)"""
+    if ids:
+        _index.remove(ids)
+
+
+def save_index():
+    """적재 커밋 후 인덱스 저장 (실패해도 다음 load 때 DB와 비교해 다시 계산)"""
+    try:
+        _index.save()
+    except OSError as e:
+        print(f"[WARN] MinHash 인덱스 저장 실패: {e}")
+
+
+# -----------------------
+# 관리자 조회: 중복 클러스터
+# -----------------------
+def duplicate_clusters(limit=20, offset=0):
+    """대표 문항별 중복 목록 (중복 수가 많은 순)"""
+    db = SessionLocal()
+    try:
+        groups = db.execute(
+            select(Question.duplicate_of, func.count().label("n"))
+            .where(Question.duplicate_of.is_not(None))
+            .group_by(Question.duplicate_of)
+            .order_by(func.count().desc(), Question.duplicate_of)
+            .limit(limit).offset(offset)
+        ).all()
+        canon_ids = [g.duplicate_of for g in groups]
+        if not canon_ids:
+            return []
+        members = defaultdict(list)
+        for q in db.query(Question).filter(Question.duplicate_of.in_(canon_ids)).order_by(Question.id):
+            members[q.duplicate_of].append({"id": q.id, "stem": q.stem[:80], "source": q.source})
+        canon = {q.id: q for q in db.query(Question).filter(Question.id.in_(canon_ids))}
+        return [
+            {
+                "canonical_id": cid,
+                "stem": canon[cid].stem[:80] if cid in canon else None,
+                "source": canon[cid].source if cid in canon else None,
+                "count": n,
+                "duplicates": members[cid],
+            }
+            for cid, n in groups
+        ]
+    finally:
+        db.close()
+
+
+def _reassign_per_user(db, model, old_id, new_id):
+    """(user_id, question_id) 유일 테이블을 대표 문항으로 이동 (대표 문항에 이미 행이 있는 사용자는 기존 행 유지)"""
+    taken = select(model.user_id).where(model.question_id == new_id)
+    db.execute(update(model)
+               .where(model.question_id == old_id, model.user_id.not_in(taken))
+               .values(question_id=new_id))
+    db.execute(delete(model).where(model.question_id == old_id))
+
+
+# -----------------------
+# CLI: 기존 DB 전체 중복 제거 (LSH → O(n) 후보 탐색)
+# -----------------------
+def dedup_existing(merge=False, threshold=THRESHOLD, batch_size=1000):
+    index = LSHIndex(threshold=threshold)
+    db = SessionLocal()
+    try:
+        dups = {}
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(Question.id, Question.stem, Question.options, Question.answer)
+                .where(Question.id > last_id).order_by(Question.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for qid, stem, options, answer in rows:
+                canonical = index.check_and_add(qid, stem, options, answer)
+                if canonical is not None and canonical != qid:
+                    dups[qid] = canonical
+            last_id = rows[-1].id
+
+        # 재실행 시 결과가 바뀌지 않도록 기존 표시는 초기화 후 다시 설정
+        db.execute(update(Question).where(Question.duplicate_of.is_not(None)).values(duplicate_of=None))
+        ids = list(dups)
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            if merge:
+                # 풀이 기록은 대표 문항으로 옮긴 뒤 중복 문항 삭제
+                for qid in chunk:
+                    db.execute(update(Attempt).where(Attempt.question_id == qid)
+                               .values(question_id=dups[qid]))
+                    for model in (WrongNote, ReviewCard):
+                        _reassign_per_user(db, model, qid, dups[qid])
+                    merge_question_stats(db, qid, dups[qid])
+                db.execute(delete(Question).where(Question.id.in_(chunk)))
+            else:
+                db.execute(update(Question), [{"id": qid, "duplicate_of": dups[qid]} for qid in chunk])
+        db.commit()
+    finally:
+        db.close()
+    facets.invalidate()
+    question_cache.invalidate()
+
+    if merge:
+        index.remove(dups)
+    index.save()
+    clusters = len(set(dups.values()))
+    action = "삭제(병합)" if merge else "표시"
+    print(f"[INFO] 중복 {len(dups)}건 {action} (클러스터 {clusters}개, 검사 {len(index.sigs) + (len(dups) if merge else 0)}문항)")
+    return dups
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MinHash/LSH 기반 근사 중복 문항 탐지")
+    ap.add_argument("--merge", action="store_true", help="중복 문항 삭제 (풀이 기록은 대표 문항으로 이동)")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="추정 Jaccard 임계값")
+    args = ap.parse_args()
+    dedup_existing(merge=args.merge, threshold=args.threshold)
@@ -0,0 +1,140 @@
+import os, time, sqlite3, hashlib, threading, re
+
+# -----------------------
+# 설정
+# -----------------------
+CACHE_PATH = os.getenv("EXTRACT_CACHE_PATH", "./data/cache/extract_cache.db")
+CACHE_MAX_MB = int(os.getenv("EXTRACT_CACHE_MAX_MB", "512"))
+
+
+def sha256_hex(*parts) -> str:
+    """bytes/str 조각들을 구분자와 함께 해시 (콘텐츠 주소)"""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p if isinstance(p, (bytes, bytearray, memoryview)) else str(p).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def file_digest(path, block=1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(block), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """공백 차이만 있는 청크는 같은 키가 되도록 정규화"""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+# -----------------------
+# 디스크 캐시 (SQLite, LRU 크기 기반 eviction)
+# -----------------------
+class DiskCache:
+    """
+    namespace별 key → bytes 저장소.
+    - ocr: 페이지 이미지 해시 + OCR 모델 + lang → OCR 텍스트
+    - page: PDF 해시 + 페이지 번호 + dpi + OCR 모델 + lang → OCR 텍스트 (렌더링 생략용)
+    - extract: 정규화 청크 + LLM 모델 + 프롬프트 버전 → PageExtraction JSON
+    항목은 저장 즉시 커밋되므로, 중단된 작업은 재실행 시 캐시되지 않은 첫 페이지부터 이어집니다.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.stats = {}
+
+    def _count(self, namespace, field):
+        ns = self.stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        ns[field] += 1
+
+    def get(self, namespace, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE namespace=? AND key=?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                self._count(namespace, "misses")
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed=? WHERE namespace=? AND key=?",
+                (time.time(), namespace, key)
+            )
+            self._conn.commit()
+            self._count(namespace, "hits")
+            return row[0]
+
+    def get_text(self, namespace, key):
+        value = self.get(namespace, key)
+        return None if value is None else value.decode("utf-8")
+
+    def put(self, namespace, key, value):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM entries WHERE namespace=? AND key=?", (namespace, key)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, len(value), time.time())
+            )
+            self._total += len(value) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """오래 사용하지 않은 항목부터 삭제 (최대 크기의 90%까지)"""
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        rows = self._conn.execute(
+            "SELECT namespace, key, size FROM entries ORDER BY accessed ASC"
+        ).fetchall()
+        for namespace, key, size in rows:
+            if self._total <= target:
+                break
+            self._conn.execute("DELETE FROM entries WHERE namespace=? AND key=?", (namespace, key))
+            self._total -= size
+            removed += 1
+        print(f"[INFO] 캐시 정리: {removed}개 항목 삭제 (현재 {self._total / 1024 / 1024:.1f}MB)")
+
+    def reset_stats(self):
+        self.stats = {}
+
+    def report(self):
+        """hit/miss 요약 출력"""
+        for namespace, s in sorted(self.stats.items()):
+            total = s["hits"] + s["misses"]
+            rate = s["hits"] / total * 100 if total else 0.0
+            print(f"[INFO] 캐시[{namespace}] hit {s['hits']} / miss {s['misses']} ({rate:.0f}%)")
+        print(f"[INFO] 캐시 크기: {self._total / 1024 / 1024:.1f}MB / {self.max_bytes / 1024 / 1024:.0f}MB")
+        return dict(self.stats)
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskCache()
+    return _cache
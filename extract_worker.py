@@ -0,0 +1,289 @@
+import os, time, queue, atexit, itertools, threading
+import multiprocessing as mp
+from concurrent.futures import Future
+
+# -----------------------
+# 상주 추출 워커 (OCR + LLM 을 한 번만 로드해 업로드마다 재사용)
+# -----------------------
+# 웹 프로세스 ↔ 워커 프로세스는 multiprocessing 큐로 요청/응답을 주고받음.
+# 워커는 OCR 프로세스 풀(언어별)과 LLM 파이프라인을 로드·워밍업한 뒤 요청을 처리.
+ENABLED = os.getenv("EXTRACT_WORKER", "1") not in ("0", "false")
+PRELOAD = os.getenv("EXTRACT_WORKER_PRELOAD", "0") not in ("0", "false")   # 앱 시작 시 바로 로드
+MODEL_NAME = os.getenv("EXTRACT_MODEL", "microsoft/Phi-3-mini-4k-instruct")
+BATCH_SIZE = int(os.getenv("EXTRACT_BATCH_SIZE", "4"))
+QUANTIZE = os.getenv("EXTRACT_QUANTIZE", "") or None        # "int8": CPU 동적 양자화
+LANGS = tuple(l for l in os.getenv("EXTRACT_LANGS", "korean").split(",") if l)   # 미리 띄울 OCR 언어
+WARMUP_TOKENS = 16
+
+_ctx = mp.get_context("spawn")   # torch/스레드가 있는 프로세스는 fork 하지 않음
+
+
+# -----------------------
+# 워커 프로세스 쪽
+# -----------------------
+def _serve(req_q, resp_q, model_name, batch_size, quantize, langs, ocr_workers):
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+    from pdf_parser import (load_llm, extraction_prompt, _init_ocr_worker, _ocr_page,
+                            _InlineExecutor, OCR_WORKERS)
+
+    workers = ocr_workers or OCR_WORKERS or max(1, (os.cpu_count() or 2) - 1)
+    pools = {}
+
+    def ocr_pool(lang):
+        if lang not in pools:
+            if workers == 1:
+                pools[lang] = _InlineExecutor(_init_ocr_worker, (lang,))
+            else:
+                pools[lang] = ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker,
+                                                  initargs=(lang,), mp_context=_ctx)
+        return pools[lang]
+
+    info = {}
+    try:
+        t0 = time.perf_counter()
+        # OCR 워밍업: 빈 이미지를 워커 수만큼 보내 모든 OCR 프로세스가 모델을 로드하게 함
+        blank = np.full((80, 320, 3), 255, dtype=np.uint8)
+        for lang in langs:
+            for f in [ocr_pool(lang).submit(_ocr_page, blank) for _ in range(workers)]:
+                f.result()
+        info["ocr_load_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+        t0 = time.perf_counter()
+        llm = load_llm(model_name=model_name, batch_size=batch_size, quantize=quantize)
+        info["llm_load_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        tokenizer = llm.pipeline.tokenizer
+        prompt, parser = extraction_prompt()
+        format_instructions = parser.get_format_instructions()
+        raw_chain = prompt | llm      # 파싱은 따로 → 생성 토큰 수 집계
+
+        # LLM 워밍업: 짧은 생성 1회 (첫 추론의 커널/캐시 초기화 비용을 여기서 지불)
+        t0 = time.perf_counter()
+        out = llm.pipeline("warmup", max_new_tokens=WARMUP_TOKENS, return_full_text=False)
+        sec = time.perf_counter() - t0
+        n = len(tokenizer.encode(out[0]["generated_text"], add_special_tokens=False)) or WARMUP_TOKENS
+        info["warmup_tokens_per_sec"] = round(n / sec, 2) if sec else 0.0
+    except Exception as e:
+        resp_q.put({"type": "failed", "error": f"{type(e).__name__}: {e}"})
+        return
+    resp_q.put({"type": "ready", **info})
+
+    def reply(rid, fut):
+        try:
+            resp_q.put({"type": "result", "id": rid, "ok": True, "value": fut.result()})
+        except Exception as e:
+            resp_q.put({"type": "result", "id": rid, "ok": False, "error": str(e)})
+
+    def extract(texts):
+        t0 = time.perf_counter()
+        outputs = raw_chain.batch(
+            [{"ocr_text": t, "format_instructions": format_instructions} for t in texts],
+            return_exceptions=True,
+        )
+        sec = time.perf_counter() - t0
+        results, tokens = [], 0
+        for raw in outputs:
+            if isinstance(raw, Exception):
+                results.append({"ok": False, "error": str(raw)})
+                continue
+            tokens += len(tokenizer.encode(raw, add_special_tokens=False))
+            try:
+                results.append({"ok": True, "value": parser.parse(raw).dict()})
+            except Exception as e:
+                results.append({"ok": False, "error": str(e)})
+        return {"results": results, "tokens": tokens, "seconds": sec}
+
+    # LLM 은 전용 스레드에서 (생성 중에도 OCR 요청은 계속 받아 풀에 넘김)
+    llm_q = queue.Queue()
+
+    def llm_loop():
+        while True:
+            req = llm_q.get()
+            if req is None:
+                return
+            fut = Future()
+            try:
+                fut.set_result(extract(req["texts"]))
+            except Exception as e:
+                fut.set_exception(e)
+            reply(req["id"], fut)
+
+    llm_thread = threading.Thread(target=llm_loop, name="extract-llm", daemon=True)
+    llm_thread.start()
+
+    while True:
+        req = req_q.get()
+        if req is None:
+            break
+        if req["op"] == "ocr":
+            fut = ocr_pool(req["lang"]).submit(_ocr_page, req["image"], req.get("prep"))
+            fut.add_done_callback(lambda f, rid=req["id"]: reply(rid, f))
+        elif req["op"] == "extract":
+            llm_q.put(req)
+
+    llm_q.put(None)
+    llm_thread.join()
+    for pool in pools.values():
+        pool.shutdown(wait=True)
+
+
+# -----------------------
+# 웹 프로세스 쪽 (클라이언트)
+# -----------------------
+class ExtractWorker:
+    def __init__(self, model_name=MODEL_NAME, batch_size=BATCH_SIZE, quantize=QUANTIZE,
+                 langs=LANGS, ocr_workers=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.quantize = quantize
+        self.langs = langs
+        self.ocr_workers = ocr_workers
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending = {}       # 요청 id → Future
+        self._proc = None
+        self._req_q = None
+        self._ready = threading.Event()
+        self.state = "stopped"   # stopped / starting / ready / failed
+        self.error = None
+        self.info = {}
+        self.stats = {"started": 0, "ocr_pages": 0, "llm_chunks": 0, "llm_tokens": 0, "llm_seconds": 0.0,
+                      "last_tokens_per_sec": 0.0}
+
+    def start(self):
+        """워커 프로세스 시작 (이미 살아 있으면 그대로). 로드는 백그라운드로 진행"""
+        with self._lock:
+            if self._proc is not None and self._proc.is_alive():
+                return
+            self._ready.clear()
+            self.state, self.error, self.info = "starting", None, {}
+            self._req_q, resp_q = _ctx.Queue(), _ctx.Queue()
+            self._proc = _ctx.Process(
+                target=_serve, name="extract-worker",
+                args=(self._req_q, resp_q, self.model_name, self.batch_size, self.quantize,
+                      self.langs, self.ocr_workers),
+            )
+            self._proc.start()
+            self.stats["started"] += 1
+            started_at = time.perf_counter()
+            threading.Thread(target=self._dispatch, args=(self._proc, resp_q, started_at),
+                             name="extract-dispatch", daemon=True).start()
+        print(f"[INFO] 추출 워커 시작 (pid {self._proc.pid}, 모델 {self.model_name}"
+              f"{', ' + self.quantize if self.quantize else ''})")
+
+    def _dispatch(self, proc, resp_q, started_at):
+        while True:
+            try:
+                msg = resp_q.get(timeout=1)
+            except queue.Empty:
+                if proc.is_alive():
+                    continue
+                self._fail(proc, f"워커 프로세스 종료 (exit {proc.exitcode})")
+                return
+            if msg["type"] == "ready":
+                self.info = {k: v for k, v in msg.items() if k != "type"}
+                self.info["ready_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+                self.state = "ready"
+                self._ready.set()
+                print(f"[INFO] 추출 워커 준비 완료: {self.info}")
+            elif msg["type"] == "failed":
+                print(f"[ERROR] 추출 워커 로드 실패: {msg['error']}")
+                self._fail(proc, msg["error"])
+                return
+            else:
+                with self._lock:
+                    fut = self._pending.pop(msg["id"], None)
+                if fut is None:
+                    continue
+                if msg["ok"]:
+                    fut.set_result(msg["value"])
+                else:
+                    fut.set_exception(RuntimeError(msg["error"]))
+
+    def _fail(self, proc, error):
+        with self._lock:
+            if proc is not self._proc:
+                return
+            self.state, self.error = "failed", error
+            pending, self._pending = self._pending, {}
+            self._proc = None
+        self._ready.set()
+        for fut in pending.values():
+            fut.set_exception(RuntimeError(error))
+
+    def _call(self, op, **payload):
+        self.start()
+        fut = Future()
+        with self._lock:
+            rid = next(self._ids)
+            self._pending[rid] = fut
+            self._req_q.put({"id": rid, "op": op, **payload})
+        return fut
+
+    def wait_ready(self, timeout=None):
+        """로드가 끝날 때까지 대기 → 준비됐으면 True"""
+        self._ready.wait(timeout)
+        return self.state == "ready"
+
+    # ----- 요청 -----
+    def ocr(self, image, lang="korean", prep=None):
+        """페이지 배열 1장 OCR (전처리는 워커에서) → Future[str]"""
+        self.stats["ocr_pages"] += 1
+        return self._call("ocr", image=image, lang=lang, prep=prep)
+
+    def extract(self, texts):
+        """
+        청크 목록 → [PageExtraction 또는 Exception] (chain.batch(return_exceptions=True) 와 같은 형태)
+        """
+        from schemas import PageExtraction
+
+        res = self._call("extract", texts=list(texts)).result()
+        s = self.stats
+        s["llm_chunks"] += len(texts)
+        s["llm_tokens"] += res["tokens"]
+        s["llm_seconds"] += res["seconds"]
+        if res["seconds"]:
+            s["last_tokens_per_sec"] = round(res["tokens"] / res["seconds"], 2)
+            print(f"[INFO] LLM 생성 {res['tokens']} 토큰 / {res['seconds']:.1f}s "
+                  f"({s['last_tokens_per_sec']} tok/s)")
+        return [PageExtraction(**r["value"]) if r["ok"] else RuntimeError(r["error"])
+                for r in res["results"]]
+
+    # ----- 종료 / 상태 -----
+    def stop(self, timeout=30):
+        with self._lock:
+            proc, self._proc = self._proc, None
+            if proc is None:
+                return
+            self._req_q.put(None)
+        proc.join(timeout)
+        if proc.is_alive():
+            proc.terminate()
+        self.state = "stopped"
+
+    def status(self):
+        s = dict(self.stats)
+        secs = s.pop("llm_seconds")
+        s["avg_tokens_per_sec"] = round(s["llm_tokens"] / secs, 2) if secs else 0.0
+        return {
+            "enabled": ENABLED,
+            "state": self.state,
+            "ready": self.state == "ready",
+            "pid": self._proc.pid if self._proc is not None else None,
+            "model": self.model_name,
+            "quantize": self.quantize,
+            "langs": list(self.langs),
+            "error": self.error,
+            "pending": len(self._pending),
+            **self.info,
+            **s,
+        }
+
+
+extract_worker = ExtractWorker()
+atexit.register(extract_worker.stop)
+
+
+def get_worker():
+    """업로드 작업에서 사용할 워커 (EXTRACT_WORKER=0 이면 None → 작업마다 직접 로드)"""
+    return extract_worker if ENABLED else None
@@ -0,0 +1,88 @@
+import os, time, threading
+from sqlalchemy import select, func
+from db import SessionLocal
+from models import Question
+
+# -----------------------
+# 문항 수 / 카테고리 패싯 캐시 (프로세스 내)
+# -----------------------
+# 적재·중복 제거·재분류 시 invalidate() 로 무효화.
+# 다른 프로세스(CLI 등)에서 바뀐 경우를 위해 TTL이 지나면 다시 집계.
+FACET_TTL = float(os.getenv("FACET_TTL", "300"))
+
+
+class FacetCache:
+    def __init__(self, ttl=FACET_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0          # invalidate() 마다 증가
+        self._data = None          # (version, 만료 시각, 집계 결과)
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._data = None
+
+    def get(self):
+        with self._lock:
+            data = self._data
+            if data and data[0] == self._version and data[1] > time.monotonic():
+                return data[2]
+            version = self._version
+        # 집계는 락 밖에서 (느린 쿼리 동안 다른 요청을 막지 않음)
+        result = _aggregate()
+        with self._lock:
+            # 집계 도중 무효화됐다면 결과는 반환만 하고 저장하지 않음
+            if version == self._version:
+                self._data = (version, time.monotonic() + self.ttl, result)
+        return result
+
+
+def _aggregate():
+    """전체 문항 수 + 대표 문항 기준 대/소분류별 개수 (GROUP BY 1회)"""
+    db = SessionLocal()
+    try:
+        total = db.execute(select(func.count()).select_from(Question)).scalar_one()
+        rows = db.execute(
+            select(Question.category, Question.subcategory, func.count())
+            .where(Question.duplicate_of.is_(None))
+            .group_by(Question.category, Question.subcategory)
+        ).all()
+    finally:
+        db.close()
+
+    tree = {}
+    for cat, sub, n in rows:
+        node = tree.setdefault(cat or "Unknown", {"count": 0, "subcategories": {}})
+        node["count"] += n
+        subs = node["subcategories"]
+        subs[sub or "Unknown"] = subs.get(sub or "Unknown", 0) + n
+
+    categories = [
+        {
+            "name": cat,
+            "count": node["count"],
+            "subcategories": [
+                {"name": sub, "count": n}
+                for sub, n in sorted(node["subcategories"].items(), key=lambda x: (-x[1], x[0]))
+            ],
+        }
+        for cat, node in sorted(tree.items(), key=lambda x: (-x[1]["count"], x[0]))
+    ]
+    return {"total": total, "unique": sum(c["count"] for c in categories), "categories": categories}
+
+
+_cache = FacetCache()
+
+
+def invalidate():
+    _cache.invalidate()
+
+
+def category_tree():
+    """→ {"total", "unique", "categories": [{name, count, subcategories: [{name, count}]}]}"""
+    return _cache.get()
+
+
+def total_questions():
+    return _cache.get()["total"]
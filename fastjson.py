@@ -0,0 +1,59 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+
+# -----------------------
+# 빠른 JSON 직렬화 (orjson 설치 시 사용, 없으면 표준 json)
+# -----------------------
+try:
+    import orjson
+    # 표준 json 과 같은 결과: 숫자 키는 문자열로, datetime 은 Flask default(HTTP date)로
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(obj) -> bytes:
+    """응답용 JSON bytes (한글은 이스케이프하지 않음)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"),
+                      default=DefaultJSONProvider.default).encode("utf-8")
+
+
+def _orjson_option(kwargs):
+    """json.dumps 인자 → orjson 옵션 (표현할 수 없는 인자면 None → 표준 json)"""
+    option = _OPTIONS
+    for key, value in kwargs.items():
+        if key == "separators" and tuple(value) == (",", ":"):
+            continue
+        if key == "indent" and value == 2:
+            option |= orjson.OPT_INDENT_2
+            continue
+        if key == "default" and value is DefaultJSONProvider.default:
+            continue
+        return None
+    return option
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() 도 orjson 경로를 사용 (app.json = FastJSONProvider(app))"""
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            option = _orjson_option(kwargs)
+            if option is not None:
+                return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """jsonify(): str 을 거치지 않고 orjson bytes 로 바로 응답 본문 생성"""
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        option = _OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=option),
+                                        mimetype=self.mimetype)
@@ -0,0 +1,117 @@
+import os
+import numpy as np
+
+# -----------------------
+# OCR 전처리 (메모리 내 NumPy 배열 → PaddleOCR)
+# -----------------------
+# 렌더링한 페이지를 PNG로 저장/재로드하지 않고 배열 그대로 OCR 워커에 전달.
+# OpenCV(cv2, paddleocr 의존성)가 없으면 흑백/축소만 PIL로 하고 기울기 보정은 생략.
+PREP_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "1") not in ("0", "false")
+PREP_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2000"))      # 긴 변이 이보다 크면 축소 (0: 사용 안 함)
+PREP_DESKEW = os.getenv("OCR_DESKEW", "1") not in ("0", "false")
+MAX_SKEW_DEG = float(os.getenv("OCR_MAX_SKEW_DEG", "10"))   # 이보다 크게 기운 건 판정 오류로 보고 무시
+MIN_SKEW_DEG = 0.3                                           # 이보다 작으면 회전하지 않음
+
+DEFAULT_PREP = {"grayscale": PREP_GRAYSCALE, "max_side": PREP_MAX_SIDE, "deskew": PREP_DESKEW}
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+def prep_id(prep):
+    """캐시 키 구성요소 (전처리 설정이 바뀌면 OCR 결과도 달라짐)"""
+    prep = prep or {}
+    return (f"g{int(bool(prep.get('grayscale')))}"
+            f"-m{prep.get('max_side') or 0}-d{int(bool(prep.get('deskew')))}")
+
+
+def to_array(page):
+    """PIL 페이지 이미지 → uint8 배열 (RGB 또는 흑백, 복사 1회)"""
+    if page.mode not in ("RGB", "L"):
+        page = page.convert("RGB")
+    return np.asarray(page)
+
+
+def _to_gray(img):
+    if img.ndim == 2:
+        return img
+    if cv2 is not None:
+        return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return (img[..., :3] @ np.array([0.299, 0.587, 0.114])).astype(np.uint8)
+
+
+def _downscale(img, max_side):
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return img
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    if cv2 is not None:
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    from PIL import Image
+    return np.asarray(Image.fromarray(img).resize(size, Image.BOX))
+
+
+def skew_angle(gray):
+    """글자 픽셀 전체를 감싸는 최소 사각형의 기울기 (도, 반시계 +)"""
+    h, w = gray.shape
+    scale = min(1.0, 1000 / max(h, w))        # 판정은 축소본으로 (속도)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    _, bw = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    pts = cv2.findNonZero(bw)
+    if pts is None or len(pts) < 100:
+        return 0.0
+    (_, _), (rw, rh), angle = cv2.minAreaRect(pts)
+    # OpenCV 버전마다 각도 범위가 달라서 (-45, 45] 로 정규화
+    if rw < rh:
+        angle -= 90
+    while angle <= -45:
+        angle += 90
+    while angle > 45:
+        angle -= 90
+    return -angle
+
+
+def _deskew(img, gray):
+    angle = skew_angle(gray)
+    if not (MIN_SKEW_DEG <= abs(angle) <= MAX_SKEW_DEG):
+        return img
+    h, w = img.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), -angle, 1.0)
+    border = 255 if img.ndim == 2 else (255, 255, 255)
+    return cv2.warpAffine(img, m, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=border)
+
+
+_warned = False
+
+
+def preprocess(img, prep=None):
+    """
+    OCR 입력 배열 준비: 흑백 → 긴 변 축소 → 기울기 보정 → PaddleOCR 입력(BGR 3채널)
+    prep: {"grayscale", "max_side", "deskew"} (None이면 환경 변수 기본값)
+    """
+    global _warned
+    prep = DEFAULT_PREP if prep is None else prep
+
+    gray = _to_gray(img) if (prep.get("grayscale") or prep.get("deskew")) else None
+    if prep.get("grayscale"):
+        img = gray
+    if prep.get("max_side"):
+        before = img.shape
+        img = _downscale(img, prep["max_side"])
+        if gray is not None and img.shape != before:
+            gray = img if img.ndim == 2 else _downscale(gray, prep["max_side"])
+    if prep.get("deskew"):
+        if cv2 is not None:
+            img = _deskew(img, gray)
+        elif not _warned:
+            print("[WARN] OpenCV(cv2) 없음 → 기울기 보정 생략")
+            _warned = True
+
+    # PaddleOCR 는 BGR 3채널 배열을 기대
+    if img.ndim == 2:
+        return np.repeat(img[:, :, None], 3, axis=2)
+    return np.ascontiguousarray(img[:, :, ::-1])
@@ -1,42 +1,219 @@
-import json
+import json, hashlib, re
+from sqlalchemy import insert, update, select
 from db import SessionLocal
 from models import Question
+from similarity import index_questions, flush_index
+from dedup import flag_new_questions, known_duplicate, discard_questions, save_index, DEDUP_MODE
+import facets
+import question_cache
+
+BATCH_SIZE = 1000
+
+
+# -----------------------
+# 스트리밍 JSON 배열 읽기
+# -----------------------
+def iter_json_array(path, read_size=1 << 16):
+    """
+    최상위 JSON 배열을 원소 단위로 읽음 (파일 전체를 메모리에 올리지 않음)
+    예: [ {...}, {...}, ... ]
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(read_size).lstrip("\ufeff \t\r\n")
+        if not buf.startswith("["):
+            raise ValueError("JSON 배열 형식이 아닙니다")
+        buf = buf[1:]
+        eof = False
+        while True:
+            buf = buf.lstrip(" \t\r\n,")
+            if buf.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(read_size)
+                eof = not more
+                buf += more
+                continue
+            yield item
+            buf = buf[end:]
+            if len(buf) < read_size and not eof:
+                more = f.read(read_size)
+                eof = not more
+                buf += more
+
+
+# -----------------------
+# 정규화 / 콘텐츠 해시
+# -----------------------
+def _as_dict(item):
+    # parse_pdf 결과(schemas.Question)와 JSON dict 모두 허용
+    return item.dict() if hasattr(item, "dict") else item
+
+
+def _options_of(item):
+    opts = item.get("options")
+    # 예전 DB 값처럼 JSON 문자열로 (여러 번) 감싼 보기는 풀어서 처리
+    while isinstance(opts, str):
+        try:
+            opts = json.loads(opts)
+        except ValueError:
+            return {}
+    if isinstance(opts, dict):
+        return opts
+    if isinstance(opts, list):
+        # 만약 OCR/LLM에서 리스트로 뽑혔다면, A/B/C/D 키 매핑
+        return {chr(65+i): opt for i, opt in enumerate(opts)}
+    return {}
+
+
+def content_hash(stem, options) -> str:
+    """stem + options 기준 해시 (공백 차이 무시) → 같은 문항 재적재 방지"""
+    norm = lambda t: re.sub(r"\s+", " ", str(t or "")).strip()
+    payload = json.dumps(
+        [norm(stem), {norm(k): norm(v) for k, v in options.items()}],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _row_of(item, source_name):
+    options = _options_of(item)
+    return {
+        "stem": item["stem"],
+        "options": json.dumps(options, ensure_ascii=False),
+        "answer": item.get("answer", ""),
+        "explanation": item.get("explanation", ""),
+        "category": item.get("category"),
+        "subcategory": item.get("subcategory"),
+        "source": source_name,
+        "content_hash": content_hash(item["stem"], options),
+    }
+
+
+# 해시가 같은 기존 문항에서 값이 바뀌면 갱신하는 컬럼
+_UPDATABLE = ("answer", "explanation", "category", "subcategory")
+
+
+# -----------------------
+# 적재 (배치 upsert, 단일 트랜잭션)
+# -----------------------
+def ingest_items(items, source_name="upload", batch_size=BATCH_SIZE, flush_embeddings=True):
+    """
+    문항 iterable(dict 또는 schemas.Question)을 배치 단위로 upsert.
+    근사 중복(MinHash/LSH)은 DEDUP_MODE에 따라 표시(flag)하거나 적재하지 않음(merge).
+    flush_embeddings=False: 임베딩 인덱스 파일 저장을 호출한 쪽에 맡김 (업로드 작업은 페이지마다 호출 → 끝에 한 번 저장)
+    → {"inserted": n, "updated": n, "skipped": n, "duplicates": n}
+    """
+    stats = {"inserted": 0, "updated": 0, "skipped": 0, "duplicates": 0}
+    touched = []   # 임베딩 인덱스 갱신 대상 (id, stem, options, category, subcategory)
+    updated_ids = []
+    indexed_ids = []   # 이번 적재에서 MinHash 인덱스에 추가한 id (롤백 시 제거)
 
-def ingest_questions(json_path, source_name="upload"):
-    """JSON 파일을 읽어와 DB에 적재"""
     db = SessionLocal()
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        count = 0
-        for item in data:
-            q = Question(
-                stem=item["stem"],
-                answer=item.get("answer", ""),
-                explanation=item.get("explanation", ""),
-                category=item.get("category"),
-                subcategory=item.get("subcategory"),
-                source=source_name
-            )
-            # options 설정 (dict → JSON 문자열 변환)
-            if isinstance(item.get("options"), dict):
-                q.set_options(item["options"])
-            elif isinstance(item.get("options"), list):
-                # 만약 OCR/LLM에서 리스트로 뽑혔다면, A/B/C/D 키 매핑
-                q.set_options({chr(65+i): opt for i, opt in enumerate(item["options"])})
-            else:
-                q.set_options({})
-
-            db.add(q)
-            count += 1
+        batch = []
+
+        def flush():
+            rows = {}
+            for row in batch:
+                if row["content_hash"] in rows:
+                    stats["skipped"] += 1      # 같은 배치 내 중복
+                else:
+                    rows[row["content_hash"]] = row
+            batch.clear()
+            if not rows:
+                return
+
+            existing = {
+                r.content_hash: r
+                for r in db.execute(
+                    select(Question.id, Question.content_hash, *[getattr(Question, c) for c in _UPDATABLE])
+                    .where(Question.content_hash.in_(list(rows)))
+                )
+            }
+
+            new_rows, changed = [], []
+            for h, row in rows.items():
+                old = existing.get(h)
+                if old is None:
+                    new_rows.append(row)
+                    continue
+                # 값이 비어 있는 필드는 기존 값 유지
+                diff = {c: row[c] for c in _UPDATABLE if row[c] not in (None, "") and row[c] != getattr(old, c)}
+                if diff:
+                    changed.append({"id": old.id, **diff})
+                    touched.append((old.id, row["stem"], row["options"],
+                                    diff.get("category", old.category), diff.get("subcategory", old.subcategory)))
+                else:
+                    stats["skipped"] += 1
+
+            if new_rows and DEDUP_MODE == "merge":
+                # 이미 병합된 근사 중복은 다시 insert 하지 않음 (같은 파일 재적재 → 변경 없음)
+                kept = [r for r in new_rows if known_duplicate(r["stem"], r["options"], r["answer"]) is None]
+                stats["duplicates"] += len(new_rows) - len(kept)
+                new_rows = kept
+
+            if new_rows:
+                db.execute(insert(Question), new_rows)           # executemany
+                ids = dict(db.execute(
+                    select(Question.content_hash, Question.id)
+                    .where(Question.content_hash.in_([r["content_hash"] for r in new_rows]))
+                ).all())
+                new_ids = [(ids[r["content_hash"]], r["stem"], r["options"], r["answer"]) for r in new_rows]
+                indexed_ids.extend(qid for qid, *_ in new_ids)
+                dups = flag_new_questions(db, new_ids)
+                touched.extend(
+                    (ids[r["content_hash"]], r["stem"], r["options"], r["category"], r["subcategory"])
+                    for r in new_rows if ids[r["content_hash"]] not in dups
+                )
+                stats["duplicates"] += len(dups)
+                stats["inserted"] += len(new_rows) - (len(dups) if DEDUP_MODE == "merge" else 0)
+            if changed:
+                db.execute(update(Question), changed)            # PK 기준 bulk update
+                updated_ids.extend(c["id"] for c in changed)
+                stats["updated"] += len(changed)
+
+        for item in items:
+            batch.append(_row_of(_as_dict(item), source_name))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
 
         db.commit()
-        print(f"[INFO] DB 적재 완료: {count} 문항")
-        return count
+    except Exception:
+        db.rollback()
+        discard_questions(indexed_ids)
+        raise
+    else:
+        if indexed_ids:
+            save_index()
+        if stats["inserted"] or stats["updated"] or stats["duplicates"]:
+            facets.invalidate()     # 문항 수 / 카테고리 패싯 다시 집계
+        if updated_ids:
+            question_cache.invalidate(updated_ids)
+        print(f"[INFO] DB 적재 완료: 추가 {stats['inserted']} / 갱신 {stats['updated']} / "
+              f"건너뜀 {stats['skipped']} / 근사중복 {stats['duplicates']}")
     finally:
         db.close()
 
+    # 유사문항 인덱스 증분 갱신 (실패해도 적재는 유지)
+    try:
+        index_questions(touched)
+        if flush_embeddings:
+            flush_index()
+    except Exception as e:
+        print(f"[WARN] 임베딩 인덱스 갱신 실패: {e}")
+    return stats
+
+
+def ingest_questions(json_path, source_name="upload", batch_size=BATCH_SIZE):
+    """JSON 파일(배열)을 스트리밍으로 읽어와 DB에 적재"""
+    return ingest_items(iter_json_array(json_path), source_name=source_name, batch_size=batch_size)
+
 
 if __name__ == "__main__":
     # 기본 실행 예시
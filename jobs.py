@@ -0,0 +1,158 @@
+import os, json, time, uuid, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from ingest import ingest_items
+from similarity import flush_index
+import metrics
+
+# -----------------------
+# 업로드 작업 (백그라운드 파싱 + 페이지 단위 적재)
+# -----------------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))   # 동시에 돌릴 업로드 작업 수 (OCR/LLM이 무거우므로 기본 1)
+MAX_JOBS_KEPT = 100                                  # 메모리에 보관할 작업 수 (오래된 완료 작업부터 삭제)
+JOB_OUTPUT_DIR = "./data/jobs"
+
+
+class Job:
+    def __init__(self, pdf_path, filename):
+        self.id = uuid.uuid4().hex[:12]
+        self.pdf_path = pdf_path
+        self.filename = filename
+        self.status = "queued"          # queued / running / done / failed
+        self.total_pages = None
+        self.done_pages = 0
+        self.count = 0                  # DB에 적재된 문항 수
+        self.chunk_paths = {}           # 청크 처리 경로별 개수 (규칙/캐시/LLM)
+        self.timings = {}               # 단계별 시간 / LLM 토큰 (parse_pdf timings)
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []                # SSE로 보낼 이벤트 (인덱스 = 이벤트 id)
+        self._cond = threading.Condition()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "total_pages": self.total_pages,
+            "done_pages": self.done_pages,
+            "count": self.count,
+            "chunk_paths": self.chunk_paths,
+            "timings": self.timings,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def emit(self, type_, **data):
+        with self._cond:
+            self.events.append({"type": type_, **data})
+            self._cond.notify_all()
+
+    def wait_events(self, since, timeout):
+        """since 이후 이벤트를 반환 (없으면 timeout까지 대기)"""
+        with self._cond:
+            if len(self.events) <= since and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[since:]
+
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, pdf_path, filename, **parse_kwargs):
+        job = Job(pdf_path, filename)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        job.emit("status", status=job.status)
+        self._executor.submit(self._run, job, parse_kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _trim(self):
+        while len(self._jobs) > MAX_JOBS_KEPT:
+            oldest = next((j for j in self._jobs.values() if j.finished), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest.id]
+
+    def _run(self, job, parse_kwargs):
+        job.status = "running"
+        job.emit("status", status=job.status)
+
+        def on_page(page_idx, total_pages, items):
+            # 페이지가 끝날 때마다 바로 DB 커밋 → 전체 완료 전에도 퀴즈에서 사용 가능
+            job.total_pages = total_pages
+            count = ingest_items(items, source_name=f"{job.filename}#p{page_idx}",
+                                 flush_embeddings=False)["inserted"] if items else 0
+            job.count += count
+            job.done_pages += 1
+            job.emit("page", page=page_idx, total_pages=total_pages,
+                     done_pages=job.done_pages, added=count, count=job.count)
+
+        try:
+            # import / 워커 시작 실패도 작업 실패로 기록 (executor future 에 묻히지 않도록)
+            from pdf_parser import parse_pdf
+            from extract_worker import get_worker
+
+            # 상주 워커가 있으면 OCR/LLM 모델을 작업마다 다시 로드하지 않음
+            parse_kwargs.setdefault("worker", get_worker())
+
+            os.makedirs(JOB_OUTPUT_DIR, exist_ok=True)
+            parse_pdf(
+                pdf_path=job.pdf_path,
+                output_json=os.path.join(JOB_OUTPUT_DIR, f"{job.id}.json"),
+                on_page=on_page,
+                stats=job.chunk_paths,
+                timings=job.timings,
+                **parse_kwargs
+            )
+            job.status = "done"
+        except Exception as e:
+            print(f"[ERROR] 작업 {job.id} 파싱 중 오류: {e}")
+            job.status = "failed"
+            job.error = str(e)
+            metrics.pipeline_runs.inc(status="failed")
+        # 페이지별 적재에서 모은 임베딩을 작업 끝에 한 번 저장
+        try:
+            flush_index()
+        except Exception as e:
+            print(f"[WARN] 임베딩 인덱스 저장 실패: {e}")
+        job.finished_at = time.time()
+        job.emit("status", status=job.status, count=job.count, error=job.error)
+
+
+def sse_stream(job, last_event_id=-1, heartbeat=15):
+    """Server-Sent Events 제너레이터 (Last-Event-ID 이후부터 재전송)"""
+    since = last_event_id + 1
+    while True:
+        events = job.wait_events(since, timeout=heartbeat)
+        if not events:
+            if job.finished:
+                return
+            yield ": keep-alive\n\n"
+            continue
+        for i, ev in enumerate(events, start=since):
+            yield f"id: {i}\nevent: {ev['type']}\ndata: {json.dumps(ev, ensure_ascii=False)}\n\n"
+        since += len(events)
+        if job.finished and since >= len(job.events):
+            return
+
+
+job_manager = JobManager()
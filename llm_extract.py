@@ -1,36 +1,11 @@
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain_huggingface import HuggingFacePipeline
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+import threading
 from schemas import PageExtraction
 
 # -------------------------
-# 모델 로드 (Phi-3-mini)
+# 모델 (Phi-3-mini) — import 시점이 아니라 처음 사용할 때 로드
 # -------------------------
 MODEL_ID = "microsoft/Phi-3-mini-4k-instruct"
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_ID,
-    device_map="auto",   # Colab GPU면 GPU, VS Code CPU면 CPU
-    torch_dtype="auto"
-)
-
-pipe = pipeline(
-    "text-generation",
-    model=model,
-    tokenizer=tokenizer,
-    max_new_tokens=1024,
-    temperature=0.0
-)
-
-llm = HuggingFacePipeline(pipeline=pipe)
-
-# -------------------------
-# 파서 (JSON → Pydantic)
-# -------------------------
-parser = PydanticOutputParser(pydantic_object=PageExtraction)
-
 # -------------------------
 # 프롬프트 템플릿
 # -------------------------
@@ -48,12 +23,58 @@ HUMAN = """페이지 원문:
 - 해설이 없으면 간단히 작성하세요.
 """
 
-prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM),
-    ("human", HUMAN),
-]).partial(format_instructions=parser.get_format_instructions())
+_lock = threading.Lock()
+_loaded = {}     # "llm", "parser", "prompt", "chain"
 
-# -------------------------
-# 최종 체인 (입력 → LLM → JSON 파싱)
-# -------------------------
-chain = prompt | llm | parser
+
+def _load():
+    # transformers / langchain import 와 가중치 로드는 여기서 한 번만
+    from langchain.prompts import ChatPromptTemplate
+    from langchain.output_parsers import PydanticOutputParser
+    from langchain_huggingface import HuggingFacePipeline
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+
+    print(f"[INFO] LLM 로드: {MODEL_ID}")
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+    model = AutoModelForCausalLM.from_pretrained(
+        MODEL_ID,
+        device_map="auto",   # Colab GPU면 GPU, VS Code CPU면 CPU
+        torch_dtype="auto"
+    )
+
+    pipe = pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        max_new_tokens=1024,
+        temperature=0.0
+    )
+    llm = HuggingFacePipeline(pipeline=pipe)
+
+    # 파서 (JSON → Pydantic)
+    parser = PydanticOutputParser(pydantic_object=PageExtraction)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM),
+        ("human", HUMAN),
+    ]).partial(format_instructions=parser.get_format_instructions())
+
+    # 최종 체인 (입력 → LLM → JSON 파싱)
+    return {"llm": llm, "parser": parser, "prompt": prompt, "chain": prompt | llm | parser}
+
+
+def get_chain():
+    """입력 → LLM → JSON 파싱 체인 (첫 호출 때 모델 로드)"""
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _loaded.update(_load())
+    return _loaded["chain"]
+
+
+def __getattr__(name):
+    """기존 방식(`from llm_extract import chain`) 호환: 접근할 때 로드"""
+    if name in ("llm", "parser", "prompt", "chain"):
+        get_chain()
+        return _loaded[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
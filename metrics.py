@@ -0,0 +1,286 @@
+import os, json, time, threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# -----------------------
+# 계측: 카운터/히스토그램 + Prometheus 텍스트 형식 (/metrics)
+# -----------------------
+# 외부 라이브러리 없이 프로세스 내 집계 (gunicorn 워커가 여럿이면 워커별 값 → 스크레이프도 워커별)
+ENABLED = os.getenv("METRICS", "1") not in ("0", "false")
+TRACE = os.getenv("PIPELINE_TRACE", "0") not in ("0", "false")   # parse_pdf 실행마다 JSON 트레이스 저장
+TRACE_DIR = os.getenv("PIPELINE_TRACE_DIR", "./data/debug")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            items = list(self._values.items())
+        for key, v in items:
+            yield self.name, key, v
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}   # 라벨 → [버킷별 개수..., 합계, 개수]
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        i = bisect_left(self.buckets, value)
+        with _lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        with _lock:
+            items = [(k, list(r)) for k, r in self._values.items()]
+        for key, row in items:
+            acc = 0
+            for le, n in zip(self.buckets, row):
+                acc += n
+                yield f"{self.name}_bucket", key + (_num(le),), acc
+            yield f"{self.name}_bucket", key + ("+Inf",), row[-1]
+            yield f"{self.name}_sum", key, round(row[-2], 6)
+            yield f"{self.name}_count", key, row[-1]
+
+
+_registry = []
+_collectors = []   # 스크레이프 시점에 값을 채우는 함수 (큐 길이, 캐시 적중률 등)
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def counter(name, doc, labels=()):
+    return _register(Counter(name, doc, labels))
+
+
+def gauge(name, doc, labels=()):
+    return _register(Gauge(name, doc, labels))
+
+
+def histogram(name, doc, labels=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, doc, labels, buckets))
+
+
+def register_collector(fn):
+    """fn(): /metrics 요청 때마다 호출 (gauge.set 으로 현재 상태 반영)"""
+    _collectors.append(fn)
+    return fn
+
+
+def render():
+    """Prometheus text exposition format (0.0.4)"""
+    for fn in _collectors:
+        try:
+            fn()
+        except Exception as e:
+            print(f"[WARN] 메트릭 수집 실패 ({getattr(fn, '__name__', fn)}): {e}")
+    out = []
+    for m in _registry:
+        out.append(f"# HELP {m.name} {m.doc}")
+        out.append(f"# TYPE {m.name} {m.kind}")
+        names = m.label_names + (("le",) if m.kind == "histogram" else ())
+        for sample, key, value in m.samples():
+            lnames = names if sample.endswith("_bucket") else m.label_names
+            out.append(f"{sample}{_labels(lnames, key)} {_num(value)}")
+    return "\n".join(out) + "\n"
+
+
+# -----------------------
+# 메트릭 정의
+# -----------------------
+http_requests = counter("http_requests_total", "HTTP 요청 수", ("method", "route", "status"))
+http_latency = histogram("http_request_duration_seconds", "라우트별 응답 시간", ("method", "route"))
+http_db_queries = histogram("http_request_db_queries", "요청당 DB 쿼리 수", ("route",), COUNT_BUCKETS)
+db_queries = counter("db_queries_total", "실행한 DB 쿼리 수")
+
+pipeline_runs = counter("pipeline_runs_total", "parse_pdf 실행 수", ("status",))
+pipeline_stage = histogram("pipeline_stage_seconds", "parse_pdf 실행당 단계별 누적 시간", ("stage",), STAGE_BUCKETS)
+pipeline_pages = counter("pipeline_pages_total", "처리한 페이지 수", ("source",))
+pipeline_chunks = counter("pipeline_chunks_total", "처리 경로별 청크 수", ("path",))
+pipeline_failures = counter("pipeline_parse_failures_total", "LLM 출력 파싱 실패 청크 수")
+llm_tokens = counter("llm_tokens_total", "LLM 토큰 수 (in: 청크 입력, out: 생성)", ("direction",))
+llm_tokens_per_sec = gauge("llm_tokens_per_second", "마지막 실행의 LLM 생성 속도")
+
+
+# -----------------------
+# 요청 단위 계측 (Flask + SQLAlchemy)
+# -----------------------
+_local = threading.local()
+
+
+def install_db_counter(engine):
+    """엔진의 모든 쿼리 수를 세고, 요청 처리 중이면 요청별로도 집계"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_):
+        db_queries.inc()
+        if getattr(_local, "queries", None) is not None:
+            _local.queries += 1
+
+
+def init_app(app):
+    """라우트별 응답 시간 / 요청당 쿼리 수 (라벨은 URL 규칙 → 경로 변수로 라벨이 늘지 않음)"""
+    from flask import request
+
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start():
+        _local.start = time.perf_counter()
+        _local.queries = 0
+
+    @app.after_request
+    def _observe(response):
+        start = getattr(_local, "start", None)
+        if start is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        http_latency.observe(time.perf_counter() - start, method=request.method, route=route)
+        http_requests.inc(method=request.method, route=route, status=response.status_code)
+        http_db_queries.observe(_local.queries, route=route)
+        _local.start = _local.queries = None
+        return response
+
+
+# -----------------------
+# parse_pdf 실행 트레이스
+# -----------------------
+class PipelineTrace:
+    """
+    한 번의 parse_pdf 실행에 대한 단계별 시간 / 카운터.
+    with trace.stage("render", page=3): ... → 단계 누적 시간 + (트레이스 저장 시) 이벤트 기록
+    finish()에서 전역 메트릭에 반영하고, TRACE면 data/debug/trace-*.json 으로 저장.
+    """
+
+    def __init__(self, name="", save=None):
+        self.name = name
+        self.save = TRACE if save is None else save
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.stages = {}      # 단계 → 누적 초
+        self.counts = {}      # 단계 → 호출 수
+        self.counters = {"tokens_in": 0, "tokens_out": 0, "llm_seconds": 0.0}
+        self.events = []
+
+    @contextmanager
+    def stage(self, name, **info):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0, **info)
+
+    def add(self, name, seconds, **info):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+        if self.save:
+            self.events.append({"stage": name, "t": round(time.perf_counter() - self._t0, 4),
+                                "seconds": round(seconds, 4), **info})
+
+    def tokens(self, tokens_in=0, tokens_out=0, seconds=0.0):
+        self.counters["tokens_in"] += tokens_in
+        self.counters["tokens_out"] += tokens_out
+        self.counters["llm_seconds"] += seconds
+
+    def finish(self, stats=None, status="done"):
+        """stats: parse_pdf 의 처리 경로별 개수 dict"""
+        stats = stats or {}
+        elapsed = time.perf_counter() - self._t0
+        c = self.counters
+        tps = round(c["tokens_out"] / c["llm_seconds"], 2) if c["llm_seconds"] else 0.0
+        summary = {
+            "name": self.name,
+            "status": status,
+            "started": self.started,
+            "seconds": round(elapsed, 4),
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            "stage_calls": dict(self.counts),
+            "tokens_in": c["tokens_in"],
+            "tokens_out": c["tokens_out"],
+            "tokens_per_sec": tps,
+            "stats": dict(stats),
+        }
+        if ENABLED:
+            pipeline_runs.inc(status=status)
+            for name, sec in self.stages.items():
+                pipeline_stage.observe(sec, stage=name)
+            pipeline_stage.observe(elapsed, stage="total")
+            pipeline_pages.inc(stats.get("text_pages", 0), source="text_layer")
+            pipeline_pages.inc(stats.get("image_pages", 0), source="ocr")
+            for path in ("rule", "cache", "llm", "ocr_only"):
+                pipeline_chunks.inc(stats.get(path, 0), path=path)
+            pipeline_failures.inc(stats.get("llm_failed", 0))
+            llm_tokens.inc(c["tokens_in"], direction="in")
+            llm_tokens.inc(c["tokens_out"], direction="out")
+            if tps:
+                llm_tokens_per_sec.set(tps)
+        if self.save:
+            self._write({**summary, "events": self.events})
+        return summary
+
+    def _write(self, data):
+        try:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            stem = os.path.splitext(os.path.basename(self.name))[0] or "run"
+            path = os.path.join(TRACE_DIR, f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{stem}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"[INFO] 파이프라인 트레이스 저장: {path}")
+        except OSError as e:
+            print(f"[WARN] 트레이스 저장 실패: {e}")
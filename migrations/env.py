@@ -0,0 +1,48 @@
+from logging.config import fileConfig
+from alembic import context
+from db import engine, Base
+from search import FTS_TABLE
+import models  # noqa: F401  (모든 모델을 Base.metadata 에 등록)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # FTS5 가상 테이블/섀도 테이블은 search.init_search_index 가 관리 → autogenerate 대상에서 제외
+    return not (type_ == "table" and name.startswith(FTS_TABLE))
+
+
+def run_migrations_offline():
+    """SQL 스크립트만 출력 (alembic upgrade head --sql)"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # 앱과 같은 엔진(DATABASE_URL, 풀 설정) 사용
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            render_as_batch=connection.dialect.name == "sqlite",   # SQLite는 ALTER 제약이 있어 batch 모드
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
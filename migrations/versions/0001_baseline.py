@@ -0,0 +1,51 @@
+"""baseline: questions / attempts
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-06-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "questions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("stem", sa.Text(), nullable=False),
+        sa.Column("options", sa.Text(), nullable=True),
+        sa.Column("answer", sa.String(20), nullable=True),
+        sa.Column("explanation", sa.Text(), nullable=True),
+        sa.Column("category", sa.String(100), nullable=True),
+        sa.Column("subcategory", sa.String(100), nullable=True),
+        sa.Column("source", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_questions_id", "questions", ["id"])
+    op.create_index("ix_questions_category", "questions", ["category"])
+    op.create_index("ix_questions_subcategory", "questions", ["subcategory"])
+    op.create_index("idx_question_category", "questions", ["category"])
+    op.create_index("idx_question_subcategory", "questions", ["subcategory"])
+
+    op.create_table(
+        "attempts",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(100), nullable=False),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id", ondelete="CASCADE")),
+        sa.Column("chosen", sa.String(20), nullable=True),
+        sa.Column("correct", sa.Boolean(), nullable=True),
+        sa.Column("note_type", sa.String(50), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_attempts_id", "attempts", ["id"])
+
+
+def downgrade():
+    op.drop_table("attempts")
+    op.drop_table("questions")
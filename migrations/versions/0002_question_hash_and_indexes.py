@@ -0,0 +1,89 @@
+"""questions.content_hash / duplicate_of + 조회용 복합 인덱스
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-06-15
+"""
+import json, hashlib, re
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite는 ALTER로 FK를 추가할 수 없어 batch 모드로 테이블 재생성
+    # (FTS 동기화 트리거도 함께 삭제되지만 init_search_index 가 다시 만듦)
+    with op.batch_alter_table("questions") as batch:
+        batch.add_column(sa.Column("content_hash", sa.String(64), nullable=True))
+        batch.add_column(sa.Column("duplicate_of", sa.Integer(), nullable=True))
+        batch.create_foreign_key("fk_questions_duplicate_of", "questions",
+                                 ["duplicate_of"], ["id"], ondelete="SET NULL")
+    _fill_content_hashes()
+    op.create_index("uq_question_content_hash", "questions", ["content_hash"], unique=True)
+    op.create_index("ix_questions_duplicate_of", "questions", ["duplicate_of"])
+    op.create_index("idx_question_cat_sub_id", "questions", ["category", "subcategory", "id"])
+    op.create_index("idx_attempt_user_question", "attempts", ["user_id", "question_id"])
+
+
+# 이 리비전 시점의 ingest.content_hash 복사본 (앱 코드가 바뀌어도 마이그레이션 결과는 고정)
+def _options_of(text):
+    opts = text
+    while isinstance(opts, str):
+        try:
+            opts = json.loads(opts)
+        except ValueError:
+            return {}
+    if isinstance(opts, dict):
+        return opts
+    if isinstance(opts, list):
+        return {chr(65+i): opt for i, opt in enumerate(opts)}
+    return {}
+
+
+def _content_hash(stem, options_text):
+    norm = lambda t: re.sub(r"\s+", " ", str(t or "")).strip()
+    payload = json.dumps(
+        [norm(stem), {norm(k): norm(v) for k, v in _options_of(options_text).items()}],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _fill_content_hashes(batch_size=1000):
+    """
+    기존 행의 content_hash 채우기 (재적재가 새 행을 만들지 않도록).
+    해시가 같은 행은 id가 가장 작은 행만 해시를 갖고, 나머지는 duplicate_of 로 그 행을 가리킴
+    """
+    conn = op.get_bind()
+    questions = sa.table("questions", sa.column("id", sa.Integer), sa.column("stem", sa.Text),
+                         sa.column("options", sa.Text), sa.column("content_hash", sa.String),
+                         sa.column("duplicate_of", sa.Integer))
+    first = {}      # 해시 → 대표 id
+    updates = []
+    for qid, stem, options in conn.execute(
+            sa.select(questions.c.id, questions.c.stem, questions.c.options).order_by(questions.c.id)):
+        h = _content_hash(stem, options)
+        if h in first:
+            updates.append({"qid": qid, "h": None, "dup": first[h]})
+        else:
+            first[h] = qid
+            updates.append({"qid": qid, "h": h, "dup": None})
+    stmt = (questions.update().where(questions.c.id == sa.bindparam("qid"))
+            .values(content_hash=sa.bindparam("h"), duplicate_of=sa.bindparam("dup")))
+    for start in range(0, len(updates), batch_size):
+        conn.execute(stmt, updates[start:start + batch_size])
+
+
+def downgrade():
+    op.drop_index("idx_attempt_user_question", "attempts")
+    op.drop_index("idx_question_cat_sub_id", "questions")
+    op.drop_index("ix_questions_duplicate_of", "questions")
+    op.drop_index("uq_question_content_hash", "questions")
+    with op.batch_alter_table("questions") as batch:
+        batch.drop_constraint("fk_questions_duplicate_of", type_="foreignkey")
+        batch.drop_column("duplicate_of")
+        batch.drop_column("content_hash")
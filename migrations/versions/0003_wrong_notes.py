@@ -0,0 +1,32 @@
+"""wrong_notes: 사용자 × 문항 오답/복습 노트
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-06-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "wrong_notes",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(100), nullable=False),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("note_type", sa.String(50), nullable=True),
+        sa.Column("wrong_count", sa.Integer(), nullable=True),
+        sa.Column("last_chosen", sa.String(20), nullable=True),
+        sa.Column("last_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("user_id", "question_id", name="uq_wrong_note_user_question"),
+    )
+    op.create_index("idx_wrong_note_user_last", "wrong_notes", ["user_id", "last_at", "id"])
+
+
+def downgrade():
+    op.drop_table("wrong_notes")
@@ -0,0 +1,34 @@
+"""review_cards: SM-2 복습 카드
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-06-25
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "review_cards",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(100), nullable=False),
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("ease", sa.Float(), nullable=True),
+        sa.Column("interval", sa.Float(), nullable=True),
+        sa.Column("repetitions", sa.Integer(), nullable=True),
+        sa.Column("lapses", sa.Integer(), nullable=True),
+        sa.Column("due_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_reviewed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint("user_id", "question_id", name="uq_review_card_user_question"),
+    )
+    op.create_index("idx_review_card_user_due", "review_cards", ["user_id", "due_at"])
+
+
+def downgrade():
+    op.drop_table("review_cards")
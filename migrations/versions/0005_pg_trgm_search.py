@@ -0,0 +1,30 @@
+"""PostgreSQL: pg_trgm GIN 인덱스 (부분 문자열 ILIKE 검색용, SQLite는 FTS5 사용)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-07-01
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+_COLUMNS = ("stem", "options", "explanation")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for col in _COLUMNS:
+        op.execute(f"CREATE INDEX IF NOT EXISTS idx_question_{col}_trgm "
+                   f"ON questions USING gin ({col} gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for col in _COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS idx_question_{col}_trgm")
@@ -0,0 +1,42 @@
+"""user_category_stats / question_stats: 정답률 집계 테이블
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-07-10
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_category_stats",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(100), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("subcategory", sa.String(100), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("correct", sa.Integer(), nullable=True),
+        sa.Column("last_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("user_id", "category", "subcategory", name="uq_user_category_stat"),
+    )
+    op.create_table(
+        "question_stats",
+        sa.Column("question_id", sa.Integer(), sa.ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("correct", sa.Integer(), nullable=True),
+        sa.Column("last_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    # 보존 기간 지난 풀이 기록 정리 (created_at 범위 삭제)
+    op.create_index("idx_attempt_created", "attempts", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("idx_attempt_created", table_name="attempts")
+    op.drop_table("question_stats")
+    op.drop_table("user_category_stats")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, func, Index
+from sqlalchemy import Column, Integer, String, Text, Boolean, Float, ForeignKey, DateTime, func, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from db import Base
 import json
@@ -18,6 +18,9 @@ class Question(Base):
     category = Column(String(100), nullable=True, index=True)        # 대분류
     subcategory = Column(String(100), nullable=True, index=True)     # 소분류
     source = Column(String(255), nullable=True)          # 출처 (파일명/페이지 등)
+    content_hash = Column(String(64), nullable=True)                 # stem+options 해시 (중복 적재 방지)
+    duplicate_of = Column(Integer, ForeignKey("questions.id", ondelete="SET NULL"),
+                          nullable=True, index=True)                 # 근사 중복이면 대표 문항 id
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())  # 생성 시각
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())        # 수정 시각
@@ -36,6 +39,8 @@ class Question(Base):
     __table_args__ = (
         Index("idx_question_category", "category"),
         Index("idx_question_subcategory", "subcategory"),
+        Index("idx_question_cat_sub_id", "category", "subcategory", "id"),   # 카테고리별 keyset 페이지
+        Index("uq_question_content_hash", "content_hash", unique=True),
     )
 
 
@@ -56,3 +61,85 @@ class Attempt(Base):
 
     # 관계 (양방향)
     question = relationship("Question", back_populates="attempts")
+
+    # 인덱스
+    __table_args__ = (
+        Index("idx_attempt_user_question", "user_id", "question_id"),
+        Index("idx_attempt_created", "created_at"),   # 보존 기간 정리
+    )
+
+
+# -----------------------
+# 오답/복습 노트 테이블 (사용자 × 문항당 1행, 풀이 기록 시 갱신)
+# -----------------------
+class WrongNote(Base):
+    __tablename__ = "wrong_notes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(100), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    note_type = Column(String(50), default="wrong")      # wrong / review
+    wrong_count = Column(Integer, default=0)             # 틀린 횟수
+    last_chosen = Column(String(20), nullable=True)      # 마지막으로 틀린 답
+    last_at = Column(DateTime(timezone=True), nullable=False)   # 마지막으로 틀린/추가한 시각 (정렬·커서 기준)
+
+    question = relationship("Question")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "question_id", name="uq_wrong_note_user_question"),
+        Index("idx_wrong_note_user_last", "user_id", "last_at", "id"),
+    )
+
+
+# -----------------------
+# 복습 카드 테이블 (SM-2 간격 반복, 사용자 × 문항당 1행)
+# -----------------------
+class ReviewCard(Base):
+    __tablename__ = "review_cards"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(100), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    ease = Column(Float, default=2.5)                    # 난이도 계수 (최소 1.3)
+    interval = Column(Float, default=0)                  # 복습 간격 (일)
+    repetitions = Column(Integer, default=0)             # 연속 정답 횟수
+    lapses = Column(Integer, default=0)                  # 틀린 횟수
+    due_at = Column(DateTime(timezone=True), nullable=False)    # 다음 복습 시각
+    last_reviewed_at = Column(DateTime(timezone=True), nullable=True)
+
+    question = relationship("Question")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "question_id", name="uq_review_card_user_question"),
+        Index("idx_review_card_user_due", "user_id", "due_at"),   # 다음 복습 문항 선택
+    )
+
+
+# -----------------------
+# 정답률 집계 테이블 (풀이 기록 시 증분 갱신, /api/stats 는 이것만 조회)
+# -----------------------
+class UserCategoryStat(Base):
+    """사용자 × 대분류 × 소분류 (분류 없는 문항은 빈 문자열)"""
+    __tablename__ = "user_category_stats"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(100), nullable=False)
+    category = Column(String(100), nullable=False, default="")
+    subcategory = Column(String(100), nullable=False, default="")
+    attempts = Column(Integer, default=0)                # 채점된 풀이 수
+    correct = Column(Integer, default=0)                 # 정답 수
+    last_at = Column(DateTime(timezone=True), nullable=False)   # 마지막 풀이 시각
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "category", "subcategory", name="uq_user_category_stat"),
+    )
+
+
+class QuestionStat(Base):
+    """문항별 전체 사용자 풀이 수 / 정답 수"""
+    __tablename__ = "question_stats"
+
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    last_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,45 +1,295 @@
 from pathlib import Path
-from pdf2image import convert_from_path
-import json, sqlite3, os
-from paddleocr import PaddleOCR
-from schemas import PageExtraction
-
-DB_PATH = "data/questions.db"
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pdf2image import convert_from_path, pdfinfo_from_path
+import json, os, re, time
+from importlib import metadata
+from schemas import PageExtraction, Question
+from extract_cache import get_cache, sha256_hex, file_digest, normalize_text
+from image_prep import DEFAULT_PREP, prep_id, to_array, preprocess
+import rule_extract
+from text_layer import open_text_layer
+import boilerplate
+from metrics import PipelineTrace
+
+# OCR 워커 수 (0 또는 미설정 → CPU 코어 수 - 1)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))
+
+# 페이지 이미지는 요청할 때만 내용 해시 경로(data/images/<hash>.png)로 저장
+SAVE_PAGE_IMAGES = os.getenv("SAVE_PAGE_IMAGES", "0") not in ("0", "false")
+IMAGE_DIR = "data/images"
+
+# 캐시 키 구성요소: OCR 엔진 버전 / 프롬프트 버전 (프롬프트 수정 시 올릴 것)
+# (paddleocr 는 OCR 워커에서만 import → 버전은 패키지 메타데이터로 확인)
+try:
+    OCR_MODEL_ID = f"paddleocr-{metadata.version('paddleocr')}"
+except metadata.PackageNotFoundError:
+    OCR_MODEL_ID = "paddleocr-unknown"
+PROMPT_VERSION = "v1"
 
 
 # -------------------------
-# DB 초기화
+# 텍스트 청킹 (문항 경계 인식)
 # -------------------------
-def init_db():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS questions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        page INTEGER,
-        stem TEXT,
-        options TEXT,
-        answer TEXT,
-        explanation TEXT,
-        image_path TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
+# 줄 맨 앞의 문항 번호: "1.", "12)", "Q12", "Question 3", "문제 5", "NO.7"
+QUESTION_BOUNDARY = re.compile(
+    r"^[ \t]*(?:(?:문제|Q(?:uestion)?|NO\.?)[ \t]*\d{1,4}|\d{1,4}[.)])",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def split_questions(text: str):
+    """문항 번호 위치에서 텍스트를 나눔 (번호 앞의 머리말은 첫 조각)"""
+    starts = [m.start() for m in QUESTION_BOUNDARY.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(text))
+    return [text[a:b].strip("\n") for a, b in zip(starts, starts[1:]) if text[a:b].strip()]
+
+
+def _hard_split(segment, budget, size):
+    """한 문항이 예산을 넘으면 줄 단위 → 글자 단위로 분할"""
+    pieces, cur = [], ""
+    for line in segment.split("\n"):
+        cand = f"{cur}\n{line}" if cur else line
+        if size(cand) <= budget:
+            cur = cand
+            continue
+        if cur:
+            pieces.append(cur)
+        while size(line) > budget:
+            # 예산에 들어가는 가장 긴 접두사를 이분 탐색 (한글은 글자당 여러 토큰일 수 있음)
+            lo, hi = 1, len(line)
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if size(line[:mid]) <= budget:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            pieces.append(line[:lo])
+            line = line[lo:]
+        cur = line
+    if cur:
+        pieces.append(cur)
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int = 2000, max_tokens: int = None, count_tokens=None):
+    """
+    문항 경계 단위로 묶어 청크 생성.
+    max_tokens + count_tokens(토크나이저 기반)가 주어지면 토큰 예산, 아니면 글자 수 기준.
+    """
+    if max_tokens and count_tokens:
+        budget, size = max_tokens, count_tokens
+    else:
+        budget, size = max_chars, len
+
+    chunks, cur = [], ""
+    for seg in split_questions(text):
+        cand = f"{cur}\n{seg}" if cur else seg
+        if size(cand) <= budget:
+            cur = cand
+            continue
+        if cur:
+            chunks.append(cur)
+        if size(seg) <= budget:
+            cur = seg
+        else:
+            *full, cur = _hard_split(seg, budget, size)
+            chunks.extend(full)
+    if cur:
+        chunks.append(cur)
+    return chunks
 
 
 # -------------------------
-# 텍스트 청킹
+# 병렬 OCR (프로세스 풀, 워커별 PaddleOCR 인스턴스)
 # -------------------------
-def chunk_text(text: str, max_chars: int = 2000):
-    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+_worker_ocr = None
+
+
+def _init_ocr_worker(lang):
+    """프로세스 풀 initializer: 워커마다 PaddleOCR를 한 번만 로드"""
+    global _worker_ocr
+    from paddleocr import PaddleOCR   # 무거운 import 는 실제 OCR 할 때만
+    _worker_ocr = PaddleOCR(use_angle_cls=True, lang=lang)
+
+
+def _ocr_page(image, prep=None):
+    """image: 렌더링한 페이지 배열 (전처리 후 파일 없이 바로 OCR)"""
+    result = _worker_ocr.ocr(preprocess(image, prep), cls=True)
+    return "\n".join([line[1][0] for line in result[0]]) if result and result[0] else ""
+
+
+class _InlineExecutor:
+    """워커 1개일 때: 풀 없이 현재 프로세스에서 바로 실행"""
+
+    def __init__(self, initializer, initargs):
+        initializer(*initargs)
+
+    def submit(self, fn, *args):
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def _done(value):
+    fut = Future()
+    fut.set_result(value)
+    return fut
+
+
+def _runs(indices):
+    """[1,2,3,7,8] → [(1,3), (7,8)] : 연속 구간만 한 번에 렌더링"""
+    runs = []
+    for i in indices:
+        if runs and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return [tuple(r) for r in runs]
+
+
+def iter_page_texts(pdf_path, lang="korean", poppler_path=None, dpi=200,
+                    workers=None, max_in_flight=None, window=None, cache=None, total=None,
+                    worker=None, prep=None, save_images=None, text_layer=None, trace=None):
+    """
+    페이지를 window 단위(first_page/last_page)로 렌더링하고 OCR을 워커 풀에 분산.
+    동시에 처리 중인 페이지는 max_in_flight로 제한하며, 결과는 페이지 순서대로
+    (page_idx, img_path, text)를 yield 합니다.
+    cache가 주어지면 캐시된 페이지는 렌더링/OCR 없이 바로 재생합니다.
+    worker(상주 추출 워커)가 주어지면 OCR 모델이 이미 로드된 워커에 보냅니다.
+    페이지는 PNG로 저장하지 않고 배열로 OCR에 넘기며, save_images면 내용 해시 경로에 저장
+    (img_path는 저장했을 때만, 아니면 None).
+    text_layer(TextLayer)가 주어지면 텍스트 레이어가 있는 페이지는 렌더링/OCR 없이 그 텍스트를 사용.
+    trace(PipelineTrace): 단계별 시간 기록 (render / ocr 대기 / text_layer)
+    """
+    trace = trace if trace is not None else PipelineTrace(save=False)
+    workers = workers or OCR_WORKERS or max(1, (os.cpu_count() or 2) - 1)
+    max_in_flight = max_in_flight or workers * 2
+    window = window or max_in_flight
+
+    total = total or pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+    print(f"[INFO] 총 {total} 페이지 (OCR 워커 {workers}개, 동시 처리 최대 {max_in_flight} 페이지)")
+
+    prep = DEFAULT_PREP if prep is None else prep
+    save_images = SAVE_PAGE_IMAGES if save_images is None else save_images
+    if save_images:
+        os.makedirs(IMAGE_DIR, exist_ok=True)
+    ocr_id = f"{OCR_MODEL_ID}|{lang}|{prep_id(prep)}"
+    pdf_hash = file_digest(pdf_path) if cache else None
+
+    pool = None
+
+    def get_pool():
+        # 모든 페이지가 캐시에 있으면 OCR 모델을 아예 로드하지 않음
+        nonlocal pool
+        if pool is None:
+            with trace.stage("ocr_load"):
+                if workers == 1:
+                    pool = _InlineExecutor(_init_ocr_worker, (lang,))
+                else:
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker,
+                                               initargs=(lang,))
+        return pool
+
+    # (page_idx, img_path, future, page_key, img_key) — 제출 순서 = 페이지 순서
+    pending = deque()
+
+    def pop_ready():
+        idx, path, fut, page_key, img_key = pending.popleft()
+        if fut.done():
+            text = fut.result()
+        else:
+            # 병렬 OCR은 워커에서 돌므로 여기서는 파이프라인이 OCR을 기다린 시간
+            with trace.stage("ocr", page=idx):
+                text = fut.result()
+        if cache:
+            if page_key:
+                cache.put("page", page_key, text)
+            if img_key:
+                cache.put("ocr", img_key, text)
+        return idx, path, text
+
+    try:
+        for first in range(1, total + 1, window):
+            last = min(first + window - 1, total)
+
+            # (1) PDF 해시 + 페이지 번호로 조회 → 히트면 렌더링 생략
+            page_keys, cached = {}, {}
+            for page_idx in range(first, last + 1):
+                if cache:
+                    page_keys[page_idx] = sha256_hex(pdf_hash, page_idx, dpi, ocr_id)
+                    text = cache.get_text("page", page_keys[page_idx])
+                    if text is not None:
+                        cached[page_idx] = text
+                        continue
+                # 디지털 PDF 페이지는 내장 텍스트 그대로 (이미지 페이지만 OCR)
+                if text_layer is not None:
+                    with trace.stage("text_layer", page=page_idx):
+                        text = text_layer.page_text(page_idx)
+                    if text is not None:
+                        cached[page_idx] = text
+
+            # (2) 미스 페이지만 연속 구간 단위로 렌더링
+            rendered = {}
+            todo = [i for i in range(first, last + 1) if i not in cached]
+            for a, b in _runs(todo):
+                with trace.stage("render", pages=f"{a}-{b}"):
+                    pages = convert_from_path(pdf_path, dpi=dpi, first_page=a, last_page=b,
+                                              poppler_path=poppler_path)
+                rendered.update(enumerate(pages, start=a))
+
+            for page_idx in range(first, last + 1):
+                img_path = None
+                if page_idx in cached:
+                    pending.append((page_idx, img_path, _done(cached[page_idx]), None, None))
+                else:
+                    page = rendered.pop(page_idx)
+                    image = to_array(page)
+                    img_key = None
+                    text = None
+                    if save_images:
+                        digest = sha256_hex(image.shape, image.data)
+                        img_path = os.path.join(IMAGE_DIR, f"{digest[:32]}.png")
+                        if not os.path.exists(img_path):
+                            page.save(img_path, "PNG")
+                    if cache:
+                        # (3) 이미지 내용 해시로 조회 → 일부 페이지만 바뀐 PDF도 재사용
+                        img_key = sha256_hex(image.shape, image.data, ocr_id)
+                        text = cache.get_text("ocr", img_key)
+                    if text is not None:
+                        fut, img_key = _done(text), None
+                    else:
+                        executor = get_pool() if worker is None else None
+                        # 워커 1개(인라인)면 제출 시점에 OCR 실행 → 여기서 "ocr" 시간으로 잡힘
+                        with trace.stage("ocr", page=page_idx):
+                            fut = (worker.ocr(image, lang, prep) if worker
+                                   else executor.submit(_ocr_page, image, prep))
+                    page.close()
+                    pending.append((page_idx, img_path, fut, page_keys.get(page_idx), img_key))
+
+                while len(pending) >= max_in_flight:
+                    yield pop_ready()
+
+        while pending:
+            yield pop_ready()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
 
 
 # -------------------------
 # LLM 로드 (CPU/GPU 자동 감지)
 # -------------------------
-def load_llm(model_name="microsoft/Phi-3-mini-4k-instruct", device=None):
+def load_llm(model_name="microsoft/Phi-3-mini-4k-instruct", device=None, batch_size=4, quantize=None):
+    """quantize="int8": CPU에서 Linear 층을 동적 int8 양자화 (메모리↓, 토큰 생성 속도↑)"""
     print("[INFO] LLM 로드 중... (CPU/GPU 자동 감지)")
 
     import torch
@@ -51,6 +301,17 @@ def load_llm(model_name="microsoft/Phi-3-mini-4k-instruct", device=None):
 
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = AutoModelForCausalLM.from_pretrained(model_name)
+    if quantize == "int8":
+        if device == -1:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            print("[WARN] int8 동적 양자화는 CPU에서만 사용 → 생략")
+            quantize = None
+
+    # 배치 생성용 패딩 (decoder-only 모델은 왼쪽 패딩)
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
 
     pipe = pipeline(
         "text-generation",
@@ -59,16 +320,47 @@ def load_llm(model_name="microsoft/Phi-3-mini-4k-instruct", device=None):
         device=device,
         max_new_tokens=1024,
         temperature=0.0,
+        batch_size=batch_size,
     )
 
     device_name = "GPU" if device == 0 else "CPU"
-    print(f"[INFO] LLM 로드 완료 ✅ (현재 장치: {device_name})")
+    suffix = f", {quantize}" if quantize else ""
+    print(f"[INFO] LLM 로드 완료 ✅ (현재 장치: {device_name}, 배치 {batch_size}{suffix})")
+
+    return HuggingFacePipeline(pipeline=pipe, batch_size=batch_size)
+
+
+def extraction_prompt():
+    """OCR 텍스트 → 문항 JSON 프롬프트 + 파서 (parse_pdf / 상주 워커 공용)"""
+    from langchain.prompts import ChatPromptTemplate
+    from langchain.output_parsers import PydanticOutputParser
 
-    return HuggingFacePipeline(pipeline=pipe)
+    parser = PydanticOutputParser(pydantic_object=PageExtraction)
+    prompt = ChatPromptTemplate.from_template("""
+        아래는 OCR로 추출한 시험 문제 텍스트입니다.
+        문제/보기/정답/해설을 JSON 형식으로 변환하세요.
+
+        {format_instructions}
+
+        OCR 텍스트:
+        {ocr_text}
+        """)
+    return prompt, parser
+
+
+_tokenizers = {}
+
+
+def load_tokenizer(model_name):
+    """청크 토큰 수 계산용 토크나이저 (모델 가중치 없이, 프로세스당 1회)"""
+    if model_name not in _tokenizers:
+        from transformers import AutoTokenizer
+        _tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name)
+    return _tokenizers[model_name]
 
 
 # -------------------------
-# 메인 파이프라인 (OCR + LangChain + DB 저장)
+# 메인 파이프라인 (OCR + LangChain)
 # -------------------------
 def parse_pdf(pdf_path,
               output_json,
@@ -76,108 +368,245 @@ def parse_pdf(pdf_path,
               model_name="microsoft/Phi-3-mini-4k-instruct",
               lang="korean",
               poppler_path=None,
-              use_llm=True):
-
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    Path("data/images").mkdir(parents=True, exist_ok=True)
-
-    print(f"[INFO] PDF → 이미지 변환 중: {pdf_path}")
-    pages = convert_from_path(pdf_path, dpi=200, poppler_path=poppler_path)
-
-    # ✅ 최신 PaddleOCR 버전: use_gpu 제거 (자동 감지)
-    print(f"[INFO] PaddleOCR 로드 중... (lang={lang})")
-    ocr = PaddleOCR(use_angle_cls=True, lang=lang)
-
+              use_llm=True,
+              ocr_workers=None,
+              max_in_flight_pages=None,
+              max_chunk_tokens=1500,
+              llm_batch_size=4,
+              use_cache=True,
+              on_page=None,
+              worker=None,
+              ocr_prep=None,
+              save_images=None,
+              rule_min_confidence=None,
+              use_text_layer=None,
+              strip_boilerplate=None,
+              stats=None,
+              timings=None,
+              save_trace=None):
+    """
+    on_page(page_idx, total_pages, items): 페이지의 모든 청크 처리가 끝날 때마다 호출
+    (업로드 작업에서 페이지 단위 DB 적재/진행률 보고에 사용)
+    worker: 상주 추출 워커(extract_worker) → OCR/LLM 모델을 다시 로드하지 않고 워커에 요청
+    ocr_prep: OCR 전처리 설정 {"grayscale", "max_side", "deskew"} (None이면 환경 변수 기본값)
+    save_images: 페이지 이미지를 data/images/<내용 해시>.png 로 저장 (None이면 SAVE_PAGE_IMAGES)
+    rule_min_confidence: 규칙 추출 신뢰도가 이 이상인 청크는 LLM 생략 (None이면 RULE_MIN_CONFIDENCE, 1 초과면 항상 LLM)
+    use_text_layer: 텍스트 레이어가 있는 페이지는 OCR 생략 (None이면 TEXT_LAYER 환경 변수)
+    strip_boilerplate: 여러 페이지에 반복되는 머리말/광고/URL 줄을 청킹 전에 제거
+                       (None이면 BOILERPLATE_FILTER, 판단을 위해 BOILERPLATE_WINDOW 페이지만큼 늦게 처리)
+    stats: dict를 주면 처리 경로별 개수를 채움
+           청크 {"rule", "cache", "llm", "llm_failed", "ocr_only"} + 페이지 {"text_pages", "image_pages"}
+           + 반복 줄 제거 {"boilerplate_lines", "boilerplate_tokens"}
+    timings: dict를 주면 단계별 누적 시간/LLM 토큰 요약을 채움 (/metrics 에도 반영)
+             {"seconds", "stages": {"render", "ocr", "llm", "store", ...}, "tokens_in", "tokens_out", "tokens_per_sec"}
+    save_trace: 단계별 이벤트를 data/debug/trace-*.json 으로 저장 (None이면 PIPELINE_TRACE)
+    """
     all_results = []
+    count_tokens = None
+    cache = get_cache() if use_cache else None
+    if cache:
+        cache.reset_stats()
+    if rule_min_confidence is None:
+        rule_min_confidence = rule_extract.MIN_CONFIDENCE
+    stats = stats if stats is not None else {}
+    stats.update({"rule": 0, "cache": 0, "llm": 0, "llm_failed": 0, "ocr_only": 0,
+                  "text_pages": 0, "image_pages": 0, "boilerplate_lines": 0, "boilerplate_tokens": 0})
+
+    trace = PipelineTrace(pdf_path, save=save_trace)
+
+    # 텍스트 레이어가 있으면 페이지 수도 pdfplumber 로 (텍스트 PDF는 poppler 호출 없이 끝남)
+    with trace.stage("page_count"):
+        text_layer = open_text_layer(pdf_path, enabled=use_text_layer)
+        total_pages = (text_layer.page_count if text_layer
+                       else pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"])
 
     # -------------------------
     # LangChain 파이프라인 준비
     # -------------------------
-    if use_llm:
-        from langchain.prompts import ChatPromptTemplate
-        from langchain.output_parsers import PydanticOutputParser
-
-        llm = load_llm(model_name=model_name)
-        parser = PydanticOutputParser(pydantic_object=PageExtraction)
-        format_instructions = parser.get_format_instructions()
-
-        prompt = ChatPromptTemplate.from_template("""
-        아래는 OCR로 추출한 시험 문제 텍스트입니다.
-        문제/보기/정답/해설을 JSON 형식으로 변환하세요.
-
-        {format_instructions}
+    if worker is not None and worker.model_name != model_name:
+        print(f"[WARN] 상주 워커 모델({worker.model_name})이 요청 모델({model_name})과 달라 직접 로드")
+        worker = None
 
-        OCR 텍스트:
-        {ocr_text}
-        """)
-        chain = prompt | llm | parser
+    if use_llm:
+        # 청크 크기 계산용 토크나이저만 먼저, 모델은 규칙/캐시로 못 끝낸 청크가 생길 때 로드
+        tokenizer = load_tokenizer(model_name)
+        count_tokens = lambda t: len(tokenizer.encode(t, add_special_tokens=False))
+        llm_chain = {}
+
+        def run_batch(texts):
+            tokens_in = sum(count_tokens(t) for t in texts)
+            if worker is not None:
+                # 모델은 워커에 상주 (생성 토큰/시간은 워커가 측정)
+                before = worker.stats["llm_tokens"], worker.stats["llm_seconds"]
+                with trace.stage("llm", chunks=len(texts)):
+                    outputs = worker.extract(texts)
+                trace.tokens(tokens_in, worker.stats["llm_tokens"] - before[0],
+                             worker.stats["llm_seconds"] - before[1])
+                return outputs
+            if not llm_chain:
+                with trace.stage("llm_load"):
+                    llm = load_llm(model_name=model_name, batch_size=llm_batch_size)
+                    prompt, parser = extraction_prompt()
+                    llm_chain["chain"] = prompt | llm | parser
+                    llm_chain["format_instructions"] = parser.get_format_instructions()
+            t0 = time.perf_counter()
+            with trace.stage("llm", chunks=len(texts)):
+                outputs = llm_chain["chain"].batch(
+                    [{"ocr_text": t, "format_instructions": llm_chain["format_instructions"]} for t in texts],
+                    return_exceptions=True,
+                )
+            # 생성 토큰은 파싱된 JSON 기준 근사치 (파싱 실패 청크 제외)
+            tokens_out = sum(count_tokens(json.dumps(o.dict(), ensure_ascii=False))
+                             for o in outputs if not isinstance(o, Exception))
+            trace.tokens(tokens_in, tokens_out, time.perf_counter() - t0)
+            return outputs
 
     # -------------------------
-    # 페이지별 OCR + LLM 파싱
+    # 페이지별 OCR(병렬) + LLM 파싱
     # -------------------------
-    for page_idx, page in enumerate(pages, start=1):
-        img_path = f"data/images/page_{page_idx}.png"
-        page.save(img_path, "PNG")
-
-        result = ocr.ocr(img_path, cls=True)
-        page_text = "\n".join([line[1][0] for line in result[0]]) if result and result[0] else ""
-        chunks = chunk_text(page_text, max_chars=max_chars)
+    # ✅ 최신 PaddleOCR 버전: use_gpu 제거 (자동 감지), 워커마다 1회 로드
+    print(f"[INFO] PDF → 이미지 변환 + OCR 중: {pdf_path} (lang={lang})")
+    page_iter = iter_page_texts(pdf_path, lang=lang, poppler_path=poppler_path,
+                                workers=ocr_workers, max_in_flight=max_in_flight_pages,
+                                cache=cache, total=total_pages, worker=worker,
+                                prep=ocr_prep, save_images=save_images, text_layer=text_layer,
+                                trace=trace)
+    bp_filter = None
+    if boilerplate.ENABLED if strip_boilerplate is None else strip_boilerplate:
+        bp_filter = boilerplate.BoilerplateFilter(count_tokens=count_tokens)
+        page_iter = bp_filter.filter_pages(page_iter)
+
+    # 페이지 완료 추적: 청크가 여러 배치에 걸쳐도 마지막 청크가 끝나면 on_page 호출
+    page_items = {}   # page_idx → 추출된 문항
+    page_left = {}    # page_idx → 남은 청크 수
+
+    def finish_page(page_idx):
+        items = page_items.pop(page_idx)
+        del page_left[page_idx]
+        all_results.extend(items)
+        if on_page:
+            with trace.stage("store", page=page_idx):   # 업로드 작업: 페이지 단위 DB 적재
+                on_page(page_idx, total_pages, items)
+
+    def chunk_done(page_idx, items):
+        page_items[page_idx].extend(items)
+        page_left[page_idx] -= 1
+        if page_left[page_idx] == 0:
+            finish_page(page_idx)
+
+    # 여러 페이지의 청크를 모아 한 번에 배치 생성 (chain.batch → 패딩된 배치 추론)
+    # 캐시 히트 청크는 LLM을 건너뛰고, 처리 순서는 페이지 순서를 유지
+    pending = []  # (page_idx, chunk_no, chunk, cache_key, cached PageExtraction | None)
+    misses = 0
+
+    def flush_batch():
+        nonlocal misses
+        if not pending:
+            return
+        todo = [e for e in pending if e[4] is None]
+        outputs = []
+        if todo:
+            print(f"[INFO] LLM 배치 처리 중... (청크 {len(todo)}개, "
+                  f"페이지 {todo[0][0]}~{todo[-1][0]})")
+            outputs = run_batch([e[2] for e in todo])
+        results = iter(outputs)
+        batch = list(pending)
+        pending.clear()
+        misses = 0
+        for page_idx, i, _, key, parsed in batch:
+            if parsed is None:
+                parsed = next(results)
+                if isinstance(parsed, Exception):
+                    print(f"[WARN] 페이지 {page_idx}, 청크 {i} 파싱 실패: {parsed}")
+                    stats["llm_failed"] += 1
+                    chunk_done(page_idx, [])
+                    continue
+                stats["llm"] += 1
+                if cache:
+                    cache.put("extract", key, json.dumps(parsed.dict(), ensure_ascii=False))
+            chunk_done(page_idx, parsed.items)
+
+    def cached_extraction(key):
+        raw = cache.get_text("extract", key) if cache else None
+        return PageExtraction(**json.loads(raw)) if raw else None
+
+    for page_idx, img_path, page_text in page_iter:
+        with trace.stage("chunk", page=page_idx):
+            chunks = chunk_text(page_text, max_chars=max_chars,
+                                max_tokens=max_chunk_tokens, count_tokens=count_tokens)
+        print(f"[INFO] 페이지 {page_idx}/{total_pages} - 청크 {len(chunks)}개")
+
+        page_items[page_idx] = []
+        page_left[page_idx] = len(chunks)
+        if not chunks:
+            finish_page(page_idx)
+            continue
+
+        if not use_llm:
+            # LLM 미사용: 규칙 추출 결과 (아무것도 못 찾으면 OCR 원문 앞부분을 문항 초안으로 저장)
+            page_left[page_idx] = 1
+            with trace.stage("rule", page=page_idx):
+                items = [q for c in chunks for q in rule_extract.extract_questions(c)["items"]]
+            stats["rule" if items else "ocr_only"] += len(chunks)
+            chunk_done(page_idx, items or [Question(stem=page_text[:100], options={}, answer="", explanation="")])
+            continue
 
         for i, chunk in enumerate(chunks, start=1):
-            print(f"[INFO] 페이지 {page_idx} - 청크 {i}/{len(chunks)} 처리 중...")
-
-            if use_llm:
-                try:
-                    parsed: PageExtraction = chain.invoke({
-                        "ocr_text": chunk,
-                        "format_instructions": format_instructions
-                    })
-
-                    for q in parsed.items:
-                        all_results.append(q)
-                        cursor.execute("""
-                            INSERT INTO questions (page, stem, options, answer, explanation, image_path)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            page_idx,
-                            q.stem,
-                            json.dumps(q.options, ensure_ascii=False),
-                            q.answer,
-                            q.explanation,
-                            img_path
-                        ))
-                except Exception as e:
-                    print(f"[WARN] 페이지 {page_idx}, 청크 {i} 파싱 실패: {e}")
+            key = sha256_hex(normalize_text(chunk), model_name, PROMPT_VERSION)
+            # 번호/보기/정답 표시가 뚜렷한 청크는 규칙 추출로 끝냄 (결정적이라 캐시 불필요)
+            with trace.stage("rule", page=page_idx):
+                rule = rule_extract.extract_questions(chunk)
+            if rule["items"] and rule["confidence"] >= rule_min_confidence:
+                parsed = PageExtraction(items=rule["items"])
+                stats["rule"] += 1
             else:
-                cursor.execute("""
-                    INSERT INTO questions (page, stem, options, answer, explanation, image_path)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    page_idx,
-                    page_text[:100],
-                    "[]",
-                    "",
-                    "",
-                    img_path
-                ))
-
-    conn.commit()
-    conn.close()
+                parsed = cached_extraction(key)
+                if parsed is not None:
+                    stats["cache"] += 1
+            pending.append((page_idx, i, chunk, key, parsed))
+            if parsed is None:
+                misses += 1
+            # 앞에 대기 중인 미스가 없으면 캐시 히트는 바로 반영
+            if misses >= llm_batch_size or misses == 0:
+                flush_batch()
+
+    if use_llm:
+        flush_batch()
+
+    if text_layer is not None:
+        stats["text_pages"], stats["image_pages"] = text_layer.stats["text"], text_layer.stats["image"]
+        text_layer.close()
+    else:
+        stats["image_pages"] = total_pages
+    if bp_filter is not None:
+        bp_filter.report()
+        stats["boilerplate_lines"] = bp_filter.stats["lines"]
+        stats["boilerplate_tokens"] = bp_filter.stats["tokens"]
+    print(f"[INFO] 페이지 처리: 텍스트 레이어 {stats['text_pages']} / OCR 대상 {stats['image_pages']}")
+
+    if cache:
+        cache.report()
+    print(f"[INFO] 청크 처리 경로: 규칙 {stats['rule']} / 캐시 {stats['cache']} / "
+          f"LLM {stats['llm']} (실패 {stats['llm_failed']}) / OCR 초안 {stats['ocr_only']}")
 
     # -------------------------
     # JSON 저장
     # -------------------------
-    Path(output_json).parent.mkdir(parents=True, exist_ok=True)
-    Path(output_json).write_text(
-        json.dumps(
-            [q.dict() if hasattr(q, "dict") else q for q in all_results],
-            ensure_ascii=False, indent=2
-        ),
-        encoding="utf-8"
-    )
-
+    with trace.stage("write_json"):
+        Path(output_json).parent.mkdir(parents=True, exist_ok=True)
+        Path(output_json).write_text(
+            json.dumps(
+                [q.dict() if hasattr(q, "dict") else q for q in all_results],
+                ensure_ascii=False, indent=2
+            ),
+            encoding="utf-8"
+        )
+
+    summary = trace.finish(stats)
+    if timings is not None:
+        timings.update({k: summary[k] for k in ("seconds", "stages", "tokens_in", "tokens_out", "tokens_per_sec")})
+    slowest = sorted(summary["stages"].items(), key=lambda kv: -kv[1])[:5]
+    print(f"[INFO] 단계별 시간 (총 {summary['seconds']:.1f}s): "
+          + " / ".join(f"{k} {v:.1f}s" for k, v in slowest))
     print(f"[INFO] ✅ 전체 파싱 완료 (총 {len(all_results)} 문항)")
     return all_results
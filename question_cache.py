@@ -0,0 +1,136 @@
+import os, time, threading
+from collections import OrderedDict
+from sqlalchemy import select
+from db import SessionLocal
+from models import Question
+from fastjson import dumps_bytes
+
+# -----------------------
+# 자주 푸는 문항 캐시 (LRU + TTL, 프로세스 내)
+# -----------------------
+# 문항 id → (보기 JSON을 한 번만 파싱한 dict, 미리 직렬화한 응답 bytes)
+# 적재/수정/중복 처리/재분류 시 invalidate() → 버전 증가로 전체 무효화 (또는 id 단위 삭제)
+CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "5000"))
+CACHE_TTL = float(os.getenv("QUESTION_CACHE_TTL", "600"))   # 다른 프로세스에서 바뀐 경우 대비
+
+# 클라이언트에 보내는 필드 (정답/해설은 채점 API에서만)
+_PUBLIC = ("id", "question", "options", "category", "subcategory")
+
+
+class CachedQuestion:
+    __slots__ = ("data", "payload", "version", "expires")
+
+    def __init__(self, data, version, ttl):
+        self.data = data
+        self.payload = dumps_bytes({k: data[k] for k in _PUBLIC})
+        self.version = version
+        self.expires = time.monotonic() + ttl
+
+    def response(self, **extra):
+        """미리 직렬화한 bytes 반환. extra 가 있으면 JSON 객체 끝에 필드만 이어 붙임 (다시 직렬화 안 함)"""
+        if not extra:
+            return self.payload
+        return self.payload[:-1] + b"," + dumps_bytes(extra)[1:]
+
+
+class QuestionCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._version = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, qid):
+        """→ CachedQuestion 또는 None (문항 없음)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(qid)
+            if entry is not None:
+                if entry.version == self._version and entry.expires > now:
+                    self._items.move_to_end(qid)
+                    self.stats["hits"] += 1
+                    return entry
+                del self._items[qid]
+                self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            version = self._version
+
+        entry = self._load(qid, version)
+        if entry is None:
+            return None
+        with self._lock:
+            if version == self._version:     # 로드 도중 무효화됐다면 저장하지 않음
+                self._items[qid] = entry
+                self._items.move_to_end(qid)
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+                    self.stats["evictions"] += 1
+        return entry
+
+    def _load(self, qid, version):
+        db = SessionLocal()
+        try:
+            q = db.get(Question, qid)
+            if q is None:
+                return None
+            data = {
+                "id": q.id,
+                "question": q.stem,
+                "options": q.get_options(),
+                "category": q.category,
+                "subcategory": q.subcategory,
+                "answer": q.answer,
+                "explanation": q.explanation,
+                "duplicate_of": q.duplicate_of,
+            }
+        finally:
+            db.close()
+        return CachedQuestion(data, version, self.ttl)
+
+    def invalidate(self, ids=None):
+        with self._lock:
+            self.stats["invalidations"] += 1
+            if ids is None:
+                self._version += 1
+                self._items.clear()
+            else:
+                for qid in ids:
+                    self._items.pop(qid, None)
+
+    def status(self):
+        with self._lock:
+            s = dict(self.stats)
+            s["size"] = len(self._items)
+        lookups = s["hits"] + s["misses"]
+        s["hit_rate"] = round(s["hits"] / lookups, 4) if lookups else 0.0
+        s["maxsize"] = self.maxsize
+        s["ttl"] = self.ttl
+        return s
+
+
+_cache = QuestionCache()
+
+
+def get_question(qid):
+    return _cache.get(qid)
+
+
+def invalidate(ids=None):
+    """ids 를 주면 해당 문항만, 없으면 전체 무효화"""
+    _cache.invalidate(ids)
+
+
+def cache_status():
+    return _cache.status()
+
+
+def first_question_id(db, after=0, category=None, subcategory=None):
+    """조건에 맞는 다음 문항 id (id만 조회 → 인덱스로 처리, 본문은 캐시에서)"""
+    query = select(Question.id).where(Question.id > after, Question.duplicate_of.is_(None))
+    if category:
+        query = query.where(Question.category == category)
+    if subcategory:
+        query = query.where(Question.subcategory == subcategory)
+    return db.scalar(query.order_by(Question.id).limit(1))
@@ -0,0 +1,134 @@
+import os, re
+from schemas import Question
+
+# -----------------------
+# 규칙 기반 문항 추출 (LLM 없이 번호/보기/정답/해설 표시로 분리)
+# -----------------------
+# 번호가 매겨진 객관식 레이아웃은 정규식으로 충분 → 신뢰도가 낮은 청크만 LLM으로 보냄.
+MIN_CONFIDENCE = float(os.getenv("RULE_MIN_CONFIDENCE", "0.8"))
+
+# 문항 시작: "12.", "12)", "Q12", "Question 3", "문제 5", "NO.7" (번호를 캡처)
+QUESTION_START = re.compile(
+    r"^[ \t]*(?:(?:문제|Q(?:uestion)?|NO\.?)[ \t]*(\d{1,4})[.):]?|(\d{1,4})[.)])[ \t]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+# 보기: 줄 맨 앞 "A.", "B)", "(C)" / 원문자 ①~⑥ (줄 중간에 이어 써도 인식)
+OPTION_LINE = re.compile(r"^[ \t]*(?:\(([A-Fa-f])\)|([A-Fa-f])[.)])[ \t]+", re.MULTILINE)
+CIRCLED = "①②③④⑤⑥"
+OPTION_CIRCLED = re.compile(f"[{CIRCLED}]")
+# 정답 / 해설 구역
+ANSWER = re.compile(
+    r"^[ \t]*(?:정답|답|Correct\s+Answer|Answer)[ \t]*[:：.]?[ \t]*"
+    rf"((?:[A-Fa-f{CIRCLED}](?![a-z]))(?:[ \t]*[,/ ][ \t]*[A-Fa-f{CIRCLED}](?![a-z]))*)",
+    re.IGNORECASE | re.MULTILINE,
+)
+EXPLANATION = re.compile(r"^[ \t]*(?:해설|설명|풀이|Explanation)[ \t]*[:：.]?[ \t]*",
+                         re.IGNORECASE | re.MULTILINE)
+
+LETTERS = "ABCDEF"
+
+
+def _letter(mark):
+    mark = mark.strip()
+    return LETTERS[CIRCLED.index(mark)] if mark in CIRCLED else mark.upper()
+
+
+def _clean(text):
+    return re.sub(r"[ \t]+", " ", text or "").strip()
+
+
+def _split_blocks(text):
+    """문항 번호 위치에서 나눔 → [(번호, 본문)], 첫 번호 앞 머리말 길이"""
+    matches = list(QUESTION_START.finditer(text))
+    blocks = []
+    for m, nxt in zip(matches, matches[1:] + [None]):
+        end = nxt.start() if nxt else len(text)
+        blocks.append((int(m.group(1) or m.group(2)), text[m.end():end]))
+    preamble = matches[0].start() if matches else len(text)
+    return blocks, preamble
+
+
+def _parse_options(body):
+    """보기 구역 → {"A": "...", ...} (줄 머리 표시 우선, 없으면 원문자)"""
+    marks = [(m.start(), m.end(), m.group(1) or m.group(2)) for m in OPTION_LINE.finditer(body)]
+    if len(marks) < 2:
+        marks = [(m.start(), m.end(), m.group(0)) for m in OPTION_CIRCLED.finditer(body)]
+    options = {}
+    for (start, end, mark), nxt in zip(marks, marks[1:] + [None]):
+        options.setdefault(_letter(mark), _clean(body[end:nxt[0] if nxt else len(body)]))
+    stem = body[:marks[0][0]] if marks else body
+    return stem, options
+
+
+def parse_block(body):
+    """
+    문항 1개 → (Question 또는 None, 신뢰도 0~1, 감점 사유 목록)
+    """
+    reasons = []
+    expl = EXPLANATION.search(body)
+    explanation = _clean(body[expl.end():]) if expl else ""
+    if expl:
+        body = body[:expl.start()]
+
+    ans = ANSWER.search(body)
+    answers = []
+    if ans:
+        answers = [_letter(a) for a in re.findall(rf"[A-Fa-f{CIRCLED}]", ans.group(1))]
+        # 정답 줄 뒤에 이어진 해설(표시 없이)은 해설로
+        if not explanation:
+            explanation = _clean(body[ans.end():])
+        body = body[:ans.start()]
+
+    stem, options = _parse_options(body)
+    stem = _clean(stem)
+
+    if not stem or len(options) < 2:
+        return None, 0.0, ["보기/본문 없음"]
+
+    score = 1.0
+    keys = "".join(options)
+    if keys != LETTERS[:len(keys)]:
+        score -= 0.3
+        reasons.append("보기 순서")
+    if not answers:
+        score -= 0.4
+        reasons.append("정답 없음")
+    elif any(a not in options for a in answers):
+        score -= 0.5
+        reasons.append("정답이 보기에 없음")
+    elif len(answers) > 1:
+        score -= 0.2
+        reasons.append("복수 정답")
+    if any(not v for v in options.values()):
+        score -= 0.3
+        reasons.append("빈 보기")
+
+    q = Question(stem=stem, options=options, answer=",".join(answers), explanation=explanation)
+    return q, max(0.0, score), reasons
+
+
+def extract_questions(text):
+    """
+    청크 텍스트 → {"items": [Question], "confidence": 0~1, "reasons": [...]}
+    confidence: 문항별 신뢰도의 최솟값 × 문항이 차지하는 텍스트 비율 보정
+    """
+    text = text or ""
+    blocks, preamble = _split_blocks(text)
+    if not blocks:
+        return {"items": [], "confidence": 0.0, "reasons": ["문항 번호 없음"]}
+
+    items, scores, reasons = [], [], []
+    for number, body in blocks:
+        q, score, why = parse_block(body)
+        scores.append(score)
+        reasons += [f"{number}번: {r}" for r in why]
+        if q is not None:
+            items.append(q)
+
+    confidence = min(scores)
+    # 번호 앞 머리말이 길면 앞 페이지에서 이어진 문항일 수 있음 (규칙으로는 못 붙임)
+    body_len = len(text.strip()) or 1
+    if len(text[:preamble].strip()) > 0.3 * body_len:
+        confidence *= 0.5
+        reasons.append("번호 앞 텍스트가 김")
+    return {"items": items, "confidence": round(confidence, 3), "reasons": reasons}
@@ -0,0 +1,178 @@
+import re, html
+from sqlalchemy import text
+from db import engine
+
+# -----------------------
+# FTS5 전문 검색 (stem / options / explanation)
+# -----------------------
+# trigram 토크나이저: 한국어처럼 띄어쓰기 단위가 애매한 텍스트도 부분 문자열로 검색 가능
+# (대소문자 무시, 3글자 이상 검색어부터 인덱스 사용)
+FTS_TABLE = "questions_fts"
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        stem, options, explanation,
+        content='questions', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    # questions 테이블 변경 시 자동 동기화
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, stem, options, explanation)
+        VALUES (new.id, new.stem, new.options, new.explanation);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stem, options, explanation)
+        VALUES ('delete', old.id, old.stem, old.options, old.explanation);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, stem, options, explanation)
+        VALUES ('delete', old.id, old.stem, old.options, old.explanation);
+        INSERT INTO {FTS_TABLE}(rowid, stem, options, explanation)
+        VALUES (new.id, new.stem, new.options, new.explanation);
+    END
+    """,
+]
+
+_fts_enabled = False
+
+
+def init_search_index():
+    """FTS5 테이블/트리거 생성. 처음 만들 때는 기존 문항으로 인덱스 재구성"""
+    global _fts_enabled
+    if engine.dialect.name != "sqlite":
+        # PostgreSQL 등: pg_trgm 인덱스(마이그레이션 0005) + ILIKE 검색
+        return False
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)
+        ).first()
+        try:
+            for ddl in _DDL:
+                conn.exec_driver_sql(ddl)
+        except Exception as e:
+            # SQLite 3.34 미만은 trigram 미지원 → LIKE 검색으로 폴백
+            print(f"[WARN] FTS5 인덱스 생성 실패 ({e}) → LIKE 검색 사용")
+            return False
+        if not exists:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            print("[INFO] 검색 인덱스 생성 완료")
+    _fts_enabled = True
+    return True
+
+
+# -----------------------
+# 검색어 처리
+# -----------------------
+def _split_terms(q: str):
+    """공백 기준 분리 → (trigram 검색어, 3글자 미만 검색어)"""
+    terms = [t for t in re.split(r"\s+", q.strip()) if t]
+    long_terms = [t for t in terms if len(t) >= 3]
+    short_terms = [t for t in terms if len(t) < 3]
+    return long_terms, short_terms
+
+
+def _match_expr(terms):
+    # 각 검색어를 구문("...")으로 감싸 FTS 문법 문자(-, :, * 등)를 무력화 (AND 결합)
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def _like(term):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+# 스니펫 하이라이트 표시: 저장된 텍스트에 나오지 않는 제어 문자 → HTML 이스케이프 후 <mark> 로 치환
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+
+def _highlight(snippet):
+    """저장된 문항 텍스트는 이스케이프하고 검색어 표시만 <mark> 태그로"""
+    text = html.escape(snippet or "")
+    return text.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+# -----------------------
+# 검색 API
+# -----------------------
+def search_questions(q, category=None, subcategory=None, limit=20, offset=0):
+    """
+    BM25 순위 + 스니펫 하이라이트 + 카테고리 facet
+    → {"total", "facets": {category: count}, "items": [...]}
+    """
+    long_terms, short_terms = _split_terms(q)
+    if not long_terms and not short_terms:
+        return {"total": 0, "facets": {}, "items": []}
+
+    params = {"limit": limit, "offset": offset}
+    where = ["q.duplicate_of IS NULL"]   # 다른 조회 경로와 같이 근사 중복 문항은 제외
+    if _fts_enabled and long_terms:
+        source = f"{FTS_TABLE} JOIN questions q ON q.id = {FTS_TABLE}.rowid"
+        where.append(f"{FTS_TABLE} MATCH :match")
+        params["match"] = _match_expr(long_terms)
+        snippet = f"snippet({FTS_TABLE}, -1, '{_MARK_START}', '{_MARK_END}', '…', 16)"
+        score = f"bm25({FTS_TABLE})"
+        like_terms = short_terms
+    else:
+        source = "questions q"
+        snippet = "substr(q.stem, 1, 120)"
+        score = "0.0"
+        like_terms = long_terms + short_terms
+
+    # 3글자 미만 검색어는 trigram으로 찾을 수 없으므로 LIKE 조건으로 추가 필터
+    like = "ILIKE" if engine.dialect.name == "postgresql" else "LIKE"   # SQLite LIKE는 기본이 대소문자 무시
+    for i, term in enumerate(like_terms):
+        where.append(
+            f"(q.stem {like} :t{i} ESCAPE '\\' OR q.options {like} :t{i} ESCAPE '\\' "
+            f"OR q.explanation {like} :t{i} ESCAPE '\\')"
+        )
+        params[f"t{i}"] = _like(term)
+
+    base_where = " AND ".join(where)
+
+    with engine.connect() as conn:
+        # facet: 카테고리 필터 적용 전 기준으로 집계
+        facets = {
+            (cat or "Unknown"): cnt
+            for cat, cnt in conn.execute(text(
+                f"SELECT q.category, COUNT(*) FROM {source} WHERE {base_where} "
+                f"GROUP BY q.category ORDER BY COUNT(*) DESC"
+            ), params)
+        }
+
+        filtered = base_where
+        if category:
+            filtered += " AND q.category = :category"
+            params["category"] = category
+        if subcategory:
+            filtered += " AND q.subcategory = :subcategory"
+            params["subcategory"] = subcategory
+
+        total = conn.execute(text(
+            f"SELECT COUNT(*) FROM {source} WHERE {filtered}"
+        ), params).scalar()
+
+        rows = conn.execute(text(
+            f"SELECT q.id, q.category, q.subcategory, {snippet} AS snippet, {score} AS score "
+            f"FROM {source} WHERE {filtered} ORDER BY score, q.id LIMIT :limit OFFSET :offset"
+        ), params).all()
+
+    return {
+        "total": total,
+        "facets": facets,
+        "items": [
+            {
+                "id": r.id,
+                "category": r.category,
+                "subcategory": r.subcategory,
+                "snippet": _highlight(r.snippet),
+                "score": round(-r.score, 4) or 0.0,   # bm25()는 낮을수록 관련도 높음 → 부호 반전
+            }
+            for r in rows
+        ],
+    }
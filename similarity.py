@@ -1,8 +1,425 @@
+import os, json, time, threading
+import numpy as np
 from db import SessionLocal
 from models import Question
 
+# -----------------------
+# 임베딩 설정
+# -----------------------
+# 한국어/영어 혼합 문항을 위해 다국어 MiniLM 사용 (384차원)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+INDEX_PATH = os.getenv("EMBEDDING_INDEX_PATH", "./data/embeddings.npz")
+SAVE_EVERY = int(os.getenv("EMBEDDING_SAVE_EVERY", "500"))          # 증분 추가 n건마다 파일 저장
+REFRESH_SECONDS = int(os.getenv("EMBEDDING_REFRESH_SECONDS", "60"))  # 다른 프로세스가 저장한 파일 확인 주기
+
+
+def question_text(stem, options) -> str:
+    """임베딩 입력 텍스트 (문제 본문 + 보기)"""
+    # 예전 DB 값: JSON 문자열로 (여러 번) 감싼 보기 / ["A. ...", "B. ..."] 리스트
+    while isinstance(options, str):
+        try:
+            options = json.loads(options) if options else {}
+        except ValueError:
+            options = [options]
+    if isinstance(options, dict):
+        options = options.values()
+    return (stem or "") + "\n" + " ".join(str(o) for o in (options or ()))
+
+
+# -----------------------
+# 벡터 인덱스 (NumPy 연속 행렬)
+# -----------------------
+class VectorIndex:
+    """
+    문항 임베딩을 연속된 float32 행렬에 보관하고, 코사인 유사도 top-k 검색을
+    한 번의 행렬곱으로 수행합니다. (임베딩은 정규화되어 있으므로 내적 = 코사인)
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, path=INDEX_PATH):
+        self.model_name = model_name
+        self.path = path
+        self._lock = threading.RLock()
+        self._model = None
+        self._loaded = False
+        self._n = 0
+        self._vecs = None                              # (capacity, dim) float32
+        self._ids = np.empty(0, dtype=np.int64)
+        self._cats = np.empty(0, dtype=np.int32)       # 카테고리 코드
+        self._subs = np.empty(0, dtype=np.int32)       # 서브카테고리 코드
+        self._previews = []
+        self._pos = {}                                 # question id → 행 번호
+        self._codes = {}                               # 카테고리 이름 → 코드
+        self._names = []
+        self._mtime = None                             # 마지막으로 읽거나 쓴 파일 시각
+
+    # ----- 내부 헬퍼 -----
+    def _get_model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts):
+        vecs = self._get_model().encode(
+            list(texts), batch_size=64, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        )
+        return np.ascontiguousarray(vecs, dtype=np.float32)
+
+    def _code(self, name):
+        if name not in self._codes:
+            self._codes[name] = len(self._names)
+            self._names.append(name)
+        return self._codes[name]
+
+    def _reserve(self, extra, dim):
+        """행렬 용량을 2배씩 늘려 추가 시 전체 복사를 최소화"""
+        need = self._n + extra
+        cap = 0 if self._vecs is None else self._vecs.shape[0]
+        if need <= cap:
+            return
+        new_cap = max(need, cap * 2, 1024)
+        vecs = np.zeros((new_cap, dim), dtype=np.float32)
+        ids = np.zeros(new_cap, dtype=np.int64)
+        cats = np.zeros(new_cap, dtype=np.int32)
+        subs = np.zeros(new_cap, dtype=np.int32)
+        if self._n:
+            vecs[:self._n] = self._vecs[:self._n]
+            ids[:self._n] = self._ids[:self._n]
+            cats[:self._n] = self._cats[:self._n]
+            subs[:self._n] = self._subs[:self._n]
+        self._vecs, self._ids, self._cats, self._subs = vecs, ids, cats, subs
+
+    # ----- 변경 -----
+    def add(self, rows, vecs=None):
+        """
+        rows: [(id, text, category, subcategory, preview), ...]
+        이미 있는 id는 벡터/메타데이터만 갱신합니다. (전체 재빌드 없음)
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        if vecs is None:
+            vecs = self.encode([r[1] for r in rows])
+        with self._lock:
+            self._reserve(len(rows), vecs.shape[1])
+            for (qid, _, cat, sub, preview), vec in zip(rows, vecs):
+                row = self._pos.get(qid)
+                if row is None:
+                    row = self._n
+                    self._n += 1
+                    self._pos[qid] = row
+                    self._previews.append(preview)
+                else:
+                    self._previews[row] = preview
+                self._vecs[row] = vec
+                self._ids[row] = qid
+                self._cats[row] = self._code(cat)
+                self._subs[row] = self._code(sub)
+        return len(rows)
+
+    def set_categories(self, rows):
+        """rows: [(id, category, subcategory), ...] → 재분류된 문항의 필터용 코드만 갱신 (재임베딩 없음)"""
+        changed = 0
+        with self._lock:
+            for qid, cat, sub in rows:
+                row = self._pos.get(qid)
+                if row is None:
+                    continue
+                cat_code, sub_code = self._code(cat), self._code(sub)
+                if self._cats[row] != cat_code or self._subs[row] != sub_code:
+                    self._cats[row], self._subs[row] = cat_code, sub_code
+                    changed += 1
+        return changed
+
+    def remove(self, ids):
+        """삭제된 문항 제거 (마지막 행을 빈 자리로 옮기는 swap-remove)"""
+        with self._lock:
+            for qid in ids:
+                row = self._pos.pop(qid, None)
+                if row is None:
+                    continue
+                last = self._n - 1
+                if row != last:
+                    self._vecs[row] = self._vecs[last]
+                    self._ids[row] = self._ids[last]
+                    self._cats[row] = self._cats[last]
+                    self._subs[row] = self._subs[last]
+                    self._previews[row] = self._previews[last]
+                    self._pos[int(self._ids[row])] = row
+                self._previews.pop()
+                self._n = last
+
+    # ----- 검색 -----
+    def vector_of(self, qid):
+        row = self._pos.get(qid)
+        return None if row is None else self._vecs[row]
+
+    def search(self, query_vecs, k=3, exclude_ids=None, category=None, subcategory=None):
+        """
+        query_vecs: (dim,) 또는 (m, dim) 정규화 벡터
+        → 쿼리별 [(id, score, preview), ...] 리스트
+        """
+        q = np.atleast_2d(np.asarray(query_vecs, dtype=np.float32))
+        with self._lock:
+            n = self._n
+            if n == 0 or k <= 0:
+                return [[] for _ in range(q.shape[0])]
+
+            mask = None
+            if category:
+                code = self._codes.get(category)
+                if code is None:
+                    return [[] for _ in range(q.shape[0])]
+                mask = self._cats[:n] == code
+            if subcategory:
+                code = self._codes.get(subcategory)
+                if code is None:
+                    return [[] for _ in range(q.shape[0])]
+                sub_mask = self._subs[:n] == code
+                mask = sub_mask if mask is None else (mask & sub_mask)
+
+            scores = q @ self._vecs[:n].T                # (m, n) 한 번의 행렬곱
+            if mask is not None:
+                scores[:, ~mask] = -np.inf
+            for qid in exclude_ids or ():
+                row = self._pos.get(qid)
+                if row is not None:
+                    scores[:, row] = -np.inf
+
+            kk = min(k, n)
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            results = []
+            for i in range(q.shape[0]):
+                cand = top[i][np.argsort(-scores[i, top[i]])]
+                results.append([
+                    (int(self._ids[r]), float(scores[i, r]), self._previews[r])
+                    for r in cand if np.isfinite(scores[i, r])
+                ])
+            return results
+
+    # ----- 저장/로드 -----
+    def save(self):
+        with self._lock:
+            n = self._n
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp.npz"
+            np.savez(
+                tmp,
+                model=np.array(self.model_name),
+                vecs=self._vecs[:n] if n else np.zeros((0, 0), dtype=np.float32),
+                ids=self._ids[:n],
+                cats=self._cats[:n],
+                subs=self._subs[:n],
+                names=np.array(self._names, dtype=object),
+                previews=np.array(self._previews, dtype=object),
+            )
+            os.replace(tmp, self.path)
+            self._mtime = os.path.getmtime(self.path)
+
+    def file_changed(self):
+        """다른 프로세스가 인덱스 파일을 저장했으면 True"""
+        try:
+            return os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return False
+
+    def _read_file(self):
+        """저장된 행 중 아직 없는 id 만 추가 (첫 로드 / 다른 프로세스가 추가한 문항)"""
+        if not os.path.exists(self.path):
+            return 0
+        self._mtime = os.path.getmtime(self.path)
+        data = np.load(self.path, allow_pickle=True)
+        if str(data["model"]) != self.model_name or not len(data["ids"]):
+            return 0
+        names = [None if x is None else str(x) for x in data["names"]]
+        new = [i for i, qid in enumerate(data["ids"]) if int(qid) not in self._pos]
+        rows = [(int(data["ids"][i]), None, names[data["cats"][i]], names[data["subs"][i]],
+                 str(data["previews"][i])) for i in new]
+        return self.add(rows, vecs=data["vecs"][new]) if rows else 0
+
+    def load(self):
+        """저장된 인덱스를 읽고, DB와 차이나는 문항만 임베딩/제거"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._read_file()
+            self._sync_with_db()
+            self._loaded = True
+
+    def refresh(self):
+        """다른 프로세스(업로드 워커 등)가 저장한 문항 반영"""
+        with self._lock:
+            added = self._read_file()
+            if added:
+                print(f"[INFO] 임베딩 인덱스 파일에서 {added}건 반영")
+            self._sync_with_db()
+
+    def _sync_with_db(self):
+        db = SessionLocal()
+        try:
+            # 근사 중복으로 표시된 문항은 추천 대상에서 제외
+            db_rows = db.query(Question.id, Question.category, Question.subcategory) \
+                        .filter(Question.duplicate_of.is_(None)).all()
+            db_ids = {r.id for r in db_rows}
+            stale = [qid for qid in self._pos if qid not in db_ids]
+            missing = [qid for qid in db_ids if qid not in self._pos]
+            if stale:
+                self.remove(stale)
+            # 다른 프로세스(재분류 CLI 등)에서 바뀐 분류 반영
+            recoded = self.set_categories(db_rows)
+            for start in range(0, len(missing), 1000):
+                batch = missing[start:start + 1000]
+                qs = db.query(Question).filter(Question.id.in_(batch)).all()
+                self.add(_rows_for(qs))
+            if stale or missing or recoded:
+                print(f"[INFO] 임베딩 인덱스 동기화: +{len(missing)} / -{len(stale)} / 분류 변경 {recoded}")
+                self.save()
+        finally:
+            db.close()
+
+
+def _rows_for(questions):
+    return [
+        (q.id, question_text(q.stem, q.options), q.category, q.subcategory, (q.stem or "")[:50])
+        for q in questions
+    ]
+
+
+# -----------------------
+# 전역 인덱스 (프로세스당 1개)
+# -----------------------
+# 모델 로드 / 누락 문항 임베딩은 백그라운드 스레드에서 → 준비 전 요청은 카테고리 기반 추천
+_index = VectorIndex()
+_disabled = False
+_state_lock = threading.Lock()
+_loader = None          # 로드/동기화 스레드
+_last_check = 0.0
+_unsaved = 0            # 저장 안 된 증분 추가 수
+
+
+def _load():
+    global _disabled
+    try:
+        _index.load()
+        print(f"[INFO] 임베딩 인덱스 준비 완료 ({_index._n}문항)")
+    except Exception as e:
+        # 미설치(ImportError) / 모델 다운로드·로드 실패(OSError 등) 모두 폴백
+        print(f"[WARN] 임베딩 검색 비활성화 ({e}) → 카테고리 기반 추천 사용")
+        _disabled = True
+
+
+def _refresh():
+    try:
+        _index.refresh()
+    except Exception as e:
+        print(f"[WARN] 임베딩 인덱스 갱신 확인 실패: {e}")
+
+
+def _start(target):
+    global _loader
+    with _state_lock:
+        if _loader is not None and _loader.is_alive():
+            return
+        _loader = threading.Thread(target=target, name="embedding-index", daemon=True)
+        _loader.start()
+
+
+def warm_index():
+    """앱 시작 시 호출: 인덱스 로드 / DB 동기화를 백그라운드로 시작"""
+    if not _disabled and not _index._loaded:
+        _start(_load)
+
+
+def _ready_index(wait=False):
+    """
+    준비된 인덱스 또는 None (카테고리 폴백).
+    wait=False(요청 경로): 준비 전이면 백그라운드 로드만 시작하고 바로 반환,
+    준비 후에는 REFRESH_SECONDS 마다 다른 프로세스가 저장한 파일을 백그라운드로 반영.
+    wait=True(적재/재분류/CLI): 준비될 때까지 기다림
+    """
+    global _last_check
+    if _disabled:
+        return None
+    if not _index._loaded:
+        warm_index()
+        loader = _loader
+        if not wait or loader is None:
+            return None
+        loader.join()
+        return None if _disabled or not _index._loaded else _index
+    now = time.monotonic()
+    if not wait and now - _last_check >= REFRESH_SECONDS:
+        _last_check = now
+        if _index.file_changed():
+            _start(_refresh)
+    return _index
+
+
+def flush_index():
+    """증분 추가분 저장 (적재 끝에 호출)"""
+    global _unsaved
+    with _state_lock:
+        if not _unsaved or not _index._loaded:
+            return
+        _unsaved = 0
+    _index.save()
+
+
+def index_questions(rows):
+    """
+    새로 적재된 문항을 인덱스에 증분 추가 (ingest에서 호출)
+    rows: [(id, stem, options, category, subcategory), ...]
+    파일 저장은 SAVE_EVERY 건마다 / flush_index() 에서 (페이지마다 전체 파일을 다시 쓰지 않음)
+    """
+    global _unsaved
+    index = _ready_index(wait=True)
+    if index is None or not rows:
+        return 0
+    added = index.add(
+        (qid, question_text(stem, options), cat, sub, (stem or "")[:50])
+        for qid, stem, options, cat, sub in rows
+    )
+    with _state_lock:
+        _unsaved += added
+        full = _unsaved >= SAVE_EVERY
+    if full:
+        flush_index()
+    return added
+
+
+def update_index_categories(rows):
+    """
+    재분류 후 인덱스의 대/소분류 갱신 (classify.reclassify_all 에서 호출)
+    rows: [(id, category, subcategory), ...]
+    """
+    index = _ready_index(wait=True)
+    if index is None or not rows:
+        return 0
+    changed = index.set_categories(rows)
+    if changed:
+        index.save()
+    return changed
+
+
 def similar_questions(base_text, k=3, exclude_db_id=None, category=None, subcategory=None):
-    """간단히 같은 카테고리에서 몇 개 추천"""
+    """임베딩 코사인 유사도로 비슷한 문항 top-k 추천"""
+    index = _ready_index()
+    if index is None:
+        return _similar_by_category(k, exclude_db_id, category, subcategory)
+
+    # 이미 인덱스에 있는 문항이면 저장된 벡터 재사용 (인코딩 생략)
+    vec = index.vector_of(exclude_db_id) if exclude_db_id else None
+    if vec is None:
+        vec = index.encode([base_text])[0]
+
+    exclude = [exclude_db_id] if exclude_db_id else None
+    hits = index.search(vec, k=k, exclude_ids=exclude, category=category, subcategory=subcategory)[0]
+    return [{"id": qid, "stem": preview, "score": round(score, 4)} for qid, score, preview in hits]
+
+
+def _similar_by_category(k, exclude_db_id, category, subcategory):
+    """간단히 같은 카테고리에서 몇 개 추천 (임베딩 사용 불가 시)"""
     db = SessionLocal()
     try:
         query = db.query(Question)
@@ -12,6 +429,7 @@ def similar_questions(base_text, k=3, exclude_db_id=None, category=None, subcate
             query = query.filter(Question.subcategory == subcategory)
         if exclude_db_id:
             query = query.filter(Question.id != exclude_db_id)
+        query = query.filter(Question.duplicate_of.is_(None))
         return [
             {"id": q.id, "stem": q.stem[:50]}
             for q in query.limit(k).all()
@@ -0,0 +1,218 @@
+import os, time, threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, exists, and_
+from db import SessionLocal, upsert_stmt
+from models import Question, Attempt, ReviewCard
+
+# -----------------------
+# 간격 반복 (SM-2) 설정
+# -----------------------
+MIN_EASE = 1.3
+START_EASE = 2.5
+RELEARN_MINUTES = int(os.getenv("SRS_RELEARN_MINUTES", "10"))   # 틀린 문제는 이 시간 뒤 다시 출제
+NEW_CURSOR_TTL = float(os.getenv("SRS_NEW_CURSOR_TTL", "300"))  # 새 문항 커서 유지 시간 (재분류/중복 해제 반영)
+MAX_NEW_CURSORS = 10000
+
+
+def quality_of(attempt):
+    """응답 품질 0~5 (UI에서 따로 받지 않으면 정답 4 / 오답 1)"""
+    q = attempt.get("quality")
+    if q is not None:
+        return max(0, min(5, int(q)))
+    return 4 if attempt["correct"] else 1
+
+
+def schedule(card, quality, now):
+    """
+    SM-2 한 단계 진행. card: {"ease", "interval", "repetitions", "lapses"} (없으면 새 카드)
+    → 갱신된 card dict (+ due_at, last_reviewed_at)
+    """
+    ease = card.get("ease") or START_EASE
+    interval = card.get("interval") or 0
+    reps = card.get("repetitions") or 0
+    lapses = card.get("lapses") or 0
+
+    if quality >= 3:
+        if reps == 0:
+            interval = 1
+        elif reps == 1:
+            interval = 6
+        else:
+            interval = round(interval * ease, 2)
+        reps += 1
+        due = now + timedelta(days=interval)
+    else:
+        reps, interval = 0, 0
+        lapses += 1
+        due = now + timedelta(minutes=RELEARN_MINUTES)
+
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return {"ease": round(ease, 3), "interval": interval, "repetitions": reps, "lapses": lapses,
+            "due_at": due, "last_reviewed_at": now}
+
+
+# -----------------------
+# 풀이 기록 → 카드 갱신 (호출하는 쪽 트랜잭션 안에서 실행)
+# -----------------------
+_UPSERT_COLS = ("ease", "interval", "repetitions", "lapses", "due_at", "last_reviewed_at")
+
+
+def apply_reviews(db, attempts):
+    """
+    attempts: [{"user_id", "question_id", "correct", "quality"?, "graded"?, "created_at"?}, ...] (시간순)
+    - 채점된 풀이: SM-2로 간격/ease 갱신
+    - 복습노트 수동 추가(graded=False): 카드가 없으면 만들고 바로 복습 대상으로
+    """
+    attempts = [a for a in attempts if a.get("question_id")]
+    if not attempts:
+        return 0
+
+    # 기존 카드 상태를 사용자별로 한 번에 조회
+    by_user = {}
+    for a in attempts:
+        by_user.setdefault(a["user_id"], set()).add(a["question_id"])
+    cards = {}
+    for user_id, qids in by_user.items():
+        for c in db.execute(
+            select(ReviewCard.question_id, *[getattr(ReviewCard, col) for col in _UPSERT_COLS])
+            .where(ReviewCard.user_id == user_id, ReviewCard.question_id.in_(list(qids)))
+        ):
+            cards[(user_id, c.question_id)] = dict(c._mapping)
+
+    for a in attempts:
+        key = (a["user_id"], a["question_id"])
+        now = a.get("created_at") or datetime.now(timezone.utc)
+        card = cards.get(key, {})
+        if not a.get("graded", True):
+            # 간격은 그대로, 지금 복습 대상으로
+            card = {**card, "due_at": now}
+            card.setdefault("ease", START_EASE)
+        else:
+            card = {**card, **schedule(card, quality_of(a), now)}
+        cards[key] = card
+
+    rows = [
+        {"user_id": u, "question_id": qid,
+         "ease": c.get("ease", START_EASE), "interval": c.get("interval") or 0,
+         "repetitions": c.get("repetitions") or 0, "lapses": c.get("lapses") or 0,
+         "due_at": c["due_at"], "last_reviewed_at": c.get("last_reviewed_at")}
+        for (u, qid), c in cards.items()
+    ]
+    db.execute(upsert_stmt(ReviewCard, ["user_id", "question_id"],
+                           lambda ex: {col: getattr(ex, col) for col in _UPSERT_COLS}), rows)
+    return len(rows)
+
+
+# -----------------------
+# 새 문항 커서 (프로세스 내)
+# -----------------------
+# (사용자, 대/소분류) → 이 id 이하 문항은 모두 카드가 있음 → 새 문항은 그 뒤부터 keyset 으로 찾음.
+# 카드는 늘기만 하므로 커서는 계속 유효. 재분류 / 중복 해제로 앞쪽에 새 문항이 생기는 경우는 TTL 후 처음부터 다시 찾음
+_new_cursors = {}
+_cursor_lock = threading.Lock()
+
+
+def _get_cursor(key):
+    with _cursor_lock:
+        hit = _new_cursors.get(key)
+    return hit[0] if hit and hit[1] > time.monotonic() else 0
+
+
+def _set_cursor(key, last_id):
+    with _cursor_lock:
+        if len(_new_cursors) >= MAX_NEW_CURSORS and key not in _new_cursors:
+            _new_cursors.clear()
+        old = _new_cursors.get(key)
+        expires = old[1] if old and old[1] > time.monotonic() else time.monotonic() + NEW_CURSOR_TTL
+        _new_cursors[key] = (last_id, expires)
+
+
+# -----------------------
+# 다음 복습 문항 (user_id, due_at) 인덱스 범위 스캔
+# -----------------------
+def due_questions(user_id, limit=20, category=None, subcategory=None, include_new=True, now=None):
+    """
+    복습 시각이 지난 카드(오래된 순) → 부족하면 아직 안 푼 문항으로 채움
+    → {"items": [...], "next_due_at": 다음 복습 시각 또는 None}
+    """
+    now = now or datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        query = (select(ReviewCard, Question)
+                 .join(Question, Question.id == ReviewCard.question_id)
+                 .where(ReviewCard.user_id == user_id, ReviewCard.due_at <= now))
+        if category:
+            query = query.where(Question.category == category)
+        if subcategory:
+            query = query.where(Question.subcategory == subcategory)
+        rows = db.execute(query.order_by(ReviewCard.due_at).limit(limit)).all()
+
+        items = [_item(q, c) for c, q in rows]
+
+        if include_new and len(items) < limit:
+            # 카드가 없는 문항 (uq_review_card_user_question 인덱스로 NOT EXISTS 확인)
+            # 커서 뒤부터만 찾음 → 카드가 많은 사용자도 이미 푼 앞쪽 문항을 매번 다시 훑지 않음
+            key = (user_id, category, subcategory)
+            cursor = _get_cursor(key)
+            has_card = exists().where(and_(ReviewCard.user_id == user_id,
+                                           ReviewCard.question_id == Question.id))
+            new_q = select(Question).where(Question.id > cursor, Question.duplicate_of.is_(None), ~has_card)
+            if category:
+                new_q = new_q.where(Question.category == category)
+            if subcategory:
+                new_q = new_q.where(Question.subcategory == subcategory)
+            new_items = db.scalars(new_q.order_by(Question.id).limit(limit - len(items))).all()
+            if new_items:
+                _set_cursor(key, new_items[0].id - 1)
+            items += [_item(q) for q in new_items]
+
+        next_due = None
+        if not rows:
+            next_due = db.scalar(select(ReviewCard.due_at)
+                                 .where(ReviewCard.user_id == user_id, ReviewCard.due_at > now)
+                                 .order_by(ReviewCard.due_at).limit(1))
+        return {"items": items, "next_due_at": next_due.isoformat() if next_due else None}
+    finally:
+        db.close()
+
+
+def _item(q, card=None):
+    return {
+        "id": q.id,
+        "question": q.stem,
+        "options": q.get_options(),
+        "category": q.category,
+        "subcategory": q.subcategory,
+        "is_new": card is None,
+        "due_at": card.due_at.isoformat() if card else None,
+        "interval": card.interval if card else 0,
+        "ease": card.ease if card else START_EASE,
+        "repetitions": card.repetitions if card else 0,
+    }
+
+
+# -----------------------
+# 기존 풀이 기록을 순서대로 재생해 카드 만들기 (테이블 최초 생성 시)
+# -----------------------
+def backfill_review_cards(batch_size=1000):
+    db = SessionLocal()
+    try:
+        query = (select(Attempt.user_id, Attempt.question_id, Attempt.chosen, Attempt.correct,
+                        Attempt.note_type, Attempt.created_at)
+                 .order_by(Attempt.id))
+        total = 0
+        batch = []
+        for r in db.execute(query).yield_per(batch_size):
+            # /api/review_add 로 추가된 기록은 채점되지 않은 풀이
+            graded = not (r.note_type == "review" and r.chosen == "(복습 추가)")
+            batch.append({**r._mapping, "graded": graded})
+            if len(batch) >= batch_size:
+                total += apply_reviews(db, batch)
+                batch.clear()
+        total += apply_reviews(db, batch)
+        db.commit()
+    finally:
+        db.close()
+    if total:
+        print(f"[INFO] 복습 카드 생성 완료: {total}건")
+    return total
@@ -0,0 +1,76 @@
+import os, re
+
+# -----------------------
+# PDF 텍스트 레이어 (디지털 PDF는 OCR 없이 pdfplumber 로 바로 추출)
+# -----------------------
+# 페이지마다 쓸 만한 텍스트가 있는지 판단 → 있으면 그 텍스트, 없으면(스캔 이미지) None → OCR
+TEXT_LAYER = os.getenv("TEXT_LAYER", "1") not in ("0", "false")
+MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "40"))        # 이보다 짧으면 이미지 페이지로 봄
+MAX_BAD_RATIO = float(os.getenv("TEXT_LAYER_MAX_BAD_RATIO", "0.1"))  # 깨진 글자 비율 상한
+
+# 글꼴 매핑이 없는 PDF는 "(cid:123)" 이나 대체 문자(�)로 나옴
+_BAD = re.compile(r"\(cid:\d+\)|�")
+
+
+def usable(text, min_chars=MIN_CHARS):
+    """추출한 텍스트가 OCR 대신 쓸 만한지"""
+    body = re.sub(r"\s+", "", text or "")
+    if len(body) < min_chars:
+        return False
+    bad = sum(len(m) for m in _BAD.findall(body))
+    return bad / len(body) <= MAX_BAD_RATIO
+
+
+class TextLayer:
+    """
+    pdfplumber 로 페이지 텍스트를 읽는 핸들 (with 문 사용).
+    page_text(i): 텍스트 레이어가 쓸 만하면 읽기 순서(위→아래, 왼→오른)의 텍스트, 아니면 None
+    """
+
+    def __init__(self, pdf_path, min_chars=MIN_CHARS):
+        import pdfplumber
+        self._pdf = pdfplumber.open(pdf_path)
+        self.min_chars = min_chars
+        self.stats = {"text": 0, "image": 0}
+
+    @property
+    def page_count(self):
+        return len(self._pdf.pages)
+
+    def page_text(self, page_idx):
+        page = self._pdf.pages[page_idx - 1]
+        try:
+            # x_tolerance: 한글은 글자 사이 공백이 좁아 기본값이면 단어가 붙음
+            text = page.extract_text(x_tolerance=1.5, y_tolerance=3) or ""
+        except Exception as e:
+            print(f"[WARN] 페이지 {page_idx} 텍스트 레이어 읽기 실패 → OCR: {e}")
+            text = ""
+        finally:
+            page.close()   # 페이지별 레이아웃 캐시 해제 (큰 PDF 메모리)
+        if usable(text, self.min_chars):
+            self.stats["text"] += 1
+            return text
+        self.stats["image"] += 1
+        return None
+
+    def close(self):
+        self._pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_text_layer(pdf_path, enabled=None):
+    """TextLayer 또는 None (비활성 / pdfplumber 없음 / 열기 실패 → 전부 OCR)"""
+    if not (TEXT_LAYER if enabled is None else enabled):
+        return None
+    try:
+        return TextLayer(pdf_path)
+    except ImportError:
+        print("[WARN] pdfplumber 미설치 → 텍스트 레이어 생략, 모든 페이지 OCR")
+    except Exception as e:
+        print(f"[WARN] 텍스트 레이어 열기 실패 → 모든 페이지 OCR: {e}")
+    return None
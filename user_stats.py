@@ -0,0 +1,235 @@
+import os, argparse
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, delete, insert, func, case
+from db import engine, SessionLocal, upsert_stmt
+from models import Question, Attempt, UserCategoryStat, QuestionStat
+
+# -----------------------
+# 정답률 집계 (사용자 × 대분류/소분류, 문항별)
+# -----------------------
+# 풀이 기록과 같은 트랜잭션에서 증분 반영 → /api/stats 는 attempts 를 스캔하지 않고 집계 테이블만 조회.
+# 집계에 이미 반영돼 있으므로 보존 기간이 지난 원본 풀이 기록은 지워도 통계는 유지됨 (compact_attempts).
+# 대/소분류는 풀이 당시 문항 분류 기준 (classify.reclassify_all 로 재분류해도 기존 집계는 옮기지 않음).
+RETENTION_DAYS = int(os.getenv("ATTEMPT_RETENTION_DAYS", "0"))   # 0 → 원본 풀이 기록 계속 보관
+COMPACT_BATCH = 5000
+REVIEW_ADD_CHOSEN = "(복습 추가)"   # /api/review_add 기록 (채점된 풀이 아님)
+
+
+def _graded(a):
+    return a.get("graded", True) and a.get("chosen") != REVIEW_ADD_CHOSEN
+
+
+def apply_stats(db, attempts):
+    """
+    attempts: [{"user_id", "question_id", "correct", "created_at"?, "category"?, "subcategory"?}, ...] (시간순)
+    분류가 없는 기록은 문항 테이블에서 한 번에 조회
+    """
+    rows = [a for a in attempts if _graded(a)]
+    if not rows:
+        return 0
+    missing = {a["question_id"] for a in rows if "category" not in a}
+    cats = {}
+    if missing:
+        cats = {qid: (c, s) for qid, c, s in db.execute(
+            select(Question.id, Question.category, Question.subcategory).where(Question.id.in_(missing)))}
+
+    users, questions = {}, {}
+    for a in rows:
+        qid = a["question_id"]
+        if "category" in a:
+            cat, sub = a["category"], a.get("subcategory")
+        elif qid in cats:
+            cat, sub = cats[qid]
+        else:
+            continue   # 삭제된 문항
+        at = a.get("created_at") or datetime.now(timezone.utc)
+        ok = 1 if a["correct"] else 0
+        key = (a["user_id"], cat or "", sub or "")
+        u = users.setdefault(key, {"user_id": key[0], "category": key[1], "subcategory": key[2],
+                                   "attempts": 0, "correct": 0, "last_at": at})
+        q = questions.setdefault(qid, {"question_id": qid, "attempts": 0, "correct": 0, "last_at": at})
+        for row in (u, q):
+            row["attempts"] += 1
+            row["correct"] += ok
+            row["last_at"] = at
+    if not users:
+        return 0
+
+    db.execute(upsert_stmt(UserCategoryStat, ["user_id", "category", "subcategory"], lambda ex: {
+        "attempts": UserCategoryStat.attempts + ex.attempts,
+        "correct": UserCategoryStat.correct + ex.correct,
+        "last_at": ex.last_at,
+    }), list(users.values()))
+    db.execute(upsert_stmt(QuestionStat, ["question_id"], lambda ex: {
+        "attempts": QuestionStat.attempts + ex.attempts,
+        "correct": QuestionStat.correct + ex.correct,
+        "last_at": ex.last_at,
+    }), list(questions.values()))
+    return len(rows)
+
+
+def merge_question_stats(db, old_id, new_id):
+    """중복 병합: 없어질 문항의 집계를 대표 문항에 더하고 삭제"""
+    old = db.execute(select(QuestionStat.attempts, QuestionStat.correct, QuestionStat.last_at)
+                     .where(QuestionStat.question_id == old_id)).first()
+    if old is None:
+        return
+    db.execute(upsert_stmt(QuestionStat, ["question_id"], lambda ex: {
+        "attempts": QuestionStat.attempts + ex.attempts,
+        "correct": QuestionStat.correct + ex.correct,
+        "last_at": (func.max if engine.dialect.name == "sqlite" else func.greatest)(QuestionStat.last_at, ex.last_at),
+    }), [{"question_id": new_id, **old._mapping}])
+    db.execute(delete(QuestionStat).where(QuestionStat.question_id == old_id))
+
+
+# -----------------------
+# 조회 (집계 테이블만)
+# -----------------------
+def _rate(correct, attempts):
+    return round(correct / attempts, 4) if attempts else 0.0
+
+
+def _iso(at):
+    return at.isoformat() if at else None
+
+
+def user_stats(user_id, category=None):
+    """
+    → {"user_id", "attempts", "correct", "accuracy", "last_at",
+       "categories": [{"category", ..., "subcategories": [{"subcategory", ...}]}]}  (정답률 낮은 순)
+    """
+    db = SessionLocal()
+    try:
+        query = select(UserCategoryStat).where(UserCategoryStat.user_id == user_id)
+        if category:
+            query = query.where(UserCategoryStat.category == category)
+        rows = db.scalars(query).all()
+    finally:
+        db.close()
+
+    cats = {}
+    for r in rows:
+        c = cats.setdefault(r.category, {"category": r.category or None, "attempts": 0, "correct": 0,
+                                         "last_at": None, "subcategories": []})
+        c["attempts"] += r.attempts
+        c["correct"] += r.correct
+        c["last_at"] = max(c["last_at"], r.last_at) if c["last_at"] else r.last_at
+        c["subcategories"].append({"subcategory": r.subcategory or None, "attempts": r.attempts,
+                                   "correct": r.correct, "accuracy": _rate(r.correct, r.attempts),
+                                   "last_at": _iso(r.last_at)})
+    for c in cats.values():
+        c["accuracy"] = _rate(c["correct"], c["attempts"])
+        c["subcategories"].sort(key=lambda s: (s["accuracy"], -s["attempts"]))
+    categories = sorted(cats.values(), key=lambda c: (c["accuracy"], -c["attempts"]))
+
+    attempts = sum(c["attempts"] for c in categories)
+    correct = sum(c["correct"] for c in categories)
+    last = max((c["last_at"] for c in categories), default=None)
+    for c in categories:
+        c["last_at"] = _iso(c["last_at"])
+    return {"user_id": user_id, "attempts": attempts, "correct": correct,
+            "accuracy": _rate(correct, attempts), "last_at": _iso(last), "categories": categories}
+
+
+def question_stats(question_ids):
+    """문항별 전체 풀이 수 / 정답률 → {question_id: {...}} (풀이 기록 없는 문항은 0)"""
+    db = SessionLocal()
+    try:
+        rows = {r.question_id: r for r in db.scalars(
+            select(QuestionStat).where(QuestionStat.question_id.in_(question_ids)))}
+    finally:
+        db.close()
+    out = {}
+    for qid in question_ids:
+        r = rows.get(qid)
+        out[qid] = {"attempts": r.attempts if r else 0, "correct": r.correct if r else 0,
+                    "accuracy": _rate(r.correct, r.attempts) if r else 0.0,
+                    "last_at": _iso(r.last_at) if r else None}
+    return out
+
+
+# -----------------------
+# 기존 풀이 기록으로 집계 채우기 (테이블 최초 생성 시, GROUP BY 한 번)
+# -----------------------
+def backfill_stats(batch_size=1000):
+    """
+    집계 테이블을 attempts 전체로 다시 만듦.
+    compact_attempts 로 원본을 지운 뒤에 다시 실행하면 지운 기록만큼 통계가 줄어듦 (최초 생성 시에만 사용)
+    """
+    graded = func.coalesce(Attempt.chosen, "") != REVIEW_ADD_CHOSEN
+    correct = func.sum(case((Attempt.correct.is_(True), 1), else_=0))
+    last_at = func.max(Attempt.created_at)
+    cat = func.coalesce(Question.category, "")
+    sub = func.coalesce(Question.subcategory, "")
+    now = datetime.now(timezone.utc)
+
+    db = SessionLocal()
+    try:
+        user_rows = [
+            {"user_id": u, "category": c, "subcategory": s, "attempts": n, "correct": k, "last_at": at or now}
+            for u, c, s, n, k, at in db.execute(
+                select(Attempt.user_id, cat, sub, func.count(), correct, last_at)
+                .join(Question, Question.id == Attempt.question_id)
+                .where(graded).group_by(Attempt.user_id, cat, sub))
+        ]
+        question_rows = [
+            {"question_id": q, "attempts": n, "correct": k, "last_at": at or now}
+            for q, n, k, at in db.execute(
+                select(Attempt.question_id, func.count(), correct, last_at)
+                .join(Question, Question.id == Attempt.question_id)
+                .where(graded).group_by(Attempt.question_id))
+        ]
+        db.execute(delete(UserCategoryStat))
+        db.execute(delete(QuestionStat))
+        for model, rows in ((UserCategoryStat, user_rows), (QuestionStat, question_rows)):
+            for start in range(0, len(rows), batch_size):
+                db.execute(insert(model), rows[start:start + batch_size])
+        db.commit()
+    finally:
+        db.close()
+    if user_rows:
+        print(f"[INFO] 정답률 집계 채우기 완료: 사용자×분류 {len(user_rows)}행, 문항 {len(question_rows)}행")
+    return len(user_rows)
+
+
+# -----------------------
+# 보존 기간 지난 원본 풀이 기록 정리
+# -----------------------
+def compact_attempts(days=RETENTION_DAYS, batch_size=COMPACT_BATCH):
+    """
+    created_at 이 days 일보다 오래된 attempts 삭제 (짧은 트랜잭션으로 나눠서).
+    정답률 집계 / 오답노트 / 복습 카드는 기록 시 이미 반영돼 있어 영향 없음
+    """
+    if days <= 0:
+        print("[WARN] 보존 기간(ATTEMPT_RETENTION_DAYS / --days)이 0 → 정리 안 함")
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            ids = db.scalars(select(Attempt.id).where(Attempt.created_at < cutoff)
+                             .order_by(Attempt.id).limit(batch_size)).all()
+            if not ids:
+                break
+            db.execute(delete(Attempt).where(Attempt.id.in_(ids)))
+            db.commit()
+            total += len(ids)
+    finally:
+        db.close()
+    print(f"[INFO] {days}일 지난 풀이 기록 {total}건 정리 (기준 {cutoff:%Y-%m-%d %H:%M} UTC)")
+    return total
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="정답률 집계 테이블 관리")
+    ap.add_argument("--rebuild", action="store_true", help="attempts 전체로 집계 다시 만들기 (정리 전에만)")
+    ap.add_argument("--compact", action="store_true", help="보존 기간 지난 풀이 기록 삭제")
+    ap.add_argument("--days", type=int, default=RETENTION_DAYS, help="보존 기간(일), 기본 ATTEMPT_RETENTION_DAYS")
+    args = ap.parse_args()
+    if args.rebuild:
+        backfill_stats()
+    if args.compact:
+        compact_attempts(days=args.days)
+    if not (args.rebuild or args.compact):
+        ap.print_help()
@@ -0,0 +1,141 @@
+import json, base64
+from datetime import datetime, timezone
+from sqlalchemy import select, or_, and_
+from db import SessionLocal, upsert_stmt
+from models import Question, Attempt, WrongNote
+
+PAGE_SIZE = 20
+
+
+# -----------------------
+# 풀이 기록 → 오답노트 반영 (호출하는 쪽 트랜잭션 안에서 실행)
+# -----------------------
+def apply_attempts(db, attempts):
+    """
+    attempts: [{"user_id", "question_id", "chosen", "correct", "note_type", "created_at"}, ...] (시간순)
+    - 오답: wrong_count + 1, 마지막 선택/시각 갱신
+    - 복습 추가(정답 + note_type=review): 노트가 없으면 review로 추가, 있으면 시각만 갱신
+    """
+    notes = {}
+    for a in attempts:
+        wrong = not a["correct"]
+        if not wrong and a.get("note_type") != "review":
+            continue
+        key = (a["user_id"], a["question_id"])
+        at = a.get("created_at") or datetime.now(timezone.utc)
+        note = notes.setdefault(key, {
+            "user_id": key[0], "question_id": key[1], "note_type": "review",
+            "wrong_count": 0, "last_chosen": None, "last_at": at,
+        })
+        note["last_at"] = at
+        if wrong:
+            note["note_type"] = "wrong"
+            note["wrong_count"] += 1
+            note["last_chosen"] = a.get("chosen")
+    if not notes:
+        return 0
+
+    # 같은 키는 위에서 한 행으로 합쳤으므로 executemany 한 번으로 upsert
+    wrong_rows = [n for n in notes.values() if n["wrong_count"]]
+    review_rows = [n for n in notes.values() if not n["wrong_count"]]
+    if wrong_rows:
+        db.execute(upsert_stmt(WrongNote, ["user_id", "question_id"], lambda ex: {
+            "note_type": "wrong",
+            "wrong_count": WrongNote.wrong_count + ex.wrong_count,
+            "last_chosen": ex.last_chosen,
+            "last_at": ex.last_at,
+        }), wrong_rows)
+    if review_rows:
+        db.execute(upsert_stmt(WrongNote, ["user_id", "question_id"], lambda ex: {
+            "last_at": ex.last_at,
+        }), review_rows)
+    return len(notes)
+
+
+# -----------------------
+# 조회 (단일 join + 커서 페이지)
+# -----------------------
+def _encode_cursor(note):
+    raw = json.dumps([note.last_at.isoformat(), note.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        at, nid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(at), int(nid)
+    except (ValueError, TypeError):
+        raise ValueError("잘못된 cursor")
+
+
+def list_wrong_notes(user_id, category=None, subcategory=None, note_type=None, cursor=None, limit=PAGE_SIZE):
+    """
+    최근 오답/추가 순으로 한 페이지 반환
+    → {"items": [...], "next_cursor": str 또는 None}
+    """
+    db = SessionLocal()
+    try:
+        query = (select(WrongNote, Question)
+                 .join(Question, Question.id == WrongNote.question_id)
+                 .where(WrongNote.user_id == user_id))
+        if category:
+            query = query.where(Question.category == category)
+        if subcategory:
+            query = query.where(Question.subcategory == subcategory)
+        if note_type:
+            query = query.where(WrongNote.note_type == note_type)
+        if cursor:
+            at, nid = _decode_cursor(cursor)
+            query = query.where(or_(WrongNote.last_at < at,
+                                    and_(WrongNote.last_at == at, WrongNote.id < nid)))
+        rows = db.execute(
+            query.order_by(WrongNote.last_at.desc(), WrongNote.id.desc()).limit(limit + 1)
+        ).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [
+            {
+                "question_id": q.id,
+                "stem": q.stem,
+                "options": q.get_options(),
+                "chosen": n.last_chosen,
+                "answer": q.answer,
+                "explanation": q.explanation,
+                "category": q.category,
+                "subcategory": q.subcategory,
+                "note_type": n.note_type,
+                "wrong_count": n.wrong_count,
+                "last_at": n.last_at.isoformat(),
+            }
+            for n, q in rows
+        ]
+        return {"items": items, "next_cursor": _encode_cursor(rows[-1][0]) if has_more else None}
+    finally:
+        db.close()
+
+
+# -----------------------
+# 기존 풀이 기록으로 노트 채우기 (테이블 최초 생성 시)
+# -----------------------
+def backfill_wrong_notes(batch_size=1000):
+    db = SessionLocal()
+    try:
+        query = (select(Attempt.user_id, Attempt.question_id, Attempt.chosen, Attempt.correct,
+                        Attempt.note_type, Attempt.created_at)
+                 .where(or_(Attempt.correct.is_(False), Attempt.note_type == "review"))
+                 .order_by(Attempt.id))
+        total = 0
+        batch = []
+        for r in db.execute(query).yield_per(batch_size):
+            batch.append(dict(r._mapping))
+            if len(batch) >= batch_size:
+                total += apply_attempts(db, batch)
+                batch.clear()
+        total += apply_attempts(db, batch)
+        db.commit()
+    finally:
+        db.close()
+    if total:
+        print(f"[INFO] 오답노트 채우기 완료: {total}건")
+    return total